@@ -0,0 +1,162 @@
+import re
+
+OBSERVATION_TABLE = 'gaiadr2.sso_observation'
+POSITION_COLUMNS = ('x_gaia', 'y_gaia', 'z_gaia')
+SUMMARY_COLUMNS = ('source_id', 'transit_id', 'n_obs', 'ra', 'dec', 'epoch_min', 'epoch_max')
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+class Release(object):
+    """
+    Tables and schema of a Gaia data release.
+
+    Columns of observations are requested by the names used throughout this
+    package. Columns a release does not store under that name are selected
+    with an ADQL expression instead, e.g. transit_id, which DR3 stores and DR2
+    derives from observation_id // 10.
+
+    Args:
+        name (string): Short name of release, e.g. 'dr2'.
+        source_table (string): Table of asteroids.
+        observation_table (string): Table of observations.
+        expressions (dict): ADQL expression of each column not stored in
+            observation_table under its name.
+
+    Attributes:
+        name (string): Short name of release.
+        source_table (string): Table of asteroids.
+        observation_table (string): Table of observations.
+        expressions (dict): ADQL expression of derived columns.
+    """
+    def __init__(self, name, source_table, observation_table, expressions=None):
+        self.name = name
+        self.source_table = source_table
+        self.observation_table = observation_table
+        self.expressions = {} if expressions is None else dict(expressions)
+
+    def __repr__(self):
+        return 'Release({!r})'.format(self.name)
+
+    def column(self, name):
+        """
+        Args:
+            name (string): Column of observations.
+
+        Returns:
+            string: ADQL expression of column in this release
+        """
+        return self.expressions.get(name, name)
+
+    def select_observations(self, where, columns):
+        """
+        Builds ADQL query of columns of observations in this release, see
+        select_observations.
+        """
+        return select_observations(where, columns, table=self.observation_table,
+                                   expressions=self.expressions)
+
+    def transit_summary(self, where):
+        """
+        Builds ADQL query aggregating observations by transit in this release,
+        see transit_summary.
+        """
+        return transit_summary(where, table=self.observation_table,
+                               transit=self.column('transit_id'))
+
+
+RELEASES = {
+    'dr2': Release('dr2', 'gaiadr2.sso_source', 'gaiadr2.sso_observation',
+                   {'transit_id': 'observation_id/10'}),
+    'dr3': Release('dr3', 'gaiadr3.sso_source', 'gaiadr3.sso_observation'),
+}
+
+def get_release(release):
+    """
+    Args:
+        release (string or Release): Name of release, e.g. 'dr2' or 'dr3'.
+
+    Returns:
+        Release: Tables and schema of release
+
+    Raises:
+        ValueError: If release is not known.
+    """
+    if isinstance(release, Release):
+        return release
+    key = str(release).lower().replace('gaia', '')
+    if key not in RELEASES:
+        raise ValueError('Not Valid Gaia Release: {}'.format(release))
+    return RELEASES[key]
+
+def select_observations(where, columns, table=OBSERVATION_TABLE, expressions=None):
+    """
+    Builds ADQL query of given columns of sso_observation, so that only the
+    columns an analysis needs are transferred.
+
+    Args:
+        where (string): ADQL condition selecting asteroids, e.g. 'source_id IN (...)'.
+        columns (tuple of string): Columns to select, e.g. OBSERVATION_COLUMNS
+            plus POSITION_COLUMNS for the barycentric position of Gaia.
+        table (string): Table to query.
+        expressions (dict): ADQL expression of columns not stored in table
+            under their name, see Release.
+
+    Returns:
+        string: ADQL query
+    """
+    expressions = {} if expressions is None else expressions
+    selected = ['{} AS {}'.format(expressions[column], column) if column in expressions else column
+                for column in check_columns(columns)]
+    return """SELECT
+            {columns}
+            FROM {table}
+            WHERE {where}
+            """.format(columns=', '.join(selected), table=table, where=where)
+
+def transit_summary(where, table=OBSERVATION_TABLE, transit='observation_id/10'):
+    """
+    Builds ADQL query aggregating observations by transit on the server, which
+    returns one row per transit instead of one row per CCD.
+
+    Transits are grouped by observation_id/10 (integer division of the BIGINT
+    observation id) in DR2, and by the transit_id column in DR3. Mean positions are plain averages of ra and dec, which is
+    accurate as transits span a few arcseconds, except for transits crossing
+    ra = 0.
+
+    Args:
+        where (string): ADQL condition selecting asteroids, e.g. 'source_id IN (...)'.
+        table (string): Table to query.
+        transit (string): ADQL expression of transit id.
+
+    Returns:
+        string: ADQL query of SUMMARY_COLUMNS: source_id, transit_id, number of
+            observations n_obs, mean ra and dec, and first and last epoch
+    """
+    return """SELECT
+            source_id, {transit} AS transit_id, COUNT(*) AS n_obs,
+            AVG(ra) AS ra, AVG(dec) AS dec, MIN(epoch) AS epoch_min, MAX(epoch) AS epoch_max
+            FROM {table}
+            WHERE {where}
+            GROUP BY source_id, {transit}
+            ORDER BY source_id, transit_id
+            """.format(transit=transit, table=table, where=where)
+
+def check_columns(columns):
+    """
+    Checks that columns are plain column names, so that they can be put into
+    ADQL safely.
+
+    Args:
+        columns (tuple of string): Column names.
+
+    Returns:
+        list: Column names
+
+    Raises:
+        ValueError: If a column is not a valid identifier.
+    """
+    columns = list(columns)
+    for column in columns:
+        if not _IDENTIFIER.match(column):
+            raise ValueError('Not Valid Column Name: {}'.format(column))
+    return columns
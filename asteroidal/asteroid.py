@@ -1,10 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import matplotlib
-from astroquery.gaia import Gaia
-from astroquery.mpc import MPC
-from astropy.table import Table
+from .backends import get_backend
+from .transits import TransitIndex, summarize_transits, transit_stats
+from .instrument import timed
+from .geometry import orbit_radii, theta_grid, plot_orbit_collection, plot_orbit_density
 
 class Asteroid(object):
     """
@@ -15,29 +13,48 @@ class Asteroid(object):
     initializing in given order). Initialization will query Gaia for the remaining
     attributes unless the asteroid does not exist in Gaia.
 
+    With lazy=True, only gaiadr2.sso_source is queried on initialization.
+    Observations and transits are queried on first access of observations,
+    transit_index, transits or transit_ccds, and MPC is queried on first access
+    of mpc_data or orbit_data.
+
+    Attributes are stored in __slots__, so that catalogs of many asteroids do
+    not pay for a dict per asteroid, see also AsteroidView.
+
     Args:
         source_id (int): Unique source identifier from gaia_source.
         number_mp (int): Minor Planet number attributed by MPC.
         denomination (string): Name of asteroid in MPC database.
+        lazy (bool): Defer querying observations and MPC until they are used.
+        backend (Backend): Data source to query. Defaults to get_backend(),
+            which queries the Gaia archive and MPC.
 
     Attributes:
+        backend (Backend): Data source queried for asteroid.
         source_id (int): Unique source identifier from gaia_source.
         number_mp (int): Minor Planet number attributed by MPC.
         denomination (string): Name of asteroid in MPC database.
         num_of_obs (int): Number of observations for the asteroid 
             that appear in sso_observation.
-        observations (table): Table of observations from sso_observation. 
-            Includes source_id, observation_id, number_mp, epoch, 
+        source (Table): Row of asteroid from sso_source.
+        observations (table): Table of observations from sso_observation, sorted
+            by transit. Includes source_id, observation_id, number_mp, epoch, 
             ra, dec, x_gaia, y_gaia, z_gaia.
+        transit_index (TransitIndex): Index grouping observations by transit.
         transits (ndarray of int): Array of individual transits from observation.
-        transit_ccds (ndarray of list of int): Array of lists of ccd detectors activated 
+        transit_ccds (ndarray of ndarray of int): Array of arrays of ccd detectors activated 
             for an observation for each transit. 
         mpc_data (dict): All data from querying MPC.
         orbit_data (ndarray of float): Array of orbit data (eccentricity, semimajor axis)
             queried from MPC.
 
     """
-    def __init__(self, number_mp=0, denomination='', source_id=0):
+    __slots__ = ('backend', 'source_id', 'number_mp', 'denomination', 'num_of_obs',
+                 'source', 'observations', 'transit_index', 'transits', 'transit_ccds',
+                 'mpc_data', 'orbit_data', '__weakref__')
+
+    def __init__(self, number_mp=0, denomination='', source_id=0, lazy=False, backend=None):
+        self.backend = get_backend() if backend is None else backend
         if number_mp > 0:
             self.number_mp = number_mp
             self.denomination = ''
@@ -58,10 +75,41 @@ class Asteroid(object):
             self.denomination = ''
             self.source_id = 0
             self.num_of_obs = 0
+        if lazy:
+            return
         self.query_observations()
-        self.set_transits()
         self.query_mpc()
 
+    def __getattr__(self, name):
+        # Only called for attributes that are not set yet, which are queried
+        # here on first access for lazy asteroids.
+        if name in ('observations', 'transit_index', 'transits', 'transit_ccds'):
+            self.query_observations()
+        elif name in ('mpc_data', 'orbit_data'):
+            self.query_mpc()
+        else:
+            raise AttributeError('{} object has no attribute {}'.format(type(self).__name__, name))
+        return object.__getattribute__(self, name)
+
+    @classmethod
+    def bulk(cls, number_mp=None, denomination=None, source_id=None, **kwargs):
+        """
+        Loads many asteroids at once with a handful of Gaia queries.
+
+        Args:
+            number_mp (list of int): Minor Planet numbers attributed by MPC.
+            denomination (list of string): Names of asteroids in MPC database.
+            source_id (list of int): Unique source identifiers from gaia_source.
+            **kwargs: Passed on to AsteroidCatalog.
+
+        Returns:
+            AsteroidCatalog: Catalog of all asteroids found in Gaia.
+        """
+        from .catalog import AsteroidCatalog
+        return AsteroidCatalog(number_mp=number_mp, denomination=denomination,
+                               source_id=source_id, **kwargs)
+
+    @timed('query_source')
     def query_source(self, search_col):
         """
         Queries gaiadr2.sso_source for asteroid given number_mp, 
@@ -83,14 +131,8 @@ class Asteroid(object):
         else:
             print('Not Valid Column Name.')
             return
-            
-        query = """SELECT
-                source_id, num_of_obs, number_mp, denomination
-                FROM gaiadr2.sso_source
-                WHERE {search}={val}
-                """.format(search=search_col, val='\'{}\''.format(value))
-        job = Gaia.launch_job(query)
-        results = job.get_results()
+
+        results = self.backend.query_sources(search_col, [value])
         return self.set_sso_source(results)
 
     def set_sso_source(self, sso_source_results):
@@ -127,164 +169,240 @@ class Asteroid(object):
         
         return self.source
 
-    def query_observations(self):
+    @timed('query_observations')
+    def query_observations(self, columns=None):
         """
         Queries gaiadr2.sso_observation for all observations for specific asteroid object.
-        Adds observations attribute
+        Adds observations attribute and regroups transits, see set_transits. Runs
+        as asynchronous job if the asteroid has more observations than the row
+        limit of the backend.
+
+        Args:
+            columns (tuple of string): Columns to fetch, e.g. OBSERVATION_COLUMNS
+                plus POSITION_COLUMNS for x_gaia, y_gaia, z_gaia. source_id and
+                observation_id are always fetched. Defaults to OBSERVATION_COLUMNS.
 
         Returns:
             Table: Table of results from query job including source_id, observation_id, number_mp, epoch, ra, dec
         """
         if self.source_id == 0:
+            from astropy.table import Table
             self.observations = Table()
+            self.set_transits()
             return self.observations
-        query = """SELECT
-                source_id, observation_id, number_mp, epoch, ra, dec
-                FROM gaiadr2.sso_observation
-                WHERE source_id={source_id}
-                """.format(source_id=self.source_id)
-
-        job = Gaia.launch_job(query)
-        results = job.get_results()
+        if columns is not None:
+            columns = [name for name in ('source_id', 'observation_id') if name not in columns] + list(columns)
+        async_job = self.num_of_obs > self.backend.max_rows
+        results = self.backend.query_observations([self.source_id], async_job=async_job, columns=columns)
         self.observations = results
+        self.set_transits()
         return self.observations
 
+    @timed('query_transit_summary')
+    def query_transit_summary(self):
+        """
+        Queries one row per transit instead of all observations. With the Gaia
+        archive, observations are aggregated by the archive, so about a tenth of
+        the rows are transferred.
+
+        Returns:
+            Table: Table of transits including source_id, transit_id, n_obs, ra, dec,
+                epoch_min, epoch_max
+        """
+        if self.source_id == 0:
+            return summarize_transits([])
+        async_job = self.num_of_obs > self.backend.max_rows
+        return self.backend.query_transit_summary([self.source_id], async_job=async_job)
+
+    @timed('transit_stats')
+    def transit_stats(self):
+        """
+        Computes number of CCDs, epoch span, mean position, scatter and motion
+        rate of every transit in one vectorized pass, see transits.transit_stats.
+
+        Returns:
+            Table: One row per transit, in the order of transits
+        """
+        if self.source_id == 0:
+            return transit_stats([])
+        return transit_stats(self.observations)
+
+    @timed('set_transits')
     def set_transits(self):
         """
-        Adds transits and transit_ccds attributes from total observations
+        Adds transit_index, transits and transit_ccds attributes from total observations.
+        Observations are grouped by transit (observation_id // 10) with a sort in
+        O(n log n), see TransitIndex, and the observations table is reordered so
+        that the observations of each transit are contiguous.
 
         Returns:
             ndarray: Array of int, individual transits from observations
         """
         if self.source_id == 0:
+            self.transit_index = TransitIndex([])
             self.transits = np.array([])
             self.transit_ccds = np.array([])
             return self.transits
-        observation_id = self.observations['observation_id'].data
-
-        transit_id = observation_id / 10
-        transit_id = np.unique(transit_id)
-        transit_ccd = []
-        ccd = []
-        for i in transit_id:
-            for j in observation_id:
-                if i == (j / 10):
-                    ccd.append(j % 10)
-            transit_ccd.append(ccd.copy())
-            ccd.clear()
-        self.transits = transit_id
-        self.transit_ccds = np.array(transit_ccd, dtype=object)
+        self.transit_index = TransitIndex(self.observations['observation_id'])
+        order = self.transit_index.order
+        if np.any(order[1:] < order[:-1]):
+            self.observations = self.observations[order]
+        self.transits = self.transit_index.transits
+        self.transit_ccds = self.transit_index.transit_ccds()
         return self.transits
     
-    def plot_observations(self):
+    @timed('plot_observations')
+    def plot_observations(self, ax=None):
         """
-        Plots ra and dec of all observations
+        Plots ra and dec of all observations, colored by transit, as a single
+        scatter with a colorbar of transit numbers, so the number of artists
+        does not grow with the number of transits.
+
+        Args:
+            ax (axes): Axes to plot onto. Creates new figure if None.
+
+        Returns:
+            axes: Axes plotted onto
         """
+        import matplotlib.pyplot as plt
         if len(self.observations) == 0:
             return
         
         numTransits = len(self.transits)
-        fig = plt.figure(figsize=(7, 7))
-        colors = []
-        for index in range(0, numTransits):
-            ra, dec = self.get_transit_obs(index)
-            ccds = self.transit_ccds[index]
-            for i in range(0, len(ccds)):
-                plt.scatter(ra, dec, color=(1-index/numTransits, index/numTransits, 1))
-            color_patch = mpatches.Patch(color=(1-index/numTransits, index/numTransits, 1), label='Transit ' +str(index+1))
-            colors.append(color_patch)
+        if ax is None:
+            fig, ax = plt.subplots(figsize=(7, 7))
+        transit = np.repeat(np.arange(1, numTransits+1), self.transit_index.counts)
+        points = ax.scatter(self.observations['ra'], self.observations['dec'], c=transit,
+                            cmap=transit_cmap(), vmin=1, vmax=numTransits+1)
+        ax.figure.colorbar(points, ax=ax, label='Transit')
        
-        plt.xlabel('RA (deg)')
-        plt.ylabel('DEC (deg)')
-        plt.title('All Observations')
-        plt.legend(handles=colors)
+        ax.set_xlabel('RA (deg)')
+        ax.set_ylabel('DEC (deg)')
+        ax.set_title('All Observations')
+        return ax
     
-    def get_transit_obs(self, index):
+    def get_transit_obs(self, index, columns=('ra', 'dec')):
         """
-        Returns ra and dec of observations of a specific transit, 
+        Returns ra and dec (or other columns) of observations of a specific transit, 
         specified by index in transits array
 
         Args:
             index (int): index of transits array
+            columns (tuple of string): Columns of observations to return
         
         Returns:
-            list: Returns list of ra and list of dec
+            list: Returns list of views of each column, by default ra and dec
+
+        Raises:
+            IndexError: If a negative index is out of range.
         """
-        if index >= len(self.transits):
+        transit_index = self.transit_index
+        if index >= len(transit_index):
             print('Index larger than transit array length.')
-            return [[],[]]
-        transit = self.transits[index]
-        ra = []
-        dec = []
-        for observation in self.observations:
-            if observation['observation_id'] / 10 == transit:
-                ra.append(observation['ra'])
-                dec.append(observation['dec'])
-        return [ra,dec]
-
-    def plot_transit(self, index):
+            return [[] for name in columns]
+        if index < -len(transit_index):
+            raise IndexError('Transit index out of range.')
+        rows = transit_index.get_slice(index)
+        return [self._column(name)[rows] for name in columns]
+
+    def _column(self, name):
+        """Returns column of observations as ndarray."""
+        return np.asarray(self.observations[name])
+
+    def iter_transits(self, columns=('ra', 'dec')):
+        """
+        Iterates over all transits at once, splitting each column of observations
+        only once.
+
+        Args:
+            columns (tuple of string): Columns of observations to return
+
+        Yields:
+            tuple: Transit id, view of ccds and views of each column for each transit
+        """
+        transit_index = self.transit_index
+        if len(transit_index) == 0:
+            return
+        splits = [transit_index.split(self._column(name)) for name in columns]
+        ccds = transit_index.split(transit_index.ccds)
+        for values in zip(transit_index.transits, ccds, *splits):
+            yield values
+
+    @timed('plot_transit')
+    def plot_transit(self, index, ax=None):
         """
-        Plots observations in specific transit, specified by index in transits array.
+        Plots observations in specific transit, specified by index in transits array,
+        colored by CCD as a single scatter.
 
         Args:
             index (int): index of transits array
+            ax (axes): Axes to plot onto. Creates new figure if None.
+
+        Returns:
+            axes: Axes plotted onto
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
         ra, dec = self.get_transit_obs(index)
         if len(ra) == 0 or len(dec) == 0:
             print('No transits observed.')
             return
         d_ra = 3600000*(ra - np.min(ra))
         d_dec = 3600000*(dec - np.min(dec))
-        ccds = self.transit_ccds[index]
-        fig = plt.figure()
-        colors = []
-        for i in range(0,len(ccds)):
-            plt.scatter(d_ra[i], d_dec[i], color=(1-ccds[i]/10, ccds[i]/10, 1))
-            color_patch = mpatches.Patch(color=(1-ccds[i]/10, ccds[i]/10, 1), label='CCD'+str(i+1))
-            colors.append(color_patch)
-            plt.xlabel(r'$\Delta$' + 'RA (mas)')
-            plt.ylabel(r'$\Delta$' + 'DEC (mas)')
-            plt.title('{NAME} ({NUM})\nTransit {TRANSIT:.0f} at \n(RA, DEC) = ({RA}, {DEC}) in deg'.format(NAME=self.denomination,NUM=self.number_mp,TRANSIT=self.transits[index],RA=np.min(ra), DEC=np.min(dec)))
-        plt.legend(handles=colors)
-
-    def plot_all_transits(self):
+        ccds = self.transit_index.get_ccds(index)
+        if ax is None:
+            fig, ax = plt.subplots()
+        colors = ccd_colors(ccds)
+        ax.scatter(d_ra, d_dec, color=colors)
+        patches = [mpatches.Patch(color=tuple(colors[i]), label='CCD'+str(i+1)) for i in range(0,len(ccds))]
+        ax.set_xlabel(r'$\Delta$' + 'RA (mas)')
+        ax.set_ylabel(r'$\Delta$' + 'DEC (mas)')
+        ax.set_title('{NAME} ({NUM})\nTransit {TRANSIT:.0f} at \n(RA, DEC) = ({RA}, {DEC}) in deg'.format(NAME=self.denomination,NUM=self.number_mp,TRANSIT=self.transits[index],RA=np.min(ra), DEC=np.min(dec)))
+        ax.legend(handles=patches)
+        return ax
+
+    @timed('plot_all_transits')
+    def plot_all_transits(self, fig=None):
         """
-        Plots all observations for each transit in single figure.
+        Plots all observations for each transit in single figure, with a single
+        scatter per transit colored by CCD.
+
+        Args:
+            fig (Figure): Figure to plot onto. Creates new figure if None.
+
+        Returns:
+            Figure: Figure plotted onto
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
         numTransits = len(self.transits)
         nFig = int(np.ceil(np.sqrt(numTransits)))
         if nFig == 0:
             print('No transits observed.')
             return
-        fig, ax = plt.subplots(nrows=nFig, ncols=nFig, figsize=(2+2*nFig, 2+2*nFig))
-        for index in range(0,nFig**2):
-            row = int(index / nFig)
-            col = int(index % nFig)
-            if index < numTransits:
-                ccds = self.transit_ccds[index]
-                ra, dec = self.get_transit_obs(index)
-                d_ra = 3600000*(ra - np.min(ra))
-                d_dec = 3600000*(dec - np.min(dec))
-                for i in range(0,len(ccds)):
-                    curax = ax[row,col]
-                    curax.scatter(d_ra[i], d_dec[i], color=(1-ccds[i]/10, ccds[i]/10, 1))
-                    plt.xticks(fontsize=20/nFig)
-                    plt.yticks(fontsize=20/nFig)
-            else:
-                fig.delaxes(ax[row][col])
-        colors = []
-        for i in range(0, 9):
-            color_patch = mpatches.Patch(color=(1-i/10, i/10, 1), label='CCD'+str(i+1))
-            colors.append(color_patch)
-
-        plt.legend(handles=colors, loc='upper left', bbox_to_anchor=(1.02, 1),borderaxespad=0)
+        if fig is None:
+            fig = plt.figure(figsize=(2+2*nFig, 2+2*nFig))
+        ax = fig.subplots(nrows=nFig, ncols=nFig, squeeze=False)
+        for index, (transit, ccds, ra, dec) in enumerate(self.iter_transits()):
+            curax = ax[index // nFig, index % nFig]
+            d_ra = 3600000*(ra - np.min(ra))
+            d_dec = 3600000*(dec - np.min(dec))
+            curax.scatter(d_ra, d_dec, color=ccd_colors(ccds))
+            curax.tick_params(labelsize=20/nFig)
+        for index in range(numTransits, nFig**2):
+            fig.delaxes(ax[index // nFig, index % nFig])
+        colors = [mpatches.Patch(color=(1-i/10, i/10, 1), label='CCD'+str(i+1)) for i in range(0, 9)]
+
+        curax.legend(handles=colors, loc='upper left', bbox_to_anchor=(1.02, 1),borderaxespad=0)
 
         numRows = int((numTransits-1)/nFig) + 1
         emptyRows = nFig - numRows
         fig.text(0.5, 0.02+emptyRows/nFig, r'$\Delta$' + 'RA (mas)', ha='center')
         fig.text(0.07, 0.5, r'$\Delta$' + 'DEC (mas)', va='center', rotation='vertical')
         fig.text(0.5, 0.92, '{NAME} ({NUM})\nAll Transits Observed By Gaia'.format(NAME=self.denomination, NUM=self.number_mp), ha='center')
+        return fig
 
+    @timed('query_mpc')
     def query_mpc(self):
         """
         Queries MPC for all orbit data
@@ -296,7 +414,13 @@ class Asteroid(object):
             self.mpc_data = {}
             self.orbit_data = np.array([0,0])
             return self.orbit_data
-        result = MPC.query_object('asteroid', number=self.number_mp)[0]
+        results = self.backend.query_mpc(self.number_mp)
+        if len(results) == 0:
+            print('Asteroid {} does not exist in MPC.'.format(self.number_mp))
+            self.mpc_data = {}
+            self.orbit_data = np.array([0,0])
+            return self.orbit_data
+        result = results[0]
         self.mpc_data = result
         self.orbit_data = np.array([
             float(result['semimajor_axis']),
@@ -304,19 +428,71 @@ class Asteroid(object):
         ])
         return self.orbit_data
     
-    def plot_orbits(self):
+    @timed('residuals')
+    def residuals(self):
+        """
+        Predicts positions at all observations by two-body propagation of the
+        MPC elements in mpc_data and computes observed minus computed residuals,
+        see kepler.residual_table. Positions of Gaia are taken from x_gaia,
+        y_gaia, z_gaia if they were fetched, see query_observations.
+
+        Returns:
+            Table: Table with epoch, ra_pred, dec_pred, d_ra and d_dec in mas
+        """
+        from .kepler import elements, residual_table
+        orbit_elements = elements(self.mpc_data)
+        if np.any(np.isnan(orbit_elements[:7])):
+            print('No orbit elements of asteroid {} in MPC data.'.format(self.number_mp))
+            return residual_table(self.observations[0:0], orbit_elements)
+        return residual_table(self.observations, orbit_elements)
+
+    @timed('plot_orbits')
+    def plot_orbits(self, ax=None):
         """Plots sun and orbits of planets and asteroid
+
+        Args:
+            ax (axes): Polar axes to plot onto. Creates new figure if None.
+
+        Returns:
+            axes: Axes plotted onto
         """
+        import matplotlib.pyplot as plt
         if self.number_mp == 0:
             return
-        fig,ax = plt.subplots(subplot_kw={'projection':'polar'}, figsize=(10, 10))
+        if ax is None:
+            fig,ax = plt.subplots(subplot_kw={'projection':'polar'}, figsize=(10, 10))
         planet_orbit(ax)
         orbit(ax, self.orbit_data, 'purple', self.denomination + '({NUM})'.format(NUM=self.number_mp), lw=3)
-        plt.title('Orbit of {NAME} ({NUM})'.format(NAME=self.denomination,NUM=self.number_mp))
+        ax.set_title('Orbit of {NAME} ({NUM})'.format(NAME=self.denomination,NUM=self.number_mp))
+        return ax
 
 
 
-def orbit(ax, orbit_params, color='blue', olabel='', lw=1, alp=1):
+def transit_cmap():
+    """
+    Returns colormap of observations by transit, as used by plot_observations,
+    fading from magenta for the first transit to cyan for the last.
+
+    Returns:
+        Colormap: Colormap of transits
+    """
+    from matplotlib.colors import LinearSegmentedColormap
+    return LinearSegmentedColormap.from_list('transits', [(1, 0, 1), (0, 1, 1)])
+
+def ccd_colors(ccds):
+    """
+    Returns colors of observations by CCD, as used by plot_transit and plot_all_transits.
+
+    Args:
+        ccds (ndarray of int): CCD number of each observation.
+
+    Returns:
+        ndarray: RGB colors of shape (len(ccds), 3)
+    """
+    fraction = np.asarray(ccds) / 10
+    return np.column_stack([1-fraction, fraction, np.ones_like(fraction)])
+
+def orbit(ax, orbit_params, color='blue', olabel='', lw=1, alp=1, legend=True):
     """
     Plots simple orbit of object given semimajor axis and eccentricity
     in polar coordinates.
@@ -328,13 +504,13 @@ def orbit(ax, orbit_params, color='blue', olabel='', lw=1, alp=1):
         olabel (string): Label of orbit as seen in legend
         lw (float): Linewidth of orbit plot
         a (float within 0-1): Alpha value of orbit plot
+        legend (bool): Whether to redraw legend of ax
     """
-    a = orbit_params[0]
-    e = orbit_params[1]
-    theta = np.arange(0, 2*np.pi, 0.01)
-    r = a*(1.-e**2)/(1.+e*np.cos(theta))
+    theta, _ = theta_grid()
+    r = orbit_radii(orbit_params)[0]
     ax.plot(theta, r, c=color, label=olabel, linewidth=lw, alpha=alp)
-    ax.legend()
+    if legend:
+        ax.legend()
 
 def planet_orbit(ax):
     """
@@ -351,26 +527,48 @@ def planet_orbit(ax):
     jupyter = np.array([5.2038, 0.0489])
 
     ax.plot(0, 0, color='yellow', markerfacecolor='yellow', label='Sun', marker='o', markersize=5, markeredgecolor='black')
-    orbit(ax, mercury, 'gray', 'Mercury')
-    orbit(ax, venus, 'orange', 'Venus')
-    orbit(ax, earth, 'blue', 'Earth')
-    orbit(ax, mars, 'red', 'Mars')
-    orbit(ax, jupyter, 'green', 'Jupyter')
+    orbit(ax, mercury, 'gray', 'Mercury', legend=False)
+    orbit(ax, venus, 'orange', 'Venus', legend=False)
+    orbit(ax, earth, 'blue', 'Earth', legend=False)
+    orbit(ax, mars, 'red', 'Mars', legend=False)
+    orbit(ax, jupyter, 'green', 'Jupyter', legend=False)
+    ax.legend()
 
-def plot_multiple_orbits(asteroids, ax=None):
+@timed('plot_multiple_orbits')
+def plot_multiple_orbits(asteroids, ax=None, orbits=None, density=False):
     """
-    Plots orbit of multiple asteroids in array along with sun and planets
+    Plots orbit of multiple asteroids in array along with sun and planets.
+    Radii of all orbits are computed as one array and drawn as a single
+    LineCollection, or as a density map for very large catalogs.
 
     Args:
         asteroids (ndarray of Asteroid object): Array of asteroid objects
+        ax (axes): Polar axes to plot onto. Creates new figure if None.
+        orbits (OrbitIndex): Local orbit elements to look up all asteroids at
+            once instead of using (and possibly querying) each orbit_data.
+        density (bool): Whether to plot orbits as density map instead of lines.
+
+    Returns:
+        axes: Axes plotted onto
     """
+    import matplotlib.pyplot as plt
     if ax is None:
         fig,ax = plt.subplots(subplot_kw={'projection':'polar'}, figsize=(10, 10))
     planet_orbit(ax)
-    plt.title('Orbits for Multiple Asteroids')
-    for asteroid in asteroids:
-        if asteroid.number_mp == 0:
-            continue
-        orbit(ax, asteroid.orbit_data, 'purple', asteroid.denomination + '({NUM})'.format(NUM=asteroid.number_mp), lw=1, alp=0.3)
+    ax.set_title('Orbits for Multiple Asteroids')
+    asteroids = [asteroid for asteroid in asteroids if asteroid.number_mp != 0]
+    if orbits is not None:
+        orbit_data = orbits.orbit_data([asteroid.number_mp for asteroid in asteroids])
+    else:
+        orbit_data = [asteroid.orbit_data for asteroid in asteroids]
+    orbit_data = np.reshape(np.asarray(orbit_data, dtype=np.float64), (-1, 2))
+    if density:
+        plot_orbit_density(ax, orbit_data, rmax=ax.get_ylim()[1])
+    elif len(asteroids) == 1:
+        plot_orbit_collection(ax, orbit_data, label=asteroids[0].denomination + '({NUM})'.format(NUM=asteroids[0].number_mp))
+    elif len(asteroids) > 1:
+        plot_orbit_collection(ax, orbit_data, label='{NUM} Asteroids'.format(NUM=len(asteroids)))
+    ax.legend()
+    return ax
     
 # %%
@@ -0,0 +1,507 @@
+import os
+import numpy as np
+from .cache import get_cache
+from .instrument import request
+from .adql import get_release, RELEASES
+from .transits import summarize_transits
+
+SOURCE_COLUMNS = ('source_id', 'num_of_obs', 'number_mp', 'denomination')
+OBSERVATION_COLUMNS = ('source_id', 'observation_id', 'number_mp', 'epoch', 'ra', 'dec')
+
+_backend = None
+
+class Backend(object):
+    """
+    Interface of data sources that Asteroid and AsteroidCatalog query for
+    sso_source, sso_observation and MPC orbit data.
+
+    Attributes:
+        max_ids (int): Maximum number of identifiers to pass in a single query.
+        max_rows (int): Maximum number of observation rows to fetch in a single
+            synchronous query.
+        release (Release): Gaia data release served by backend.
+    """
+    max_ids = 500
+    max_rows = 2000
+    release = RELEASES['dr2']
+
+    def query_sources(self, search_col, values):
+        """
+        Queries sso_source for asteroids given list of number_mp, denomination,
+        or source_id.
+
+        Args:
+            search_col (string): Either 'number_mp', 'denomination', or 'source_id'
+            values (list): Values of search_col to query for.
+
+        Returns:
+            Table: Table of results including source_id, num_of_obs, number_mp, denomination
+        """
+        raise NotImplementedError
+
+    def query_observations(self, source_ids, async_job=False, columns=None):
+        """
+        Queries sso_observation for all observations of asteroids.
+
+        Args:
+            source_ids (list of int): Unique source identifiers of asteroids.
+            async_job (bool): Whether more than max_rows rows are expected.
+            columns (tuple of string): Columns to fetch. Defaults to
+                OBSERVATION_COLUMNS.
+
+        Returns:
+            Table: Table of results including source_id, observation_id, number_mp, epoch, ra, dec
+        """
+        raise NotImplementedError
+
+    def query_new_observations(self, last_ids, async_job=False, columns=None):
+        """
+        Queries observations of asteroids newer than those already held, i.e.
+        with observation_id greater than the last one held of each asteroid.
+        The default implementation queries all observations and filters them
+        locally.
+
+        Args:
+            last_ids (dict): Mapping of source_id to largest observation_id held.
+            async_job (bool): Whether more than max_rows rows are expected.
+            columns (tuple of string): Columns to fetch. Defaults to
+                OBSERVATION_COLUMNS.
+
+        Returns:
+            Table: Table of new observations
+        """
+        source_ids = np.array(sorted(last_ids), dtype=np.int64)
+        results = self.query_observations(source_ids, async_job=async_job, columns=columns)
+        if len(results) == 0:
+            return results
+        last = np.array([last_ids[key] for key in source_ids], dtype=np.int64)
+        index = np.searchsorted(source_ids, np.asarray(results['source_id'], dtype=np.int64))
+        return results[np.asarray(results['observation_id'], dtype=np.int64) > last[index]]
+
+    def query_transit_summary(self, source_ids, async_job=False):
+        """
+        Queries one row per transit of asteroids instead of one row per CCD.
+        The default implementation aggregates all observations locally.
+
+        Args:
+            source_ids (list of int): Unique source identifiers of asteroids.
+            async_job (bool): Whether more than max_rows rows are expected.
+
+        Returns:
+            Table: Table of transits including source_id, transit_id, n_obs,
+                ra, dec, epoch_min, epoch_max, see summarize_transits
+        """
+        observations = self.query_observations(source_ids, async_job=async_job,
+                                               columns=('source_id', 'observation_id', 'epoch', 'ra', 'dec'))
+        return summarize_transits(observations)
+
+    def iter_observation_chunks(self, source_ids=None, chunk_size=100000):
+        """
+        Iterates over sso_observation in chunks of rows sorted by source_id, so
+        that the observations of each asteroid are contiguous, although they
+        may span more than one chunk.
+
+        The default implementation packs asteroids by num_of_obs into
+        asynchronous query_observations jobs of about chunk_size rows, and
+        splits asteroids with more observations into chunks of chunk_size
+        rows, so it requires source_ids.
+
+        Args:
+            source_ids (list of int): Unique source identifiers of asteroids.
+                None iterates over all asteroids, if supported by backend.
+            chunk_size (int): Maximum number of rows per chunk.
+
+        Yields:
+            Table: Chunk of observations including source_id, observation_id, number_mp, epoch, ra, dec
+        """
+        if source_ids is None:
+            raise NotImplementedError
+        source_ids = np.unique(np.asarray(source_ids, dtype=np.int64))
+        for start in range(0, len(source_ids), self.max_ids):
+            sources = self.query_sources('source_id', source_ids[start:start+self.max_ids])
+            if len(sources) == 0:
+                continue
+            order = np.argsort(np.asarray(sources['source_id']), kind='stable')
+            ids = np.asarray(sources['source_id'])[order]
+            counts = np.asarray(sources['num_of_obs'])[order]
+            for group, rows in _pack(ids, counts, self.max_ids, chunk_size):
+                results = self.query_observations(group, async_job=True)
+                results = results[np.argsort(np.asarray(results['source_id']), kind='stable')]
+                for first in range(0, len(results), chunk_size):
+                    yield results[first:first+chunk_size]
+
+    def query_mpc(self, number):
+        """
+        Queries orbit data of asteroid from MPC.
+
+        Args:
+            number (int): Minor Planet number attributed by MPC.
+
+        Returns:
+            list: List of dicts of orbit data as returned by MPC, empty if not found
+        """
+        raise NotImplementedError
+
+
+class GaiaBackend(Backend):
+    """
+    Backend querying the Gaia archive through TAP and the MPC web service.
+    Results are served from the query cache if it is enabled.
+
+    Args:
+        orbits (OrbitIndex): Local orbit elements to look up before querying
+            MPC. If None, MPC is queried for every asteroid.
+        release (string or Release): Gaia data release to query, 'dr2' or 'dr3'.
+    """
+    def __init__(self, orbits=None, release='dr2'):
+        self.orbits = orbits
+        self.release = get_release(release)
+
+    def query_sources(self, search_col, values):
+        query = """SELECT
+                {columns}
+                FROM {table}
+                WHERE {where}
+                """.format(columns=', '.join(SOURCE_COLUMNS), table=self.release.source_table,
+                           where=_where(search_col, values))
+        return launch_query(query)
+
+    def query_observations(self, source_ids, async_job=False, columns=None):
+        if columns is None:
+            columns = OBSERVATION_COLUMNS
+        query = self.release.select_observations(_where('source_id', source_ids), columns)
+        return launch_query(query, async_job=async_job)
+
+    def query_new_observations(self, last_ids, async_job=False, columns=None):
+        """
+        Selects only new observations in the archive, with one keyset
+        condition per asteroid. See Backend.query_new_observations.
+        """
+        if columns is None:
+            columns = OBSERVATION_COLUMNS
+        source_ids = sorted(last_ids)
+        newer = ' OR '.join('(source_id = {} AND observation_id > {})'.format(int(key), int(last_ids[key]))
+                            for key in source_ids)
+        where = '{} AND ({})'.format(_where('source_id', source_ids), newer)
+        return launch_query(self.release.select_observations(where, columns), async_job=async_job)
+
+    def query_transit_summary(self, source_ids, async_job=False):
+        """
+        Aggregates observations by transit in the archive, so only one row per
+        transit is transferred. See Backend.query_transit_summary.
+        """
+        return launch_query(self.release.transit_summary(_where('source_id', source_ids)), async_job=async_job)
+
+    def iter_observation_chunks(self, source_ids=None, chunk_size=100000):
+        """
+        Pages through sso_observation of the release with asynchronous jobs, which are
+        not capped by the row limit of synchronous jobs. Pages are ordered by
+        source_id and observation_id, and each page starts after the last row
+        of the previous page (keyset paging), so no row is skipped or repeated.
+        See Backend.iter_observation_chunks.
+        """
+        if source_ids is None:
+            groups = [None]
+        else:
+            source_ids = np.unique(np.asarray(source_ids, dtype=np.int64))
+            groups = [source_ids[start:start+self.max_ids]
+                      for start in range(0, len(source_ids), self.max_ids)]
+        for group in groups:
+            last = None
+            while True:
+                conditions = []
+                if group is not None:
+                    conditions.append(_where('source_id', group))
+                if last is not None:
+                    conditions.append(_after(last))
+                query = """SELECT TOP {top}
+                        {columns}
+                        FROM {table}
+                        {where}
+                        ORDER BY source_id, observation_id
+                        """.format(top=int(chunk_size), columns=', '.join(OBSERVATION_COLUMNS),
+                                   table=self.release.observation_table,
+                                   where='WHERE ' + ' AND '.join(conditions) if conditions else '')
+                results = launch_query(query, async_job=True)
+                if len(results) > 0:
+                    yield results
+                if len(results) < chunk_size:
+                    break
+                last = (int(results['source_id'][-1]), int(results['observation_id'][-1]))
+
+    def query_mpc(self, number):
+        if self.orbits is not None:
+            result = self.orbits.get(int(number))
+            if result is not None:
+                return [result]
+        return query_mpc_object(number)
+
+
+class LocalBackend(Backend):
+    """
+    Backend reading bulk dumps of sso_source and sso_observation from local
+    files, for analyses of the full catalog and for working offline.
+
+    Dumps can be CSV, FITS or Parquet files (Parquet requires pyarrow), astropy
+    Tables, or directories of one .npy file per column as written by
+    write_columns. FITS files and .npy directories are memory-mapped, so only
+    the rows of queried asteroids are read from disk. Observations are looked up
+    by binary search, which is fastest if the dump is sorted by source_id.
+
+    Args:
+        source (string or Table): Dump of sso_source.
+        observations (string or Table): Dump of sso_observation.
+        orbits (OrbitIndex or dict): Mapping of number_mp to dict of orbit data
+            as returned by MPC. If None, MPC is queried for orbit data.
+        release (string or Release): Gaia data release the dumps are from.
+    """
+    max_ids = 100000
+    max_rows = 10**9
+
+    def __init__(self, source, observations, orbits=None, release='dr2'):
+        self.source = read_columns(source)
+        self.observations = read_columns(observations)
+        self.orbits = orbits
+        self.release = get_release(release)
+        source_ids = np.asarray(self.observations['source_id'])
+        if np.all(source_ids[1:] >= source_ids[:-1]):
+            self.order = None
+            self.sorted_ids = source_ids
+        else:
+            self.order = np.argsort(source_ids, kind='stable')
+            self.sorted_ids = source_ids[self.order]
+        self._denominations = None
+
+    def query_sources(self, search_col, values):
+        if search_col == 'denomination':
+            if self._denominations is None:
+                self._denominations = _lower(self.source['denomination'])
+            mask = np.isin(self._denominations, _lower(values))
+        else:
+            mask = np.isin(self.source[search_col], np.asarray(values, dtype=np.int64))
+        return _table(self.source, SOURCE_COLUMNS, np.nonzero(mask)[0])
+
+    def query_observations(self, source_ids, async_job=False, columns=None):
+        source_ids = np.asarray(source_ids, dtype=np.int64)
+        starts = np.searchsorted(self.sorted_ids, source_ids, side='left')
+        ends = np.searchsorted(self.sorted_ids, source_ids, side='right')
+        rows = _ranges(starts, ends)
+        if self.order is not None:
+            rows = self.order[rows]
+        return _table(self.observations, OBSERVATION_COLUMNS if columns is None else columns, rows)
+
+    def iter_observation_chunks(self, source_ids=None, chunk_size=100000):
+        """
+        Reads observations in chunks of rows from the dump, so memory-mapped
+        dumps are never read whole. See Backend.iter_observation_chunks.
+        """
+        if source_ids is None:
+            rows = None
+            total = len(self.sorted_ids)
+        else:
+            source_ids = np.unique(np.asarray(source_ids, dtype=np.int64))
+            starts = np.searchsorted(self.sorted_ids, source_ids, side='left')
+            ends = np.searchsorted(self.sorted_ids, source_ids, side='right')
+            rows = _ranges(starts, ends)
+            total = len(rows)
+        for start in range(0, total, chunk_size):
+            if rows is None:
+                chunk = np.arange(start, min(start + chunk_size, total))
+            else:
+                chunk = rows[start:start+chunk_size]
+            if self.order is not None:
+                chunk = self.order[chunk]
+            yield _table(self.observations, OBSERVATION_COLUMNS, chunk)
+
+    def query_mpc(self, number):
+        if self.orbits is None:
+            return query_mpc_object(number)
+        result = self.orbits.get(int(number))
+        if result is None:
+            return []
+        return [result]
+
+
+def get_backend():
+    """
+    Returns:
+        Backend: Default backend of Asteroid and AsteroidCatalog, GaiaBackend
+            unless changed with set_backend
+    """
+    global _backend
+    if _backend is None:
+        _backend = GaiaBackend()
+    return _backend
+
+def set_backend(backend):
+    """
+    Sets default backend of Asteroid and AsteroidCatalog.
+
+    Args:
+        backend (Backend): New default backend. None restores GaiaBackend.
+    """
+    global _backend
+    _backend = backend
+
+def launch_query(query, async_job=False):
+    """
+    Runs ADQL query on Gaia archive. Results are served from the query cache
+    if it is enabled.
+
+    Args:
+        query (string): ADQL query
+        async_job (bool): Whether to run query as asynchronous job, which is
+            not limited in number of rows.
+
+    Returns:
+        Table: Table of results from query job
+    """
+    def job():
+        from astroquery.gaia import Gaia
+        if async_job:
+            return Gaia.launch_job_async(query).get_results()
+        return Gaia.launch_job(query).get_results()
+
+    def run():
+        return request('gaia', job)
+    cache = get_cache()
+    if cache is None:
+        return run()
+    return cache.fetch('gaia', query, run)
+
+def query_mpc_object(number):
+    """
+    Queries MPC for asteroid given its number. Results are served from the
+    query cache if it is enabled.
+
+    Args:
+        number (int): Minor Planet number attributed by MPC.
+
+    Returns:
+        list: List of dicts of orbit data from MPC
+    """
+    def job():
+        from astroquery.mpc import MPC
+        return MPC.query_object('asteroid', number=number)
+
+    def run():
+        return request('mpc', job)
+    cache = get_cache()
+    if cache is None:
+        return run()
+    return cache.fetch('mpc', {'target_type': 'asteroid', 'number': int(number)}, run)
+
+def read_columns(dump):
+    """
+    Reads columns of a bulk dump, memory-mapping them where the format allows.
+
+    Args:
+        dump (string or Table): Path of CSV, FITS or Parquet file, directory of
+            .npy column files, or astropy Table.
+
+    Returns:
+        dict: Mapping of column name to ndarray
+    """
+    if not isinstance(dump, (str, os.PathLike)):
+        return {name: np.asarray(dump[name]) for name in dump.colnames}
+    path = os.fspath(dump)
+    if os.path.isdir(path):
+        return {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+                for name in sorted(os.listdir(path)) if name.endswith('.npy')}
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Reading Parquet dumps requires pyarrow.')
+        table = pq.read_table(path, memory_map=True)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    from astropy.table import Table
+    if path.endswith(('.fits', '.fit', '.fits.gz')):
+        return read_columns(Table.read(path, format='fits', memmap=True))
+    if path.endswith(('.csv', '.csv.gz')):
+        return read_columns(Table.read(path, format='ascii.csv'))
+    return read_columns(Table.read(path))
+
+def write_columns(dump, directory, sort_by=('source_id',)):
+    """
+    Writes bulk dump as directory of .npy column files, which LocalBackend
+    memory-maps. Rows are sorted so that LocalBackend can look them up by
+    binary search without an index.
+
+    Args:
+        dump (string or Table): Bulk dump readable by read_columns.
+        directory (string): Directory to write columns to.
+        sort_by (tuple of string): Columns to sort rows by, most significant first.
+    """
+    columns = read_columns(dump)
+    keys = [np.asarray(columns[name]) for name in reversed(sort_by) if name in columns]
+    order = np.lexsort(keys) if len(keys) > 0 else None
+    os.makedirs(directory, exist_ok=True)
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        if order is not None:
+            values = values[order]
+        np.save(os.path.join(directory, name + '.npy'), values)
+
+def _pack(ids, counts, max_ids, max_rows):
+    """
+    Packs ids into chunks of at most max_ids ids and, where possible, at most
+    max_rows total count. Yields each chunk with its total count.
+    """
+    chunk = []
+    rows = 0
+    for value, count in zip(ids, counts):
+        if len(chunk) > 0 and (len(chunk) >= max_ids or rows + count > max_rows):
+            yield chunk, rows
+            chunk = []
+            rows = 0
+        chunk.append(value)
+        rows += count
+    if len(chunk) > 0:
+        yield chunk, rows
+
+def _where(column, values):
+    """Formats ADQL condition matching column to any of values."""
+    values = list(values)
+    if len(values) == 1:
+        return '{}={}'.format(column, _format_values(values))
+    return '{} IN ({})'.format(column, _format_values(values))
+
+def _after(last):
+    """Formats ADQL condition selecting rows after (source_id, observation_id) in keyset order."""
+    return '(source_id > {0} OR (source_id = {0} AND observation_id > {1}))'.format(*last)
+
+def _format_values(values):
+    """Formats list of identifiers for ADQL."""
+    formatted = []
+    for value in values:
+        if isinstance(value, (str, bytes, np.str_, np.bytes_)):
+            if isinstance(value, (bytes, np.bytes_)):
+                value = value.decode()
+            formatted.append('\'{}\''.format(value.replace('\'', '\'\'')))
+        else:
+            formatted.append(str(int(value)))
+    return ', '.join(formatted)
+
+def _lower(values):
+    """Returns stripped lowercase strings of array of str or bytes."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'S':
+        values = np.char.decode(values)
+    return np.char.lower(np.char.strip(values.astype(str)))
+
+def _ranges(starts, ends):
+    """Concatenates integer ranges [starts[i], ends[i]) into one array."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.array([], dtype=np.int64)
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(total, dtype=np.int64) + shifts
+
+def _table(columns, names, rows):
+    """Builds astropy Table from given rows of columns."""
+    from astropy.table import Table
+    return Table([np.asarray(columns[name])[rows] for name in names], names=names)
@@ -0,0 +1,219 @@
+import os
+import time
+import pickle
+import hashlib
+import sqlite3
+import threading
+from .instrument import enabled, record
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.asteroidal', 'cache')
+DEFAULT_MAX_SIZE = 2**30
+
+_cache = None
+
+class OfflineCacheMiss(LookupError):
+    """Raised when a query is not cached and the cache is in offline mode."""
+
+
+class QueryCache(object):
+    """
+    Persistent on-disk cache of Gaia and MPC query results.
+
+    Results are stored in a SQLite database in directory, keyed on the kind of
+    query and its normalized parameters (ADQL text or MPC arguments). Entries
+    older than ttl are refetched, and least recently used entries are evicted
+    once the cache grows past max_size bytes.
+
+    Args:
+        directory (string): Directory to store cache database in.
+        ttl (float): Seconds until entries expire. None never expires entries,
+            which is safe for immutable data releases like Gaia DR2.
+        max_size (int): Maximum total size of cached results in bytes.
+        offline (bool): Only serve results from cache, never query the network.
+
+    Attributes:
+        path (string): Path of cache database.
+        hits (int): Number of queries served from cache.
+        misses (int): Number of queries not found in cache.
+        lock (Lock): Guards hits and misses, as queries may be fetched from
+            many threads, see Fetcher.
+    """
+    def __init__(self, directory=None, ttl=None, max_size=DEFAULT_MAX_SIZE, offline=False):
+        if directory is None:
+            directory = DEFAULT_DIRECTORY
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, 'queries.sqlite')
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                            key TEXT PRIMARY KEY, kind TEXT, value BLOB,
+                            size INTEGER, created REAL, accessed REAL)""")
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def key(self, kind, params):
+        """
+        Returns cache key of query.
+
+        Args:
+            kind (string): Kind of query, e.g. 'gaia' or 'mpc'.
+            params (string or dict): ADQL text or query arguments.
+
+        Returns:
+            string: Hex digest of kind and normalized params
+        """
+        if isinstance(params, dict):
+            params = repr(sorted(params.items()))
+        normalized = '{}:{}'.format(kind, ' '.join(str(params).split()))
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, kind, params):
+        """
+        Returns cached result of query.
+
+        Args:
+            kind (string): Kind of query, e.g. 'gaia' or 'mpc'.
+            params (string or dict): ADQL text or query arguments.
+
+        Returns:
+            tuple: Whether query was found, and its result (None if not found)
+        """
+        key = self.key(kind, params)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, created FROM entries WHERE key=?', (key,)).fetchone()
+            expired = row is not None and self.ttl is not None and now - row[1] > self.ttl
+            if row is None or (expired and not self.offline):
+                with self.lock:
+                    self.misses += 1
+                return False, None
+            conn.execute('UPDATE entries SET accessed=? WHERE key=?', (now, key))
+        with self.lock:
+            self.hits += 1
+        return True, pickle.loads(row[0])
+
+    def set(self, kind, params, value):
+        """
+        Stores result of query and evicts least recently used entries if cache
+        is larger than max_size.
+
+        Args:
+            kind (string): Kind of query, e.g. 'gaia' or 'mpc'.
+            params (string or dict): ADQL text or query arguments.
+            value (object): Picklable result of query.
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                         (self.key(kind, params), kind, blob, len(blob), now, now))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_size:
+            return
+        stale = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            if total <= self.max_size:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key=?', stale)
+
+    def fetch(self, kind, params, query):
+        """
+        Returns cached result of query, running and caching it on a miss.
+
+        Args:
+            kind (string): Kind of query, e.g. 'gaia' or 'mpc'.
+            params (string or dict): ADQL text or query arguments.
+            query (callable): Function without arguments that runs the query.
+
+        Returns:
+            object: Result of query
+
+        Raises:
+            OfflineCacheMiss: If query is not cached and cache is offline.
+        """
+        found, value = self.get(kind, params)
+        if enabled():
+            record({'type': 'cache', 'name': kind, 'hit': found})
+        if found:
+            return value
+        if self.offline:
+            raise OfflineCacheMiss('Query not in cache and cache is offline: {}'.format(' '.join(str(params).split())))
+        value = query()
+        self.set(kind, params, value)
+        return value
+
+    def size(self):
+        """
+        Returns:
+            int: Total size of cached results in bytes
+        """
+        with self._connect() as conn:
+            return conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hits, misses, number of entries and size in bytes of cache
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self), 'size': self.size()}
+
+    def clear(self):
+        """Removes all entries from cache and resets counters."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries')
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def enable_cache(directory=None, **kwargs):
+    """
+    Enables query cache used by Asteroid and AsteroidCatalog.
+
+    Args:
+        directory (string): Directory to store cache in.
+        **kwargs: Passed on to QueryCache (ttl, max_size, offline).
+
+    Returns:
+        QueryCache: Enabled cache
+    """
+    global _cache
+    _cache = QueryCache(directory, **kwargs)
+    return _cache
+
+def disable_cache():
+    """Disables query cache, querying the network for every request."""
+    global _cache
+    _cache = None
+
+def get_cache():
+    """
+    Returns enabled query cache. If no cache was enabled and the environment
+    variable ASTEROIDAL_CACHE_DIR is set, enables a cache in that directory
+    (offline if ASTEROIDAL_OFFLINE is set).
+
+    Returns:
+        QueryCache: Enabled cache, or None if caching is disabled
+    """
+    if _cache is None and os.environ.get('ASTEROIDAL_CACHE_DIR'):
+        return enable_cache(os.environ['ASTEROIDAL_CACHE_DIR'],
+                            offline=bool(os.environ.get('ASTEROIDAL_OFFLINE')))
+    return _cache
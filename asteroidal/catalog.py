@@ -0,0 +1,321 @@
+import numpy as np
+from astropy.table import Table, vstack
+from .store import CatalogStore
+from .backends import get_backend, SOURCE_COLUMNS, _pack
+from .fetch import Fetcher
+from .instrument import timed
+from .transits import summarize_transits, transit_stats
+
+SEARCH_COLS = ('number_mp', 'denomination', 'source_id')
+
+class AsteroidCatalog(object):
+    """
+    Collection of asteroids in Gaia.sso_source loaded in bulk.
+
+    Identifiers are resolved with one query against gaiadr2.sso_source per
+    identifier type, and observations of every asteroid are pulled with as few
+    queries against gaiadr2.sso_observation as the row limit of the backend
+    allows. Results are
+    kept in a CatalogStore, and members of the catalog are AsteroidView objects
+    reading from it, so every Asteroid method works on them while memory scales
+    with the number of observations rather than the number of asteroids.
+
+    Args:
+        number_mp (list of int): Minor Planet numbers attributed by MPC.
+        denomination (list of string): Names of asteroids in MPC database.
+        source_id (list of int): Unique source identifiers from gaia_source.
+        mpc (bool): Whether to query MPC for orbit data of every asteroid.
+        max_ids (int): Maximum number of identifiers in a single query.
+            Defaults to backend.max_ids.
+        max_rows (int): Maximum number of observation rows in a single synchronous
+            query. Larger chunks are run as asynchronous jobs. Defaults to
+            backend.max_rows.
+        fetcher (Fetcher): Runs Gaia and MPC queries concurrently, with rate
+            limiting and retries. Defaults to Fetcher().
+        backend (Backend): Data source to query. Defaults to get_backend().
+        columns (tuple of string): Columns of observations to fetch. Defaults to
+            OBSERVATION_COLUMNS.
+
+    Attributes:
+        store (CatalogStore): Columnar storage of all asteroids, in the order requested.
+
+    """
+    def __init__(self, number_mp=None, denomination=None, source_id=None,
+                 mpc=True, max_ids=None, max_rows=None, fetcher=None, backend=None,
+                 columns=None):
+        self.backend = get_backend() if backend is None else backend
+        self.max_ids = self.backend.max_ids if max_ids is None else max_ids
+        self.max_rows = self.backend.max_rows if max_rows is None else max_rows
+        self.fetcher = Fetcher() if fetcher is None else fetcher
+        self.columns = columns
+        requested = {'number_mp': number_mp, 'denomination': denomination,
+                     'source_id': source_id}
+        sources = []
+        for search_col in SEARCH_COLS:
+            values = requested[search_col]
+            if values is not None and len(values) > 0:
+                sources.append(self.query_sources(search_col, values))
+        source = self.set_sources(sources)
+        self.set_asteroids(source, self.query_observations(source))
+        if mpc:
+            self.store.query_orbits(self.fetcher)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def __getitem__(self, index):
+        return self.store[index]
+
+    @classmethod
+    def load(cls, directory, mmap=True, fetcher=None, backend=None):
+        """
+        Loads catalog saved with save without querying Gaia.
+
+        Args:
+            directory (string): Directory catalog was saved to.
+            mmap (bool): Whether to memory-map observations instead of reading
+                them into memory.
+            fetcher (Fetcher): Runs MPC queries of orbits not saved with catalog.
+            backend (Backend): Data source to query MPC with. Defaults to get_backend().
+
+        Returns:
+            AsteroidCatalog: Loaded catalog
+        """
+        backend = get_backend() if backend is None else backend
+        return cls.from_store(CatalogStore.load(directory, mmap=mmap, backend=backend),
+                              fetcher=fetcher, backend=backend)
+
+    @classmethod
+    def from_store(cls, store, fetcher=None, backend=None):
+        """
+        Creates catalog of asteroids in store without querying Gaia, e.g. from
+        a local mirror, see sync.Mirror.to_catalog.
+
+        Args:
+            store (CatalogStore): Store of asteroids.
+            fetcher (Fetcher): Runs MPC queries of orbits not in store.
+            backend (Backend): Data source to query MPC with. Defaults to
+                store.backend, then get_backend().
+
+        Returns:
+            AsteroidCatalog: Catalog of asteroids in store
+        """
+        catalog = cls.__new__(cls)
+        if backend is None:
+            backend = get_backend() if store.backend is None else store.backend
+        catalog.backend = backend
+        catalog.max_ids = catalog.backend.max_ids
+        catalog.max_rows = catalog.backend.max_rows
+        catalog.columns = None
+        catalog.fetcher = Fetcher() if fetcher is None else fetcher
+        store.backend = backend
+        catalog.store = store
+        return catalog
+
+    def save(self, directory):
+        """
+        Saves catalog, including orbit data queried so far, as .npy files.
+
+        Args:
+            directory (string): Directory to save catalog to.
+        """
+        self.store.save(directory)
+
+    @property
+    def asteroids(self):
+        """list of AsteroidView: Asteroids found in Gaia, in the order requested."""
+        return list(self.store)
+
+    @property
+    def source(self):
+        """Table: Results from gaiadr2.sso_source for all asteroids."""
+        return Table(self.store.source, copy=False)
+
+    @property
+    def observations(self):
+        """Table: Results from gaiadr2.sso_observation for all asteroids, grouped by asteroid."""
+        return Table(self.store.observations, copy=False)
+
+    @timed('catalog.query_sources')
+    def query_sources(self, search_col, values):
+        """
+        Queries gaiadr2.sso_source for all asteroids given list of number_mp,
+        denomination, or source_id. Prints asteroids not found in Gaia.
+
+        Args:
+            search_col (string): Specifies which column name to query by.
+                Either 'number_mp', 'denomination', or 'source_id'
+            values (list): Values of search_col to query for.
+
+        Returns:
+            Table: Table of results from query jobs including source_id, num_of_obs, number_mp, denomination
+        """
+        if search_col not in SEARCH_COLS:
+            print('Not Valid Column Name.')
+            return Table()
+        chunks = list(_chunks(list(values), self.max_ids))
+        results = vstack(self.fetcher.map(
+            lambda chunk: self.backend.query_sources(search_col, chunk), chunks))
+
+        found = set(_normalize(v) for v in results[search_col])
+        for value in values:
+            if _normalize(value) not in found:
+                print('Asteroid {} does not exist in Gaia.'.format(value))
+        order = {}
+        for i, value in enumerate(values):
+            order.setdefault(_normalize(value), i)
+        rank = [order[_normalize(v)] for v in results[search_col]]
+        return results[np.argsort(rank, kind='stable')]
+
+    def set_sources(self, sources):
+        """
+        Combines results of querying gaiadr2.sso_source by different columns,
+        dropping asteroids found more than once.
+
+        Args:
+            sources (list of Table): Tables of results from query_sources.
+
+        Returns:
+            Table: Table of unique results including source_id, num_of_obs, number_mp, denomination
+        """
+        if len(sources) == 0:
+            return Table(names=SOURCE_COLUMNS, dtype=('i8', 'i4', 'i8', 'U32'))
+        source = vstack(sources)
+        _, first = np.unique(np.asarray(source['source_id']), return_index=True)
+        return source[np.sort(first)]
+
+    @timed('catalog.query_observations')
+    def query_observations(self, source):
+        """
+        Queries gaiadr2.sso_observation for all observations of every asteroid in
+        catalog. Source ids are packed into chunks by num_of_obs so that each
+        query stays within max_ids and max_rows.
+
+        Args:
+            source (Table): Results from gaiadr2.sso_source, see set_sources.
+
+        Returns:
+            Table: Table of results from query jobs including source_id, observation_id, number_mp, epoch, ra, dec
+        """
+        source_ids = np.asarray(source['source_id'])
+        num_of_obs = np.asarray(source['num_of_obs'])
+        jobs = list(_pack(source_ids, num_of_obs, self.max_ids, self.max_rows))
+        columns = self.columns
+        if columns is not None:
+            columns = [name for name in ('source_id', 'observation_id') if name not in columns] + list(columns)
+        results = self.fetcher.map(
+            lambda job: self.backend.query_observations(job[0], async_job=job[1] > self.max_rows,
+                                                        columns=columns), jobs)
+        if len(results) == 0:
+            return Table()
+        return vstack(results)
+
+    @timed('catalog.query_transit_summary')
+    def query_transit_summary(self):
+        """
+        Queries one row per transit of every asteroid in catalog, aggregated by
+        the backend, in as few queries as query_observations.
+
+        Returns:
+            Table: Table of transits including source_id, transit_id, n_obs, ra, dec,
+                epoch_min, epoch_max, sorted by source_id and transit_id
+        """
+        source_ids = np.asarray(self.store.source['source_id'])
+        num_of_obs = np.asarray(self.store.source['num_of_obs'])
+        jobs = list(_pack(source_ids, num_of_obs, self.max_ids, self.max_rows))
+        results = self.fetcher.map(
+            lambda job: self.backend.query_transit_summary(job[0], async_job=job[1] > self.max_rows), jobs)
+        if len(results) == 0:
+            return summarize_transits([])
+        summary = vstack(results)
+        return summary[np.lexsort((np.asarray(summary['transit_id']), np.asarray(summary['source_id'])))]
+
+    @timed('catalog.transit_stats')
+    def transit_stats(self):
+        """
+        Computes statistics of every transit of every asteroid in catalog in one
+        pass over the stored observations, see transits.transit_stats.
+
+        Returns:
+            Table: One row per transit, sorted by source_id and transit_id
+        """
+        return transit_stats(self.observations)
+
+    @timed('catalog.set_asteroids')
+    def set_asteroids(self, source, observations):
+        """
+        Packs source and observations tables into the store of the catalog.
+
+        Args:
+            source (Table): Results from gaiadr2.sso_source, see set_sources.
+            observations (Table): Results from gaiadr2.sso_observation, see
+                query_observations.
+
+        Returns:
+            CatalogStore: Store of all asteroids in catalog
+        """
+        self.store = CatalogStore.from_tables(source, observations, backend=self.backend)
+        return self.store
+
+    @timed('catalog.residuals')
+    def residuals(self, orbits=None):
+        """
+        Predicts positions of all asteroids at all their observations and
+        computes observed minus computed residuals in one vectorized pass, see
+        kepler.residual_table.
+
+        Args:
+            orbits (OrbitIndex): Local orbit elements to look up all asteroids at
+                once. Defaults to the elements in the store, querying MPC
+                concurrently only for asteroids not queried yet.
+
+        Returns:
+            Table: Table with source_id, epoch, ra_pred, dec_pred, d_ra and d_dec
+                in mas, in the order of observations
+        """
+        from .kepler import residual_table, ELEMENT_FIELDS
+        if orbits is not None:
+            orbit_elements = orbits.elements(np.asarray(self.store.source['number_mp']))
+        else:
+            orbit_elements = np.array(self.store.query_orbits(self.fetcher), dtype=np.float64)
+            orbit_elements[orbit_elements[:, 0] == 0] = np.nan
+        orbit_elements = np.reshape(orbit_elements, (len(self.store), len(ELEMENT_FIELDS)))
+        counts = np.diff(self.store.offsets)
+        result = residual_table(self.observations, np.repeat(orbit_elements, counts, axis=0))
+        result.add_column(np.asarray(self.store.observations['source_id']), name='source_id', index=0)
+        return result
+
+    def get(self, number_mp=0, denomination='', source_id=0):
+        """
+        Returns asteroid in catalog given number_mp, denomination, or source_id.
+
+        Args:
+            number_mp (int): Minor Planet number attributed by MPC.
+            denomination (string): Name of asteroid in MPC database.
+            source_id (int): Unique source identifier from gaia_source.
+
+        Returns:
+            AsteroidView: Matching asteroid, or None if not in catalog.
+        """
+        index = self.store.find(number_mp=number_mp, denomination=denomination,
+                                source_id=source_id)
+        if index < 0:
+            return None
+        return self.store[index]
+
+
+def _normalize(value):
+    """Normalizes identifier for matching query results to requested values."""
+    if isinstance(value, (str, bytes, np.str_, np.bytes_)):
+        if isinstance(value, (bytes, np.bytes_)):
+            value = value.decode()
+        return value.strip().lower()
+    return int(value)
+
+def _chunks(values, size):
+    """Splits list into chunks of at most size elements."""
+    for start in range(0, len(values), size):
+        yield values[start:start+size]
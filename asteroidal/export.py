@@ -0,0 +1,234 @@
+import os
+import re
+import sys
+import argparse
+import numpy as np
+
+KINDS = ('transits', 'orbit', 'observations')
+
+_worker = {}
+
+def export_figures(asteroids, directory, kinds=('transits', 'orbit'), fmt='png', dpi=100,
+                   processes=None, backend=None, store=None, overwrite=False,
+                   maxtasksperchild=200, progress=None):
+    """
+    Renders figures of many asteroids to files in a pool of processes.
+
+    Each process renders with the Agg backend onto one reused Figure, without
+    pyplot, so no figures accumulate, and processes are replaced after
+    maxtasksperchild asteroids to bound their memory. Figures are written to a
+    temporary file and renamed when complete, and existing files are skipped
+    unless overwrite is set, so an interrupted export resumes where it stopped.
+
+    Args:
+        asteroids (list): Minor Planet numbers (int) or names (string) of asteroids.
+        directory (string): Directory to write figures to, as
+            {asteroid}_{kind}.{fmt}.
+        kinds (tuple of string): Figures to render per asteroid: 'transits'
+            (plot_all_transits), 'orbit' (plot_orbits) or 'observations'
+            (plot_observations).
+        fmt (string): File format, e.g. 'png' or 'pdf'.
+        dpi (int): Resolution of figures.
+        processes (int): Number of processes. Defaults to number of cores.
+        backend (Backend): Data source asteroids are queried from in each
+            process. Defaults to get_backend().
+        store (string): Directory of a saved CatalogStore to read asteroids from
+            instead of querying them, see AsteroidCatalog.save.
+        overwrite (bool): Whether to render figures whose file already exists.
+        maxtasksperchild (int): Number of asteroids after which a process is replaced.
+        progress (callable): Called as progress(done, total) after each asteroid.
+
+    Returns:
+        list: Tuple of asteroid, kind, path and status ('written', 'skipped',
+            'empty' or error message) of every figure
+    """
+    for kind in kinds:
+        if kind not in KINDS:
+            raise ValueError('Not Valid Figure Kind: {}'.format(kind))
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    tasks = []
+    for asteroid in asteroids:
+        paths = {kind: figure_path(directory, asteroid, kind, fmt) for kind in kinds}
+        todo = [kind for kind in kinds if overwrite or not os.path.exists(paths[kind])]
+        results.extend((asteroid, kind, paths[kind], 'skipped') for kind in kinds if kind not in todo)
+        if len(todo) > 0:
+            tasks.append((asteroid, tuple(todo), directory, fmt, dpi))
+
+    total = len(tasks)
+    if total == 0:
+        return results
+    pool = None
+    if processes == 1:
+        _setup(backend, store)
+        rendered = map(render, tasks)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(backend, store),
+                                    maxtasksperchild=maxtasksperchild)
+        rendered = pool.imap_unordered(render, tasks)
+    try:
+        for done, figures in enumerate(rendered, 1):
+            results.extend(figures)
+            if progress is not None:
+                progress(done, total)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return results
+
+def figure_path(directory, asteroid, kind, fmt):
+    """
+    Args:
+        directory (string): Directory of figures.
+        asteroid (int or string): Minor Planet number or name of asteroid.
+        kind (string): Kind of figure.
+        fmt (string): File format.
+
+    Returns:
+        string: Path of figure
+    """
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', str(asteroid).strip())
+    return os.path.join(directory, '{}_{}.{}'.format(name, kind, fmt))
+
+def render(task):
+    """
+    Renders figures of one asteroid in a worker process, see export_figures.
+
+    Args:
+        task (tuple): Asteroid, kinds, directory, fmt and dpi.
+
+    Returns:
+        list: Tuple of asteroid, kind, path and status of each figure
+    """
+    asteroid, kinds, directory, fmt, dpi = task
+    results = []
+    try:
+        loaded = _load(asteroid)
+    except Exception as error:
+        return [(asteroid, kind, figure_path(directory, asteroid, kind, fmt),
+                 '{}: {}'.format(type(error).__name__, error)) for kind in kinds]
+    fig = _worker['figure']
+    for kind in kinds:
+        path = figure_path(directory, asteroid, kind, fmt)
+        fig.clear()
+        try:
+            if draw(loaded, kind, fig) is None:
+                results.append((asteroid, kind, path, 'empty'))
+                continue
+            temporary = os.path.join(directory, '.{}.{}.tmp'.format(os.path.basename(path), os.getpid()))
+            fig.savefig(temporary, format=fmt, dpi=dpi)
+            os.replace(temporary, path)
+            results.append((asteroid, kind, path, 'written'))
+        except Exception as error:
+            results.append((asteroid, kind, path, '{}: {}'.format(type(error).__name__, error)))
+    fig.clear()
+    return results
+
+def draw(asteroid, kind, fig):
+    """
+    Draws figure of asteroid onto cleared fig, resizing it like the plot
+    methods size their own figures.
+
+    Args:
+        asteroid (Asteroid): Asteroid to plot.
+        kind (string): Kind of figure, see export_figures.
+        fig (Figure): Figure to draw onto.
+
+    Returns:
+        object: Result of plot method, None if there was nothing to plot
+    """
+    if kind == 'transits':
+        size = 2 + 2*int(np.ceil(np.sqrt(len(asteroid.transits))))
+        fig.set_size_inches(size, size)
+        return asteroid.plot_all_transits(fig=fig)
+    if kind == 'orbit':
+        if asteroid.number_mp == 0:
+            return None
+        fig.set_size_inches(10, 10)
+        return asteroid.plot_orbits(ax=fig.add_subplot(projection='polar'))
+    fig.set_size_inches(7, 7)
+    return asteroid.plot_observations(ax=fig.add_subplot())
+
+def main(argv=None):
+    """Command line interface to export figures of many asteroids."""
+    parser = argparse.ArgumentParser(prog='asteroidal-export',
+                                     description='Render figures of many asteroids in parallel.')
+    parser.add_argument('asteroids', nargs='*', help='Minor Planet numbers or names of asteroids')
+    parser.add_argument('-i', '--input', help='file with one asteroid number or name per line')
+    parser.add_argument('-o', '--output', required=True, help='directory to write figures to')
+    parser.add_argument('-k', '--kinds', nargs='+', default=['transits', 'orbit'], choices=KINDS,
+                        help='figures to render per asteroid')
+    parser.add_argument('-f', '--format', default='png', help='file format, e.g. png or pdf')
+    parser.add_argument('--dpi', type=int, default=100, help='resolution of figures')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='number of processes')
+    parser.add_argument('--store', help='directory of saved catalog to read asteroids from')
+    parser.add_argument('--overwrite', action='store_true', help='render figures that already exist')
+    args = parser.parse_args(argv)
+
+    asteroids = list(args.asteroids)
+    if args.input is not None:
+        with open(args.input) as f:
+            asteroids.extend(line.strip() for line in f if line.strip())
+    asteroids = [int(a) if str(a).isdigit() else a for a in asteroids]
+
+    def progress(done, total):
+        sys.stderr.write('\r{}/{} asteroids'.format(done, total))
+        if done == total:
+            sys.stderr.write('\n')
+
+    results = export_figures(asteroids, args.output, kinds=tuple(args.kinds), fmt=args.format,
+                             dpi=args.dpi, processes=args.processes, store=args.store,
+                             overwrite=args.overwrite, progress=progress)
+    statuses = [status for asteroid, kind, path, status in results]
+    failed = [result for result in results if result[3] not in ('written', 'skipped', 'empty')]
+    for asteroid, kind, path, status in failed:
+        print('Failed {} of {}: {}'.format(kind, asteroid, status))
+    print('Exported {} figures, skipped {} existing, {} empty, {} failed.'.format(
+        statuses.count('written'), statuses.count('skipped'), statuses.count('empty'), len(failed)))
+    return 1 if len(failed) > 0 else 0
+
+def _init_worker(backend, store):
+    """Sets up Agg rendering, reused figure and data source of a worker process."""
+    import matplotlib
+    matplotlib.use('Agg')
+    _setup(backend, store)
+
+def _setup(backend, store):
+    """
+    Sets up reused figure and data source of the current process. Figures are
+    drawn without pyplot, so the matplotlib backend of the process is kept.
+    """
+    from matplotlib.figure import Figure
+    from .backends import get_backend
+    _worker['figure'] = Figure()
+    _worker['backend'] = get_backend() if backend is None else backend
+    _worker['store'] = None
+    if store is not None:
+        from .store import CatalogStore
+        _worker['store'] = CatalogStore.load(store, backend=_worker['backend'])
+
+def _load(asteroid):
+    """
+    Loads asteroid by number or name from the store or backend of the worker.
+    Asteroids from the backend are lazy, so only the queries needed by the
+    figures rendered are run.
+    """
+    from .asteroid import Asteroid
+    store = _worker['store']
+    is_number = isinstance(asteroid, (int, np.integer))
+    if store is not None:
+        if is_number:
+            index = store.find(number_mp=int(asteroid))
+        else:
+            index = store.find(denomination=str(asteroid))
+        if index < 0:
+            raise LookupError('Asteroid {} is not in store.'.format(asteroid))
+        return store[index]
+    if is_number:
+        return Asteroid(number_mp=int(asteroid), lazy=True, backend=_worker['backend'])
+    return Asteroid(denomination=str(asteroid), lazy=True, backend=_worker['backend'])
+
+if __name__ == '__main__':
+    sys.exit(main())
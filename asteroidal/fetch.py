@@ -0,0 +1,168 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .backends import query_mpc_object
+
+LOCAL_ERRORS = (FileNotFoundError, FileExistsError, PermissionError,
+                IsADirectoryError, NotADirectoryError)
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket limiting the rate of requests.
+
+    Args:
+        rate (float): Tokens added per second.
+        burst (int): Maximum number of tokens, i.e. requests allowed at once.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher(object):
+    """
+    Runs many Gaia and MPC requests concurrently in a thread pool.
+
+    Requests are limited to max_workers at once and, if rate is given, to rate
+    requests per second. Requests failing with a transient error (connection
+    errors, timeouts and server errors) are retried with exponential backoff.
+
+    Args:
+        max_workers (int): Maximum number of requests running at once.
+        rate (float): Maximum number of requests started per second. None does
+            not limit the rate.
+        burst (int): Number of requests that may start at once under the rate limit.
+        retries (int): Number of times a failing request is retried.
+        backoff (float): Seconds to wait before the first retry, doubled for
+            every further retry.
+        max_backoff (float): Maximum seconds to wait between retries.
+        progress (callable): Called as progress(done, total) after each request
+            of a map completes.
+
+    Attributes:
+        requests (int): Number of requests started, including retries.
+        failures (int): Number of requests that failed with a transient error.
+    """
+    def __init__(self, max_workers=4, rate=None, burst=1, retries=3, backoff=0.5,
+                 max_backoff=30, progress=None):
+        self.max_workers = max_workers
+        self.bucket = None if rate is None else TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.progress = progress
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs single request under the rate limit, retrying transient errors.
+
+        Args:
+            func (callable): Function running the request.
+            *args, **kwargs: Passed on to func.
+
+        Returns:
+            object: Result of func
+        """
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self.lock:
+                self.requests += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                if attempt >= self.retries or not is_transient(error):
+                    raise
+                with self.lock:
+                    self.failures += 1
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            time.sleep(delay * random.uniform(0.5, 1))
+            attempt += 1
+
+    def map(self, func, items):
+        """
+        Runs func on every item concurrently.
+
+        Args:
+            func (callable): Function running the request for one item.
+            items (iterable): Items to run requests for.
+
+        Returns:
+            list: Results of func in the order of items
+        """
+        items = list(items)
+        total = len(items)
+        if total == 0:
+            return []
+        done = [0]
+
+        def run(item):
+            result = self.call(func, item)
+            if self.progress is not None:
+                with self.lock:
+                    done[0] += 1
+                    count = done[0]
+                self.progress(count, total)
+            return result
+
+        if self.max_workers <= 1 or total == 1:
+            return [run(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            return list(executor.map(run, items))
+
+
+def is_transient(error):
+    """
+    Returns whether error is worth retrying: network errors (OSError, which
+    includes connection errors and timeouts, apart from local file errors) and
+    HTTP errors with a 429 or 5xx status code.
+
+    Args:
+        error (Exception): Error raised by a request.
+
+    Returns:
+        bool: Whether request should be retried
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, OSError) and not isinstance(error, LOCAL_ERRORS)
+
+def fetch_mpc(numbers, fetcher=None):
+    """
+    Queries MPC for many asteroids concurrently.
+
+    Args:
+        numbers (list of int): Minor Planet numbers attributed by MPC.
+        fetcher (Fetcher): Fetcher to run queries with. Defaults to Fetcher().
+
+    Returns:
+        list: Lists of dicts of orbit data from MPC in the order of numbers
+    """
+    if fetcher is None:
+        fetcher = Fetcher()
+    return fetcher.map(query_mpc_object, numbers)
@@ -0,0 +1,120 @@
+import functools
+import numpy as np
+
+THETA_STEP = 0.01
+
+@functools.lru_cache(maxsize=8)
+def theta_grid(step=THETA_STEP):
+    """
+    Returns angular grid orbits are drawn on, and its cosine. Both are cached
+    and read-only, so they are computed once per step.
+
+    Args:
+        step (float): Spacing of grid in radians.
+
+    Returns:
+        tuple: ndarray of theta from 0 to 2 pi, ndarray of cos(theta)
+    """
+    theta = np.arange(0, 2*np.pi, step)
+    cos = np.cos(theta)
+    theta.flags.writeable = False
+    cos.flags.writeable = False
+    return theta, cos
+
+def orbit_radii(orbit_params, step=THETA_STEP):
+    """
+    Computes radius of many orbits on the angular grid at once.
+
+    Args:
+        orbit_params (ndarray): Orbit parameters (semimajor axis, eccentricity)
+            of one orbit, or array of shape (N, 2) for N orbits.
+        step (float): Spacing of angular grid in radians.
+
+    Returns:
+        ndarray: Radii of shape (N, len(theta)) in AU
+    """
+    params = np.atleast_2d(np.asarray(orbit_params, dtype=np.float64))
+    a = params[:, 0:1]
+    e = params[:, 1:2]
+    theta, cos = theta_grid(step)
+    return a*(1.-e**2)/(1.+e*cos)
+
+def plot_orbit_collection(ax, orbit_params, color='purple', label=None, lw=1, alp=0.3, step=THETA_STEP):
+    """
+    Plots many orbits as a single LineCollection in polar coordinates.
+
+    Args:
+        ax (axes): Polar axes to plot onto
+        orbit_params (ndarray): Array of shape (N, 2) of orbit parameters
+            (semimajor axis, eccentricity)
+        color (string): Color of orbit plots
+        label (string): Label of collection as seen in legend
+        lw (float): Linewidth of orbit plots
+        alp (float within 0-1): Alpha value of orbit plots
+        step (float): Spacing of angular grid in radians.
+
+    Returns:
+        LineCollection: Collection of all orbits
+    """
+    from matplotlib.collections import LineCollection
+    radii = orbit_radii(orbit_params, step)
+    theta, cos = theta_grid(step)
+    segments = np.empty(radii.shape + (2,))
+    segments[:, :, 0] = theta
+    segments[:, :, 1] = radii
+    collection = LineCollection(segments, colors=color, linewidths=lw, alpha=alp, label=label)
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    return collection
+
+def orbit_density(orbit_params, rmax=None, bins=(360, 200), step=THETA_STEP, chunk=10000):
+    """
+    Counts orbit grid points falling into each polar bin, for drawing very many
+    orbits as a density map. Orbits are processed in chunks to bound memory.
+
+    Args:
+        orbit_params (ndarray): Array of shape (N, 2) of orbit parameters
+            (semimajor axis, eccentricity)
+        rmax (float): Outer radius of map in AU. Defaults to largest aphelion.
+        bins (tuple of int): Number of bins in theta and radius.
+        step (float): Spacing of angular grid in radians.
+        chunk (int): Number of orbits processed at once.
+
+    Returns:
+        tuple: ndarray of counts of shape bins, theta bin edges, radius bin edges
+    """
+    params = np.atleast_2d(np.asarray(orbit_params, dtype=np.float64))
+    if rmax is None:
+        rmax = np.max(params[:, 0] * (1 + params[:, 1])) if len(params) > 0 else 1.
+    theta_edges = np.linspace(0, 2*np.pi, bins[0] + 1)
+    r_edges = np.linspace(0, rmax, bins[1] + 1)
+    theta, cos = theta_grid(step)
+    theta_bin = np.minimum((theta / (2*np.pi) * bins[0]).astype(np.int64), bins[0] - 1)
+    counts = np.zeros(bins[0] * bins[1], dtype=np.int64)
+    for start in range(0, len(params), chunk):
+        radii = orbit_radii(params[start:start+chunk], step)
+        r_bin = (radii / rmax * bins[1]).astype(np.int64)
+        inside = r_bin < bins[1]
+        flat = (theta_bin * bins[1] + r_bin)[inside]
+        counts += np.bincount(flat, minlength=len(counts))
+    return counts.reshape(bins), theta_edges, r_edges
+
+def plot_orbit_density(ax, orbit_params, rmax=None, bins=(360, 200), cmap='magma', step=THETA_STEP):
+    """
+    Plots many orbits as a density map in polar coordinates, for catalogs too
+    large to draw as lines.
+
+    Args:
+        ax (axes): Polar axes to plot onto
+        orbit_params (ndarray): Array of shape (N, 2) of orbit parameters
+            (semimajor axis, eccentricity)
+        rmax (float): Outer radius of map in AU. Defaults to largest aphelion.
+        bins (tuple of int): Number of bins in theta and radius.
+        cmap (string): Colormap of density map
+        step (float): Spacing of angular grid in radians.
+
+    Returns:
+        QuadMesh: Density map
+    """
+    counts, theta_edges, r_edges = orbit_density(orbit_params, rmax, bins, step)
+    return ax.pcolormesh(theta_edges, r_edges, np.log1p(counts).T, cmap=cmap, shading='flat')
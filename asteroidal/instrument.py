@@ -0,0 +1,192 @@
+import json
+import time
+import threading
+import functools
+import contextlib
+
+_active = []
+_lock = threading.Lock()
+
+class Stats(object):
+    """
+    Statistics of Asteroid loads collected while instrumentation is enabled,
+    see collect.
+
+    Phases are timed inclusively, so time of a phase running inside another
+    phase (e.g. query_mpc inside plot_orbits) counts towards both. Bytes are
+    the in-memory size of decoded results, as the archive clients do not expose
+    the size of responses.
+
+    Args:
+        callback (callable): Called as callback(event) with a dict describing
+            every phase, request and cache lookup as it is recorded.
+
+    Attributes:
+        phases (dict): Number of calls and total seconds of each phase.
+        requests (dict): Number of round trips, rows, bytes and total seconds
+            of requests to each service ('gaia' or 'mpc').
+        cache (dict): Number of cache hits and misses.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all statistics."""
+        with self.lock:
+            self.phases = {}
+            self.requests = {}
+            self.cache = {'hits': 0, 'misses': 0}
+
+    @property
+    def round_trips(self):
+        """int: Total number of requests to Gaia and MPC."""
+        return sum(request['count'] for request in self.requests.values())
+
+    def record(self, event):
+        """
+        Adds event to statistics and passes it on to callback.
+
+        Args:
+            event (dict): Event with 'type' of 'phase', 'request' or 'cache'.
+        """
+        with self.lock:
+            if event['type'] == 'phase':
+                phase = self.phases.setdefault(event['name'], {'calls': 0, 'seconds': 0.})
+                phase['calls'] += 1
+                phase['seconds'] += event['seconds']
+            elif event['type'] == 'request':
+                request = self.requests.setdefault(event['name'], {'count': 0, 'rows': 0, 'bytes': 0, 'seconds': 0.})
+                request['count'] += 1
+                request['rows'] += event['rows']
+                request['bytes'] += event['bytes']
+                request['seconds'] += event['seconds']
+            elif event['type'] == 'cache':
+                self.cache['hits' if event['hit'] else 'misses'] += 1
+        if self.callback is not None:
+            self.callback(event)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Copy of phases, requests, cache and total round_trips
+        """
+        with self.lock:
+            return {'phases': {name: dict(phase) for name, phase in self.phases.items()},
+                    'requests': {name: dict(request) for name, request in self.requests.items()},
+                    'cache': dict(self.cache),
+                    'round_trips': sum(request['count'] for request in self.requests.values())}
+
+    def to_json(self, **kwargs):
+        """
+        Args:
+            **kwargs: Passed on to json.dumps.
+
+        Returns:
+            string: Statistics as JSON
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+@contextlib.contextmanager
+def collect(callback=None, stats=None):
+    """
+    Context manager recording statistics of everything run inside it, in all
+    threads. Instrumentation costs nothing outside of collect.
+
+    Args:
+        callback (callable): Called as callback(event) for every event, see Stats.
+        stats (Stats): Stats to add to, e.g. to accumulate over many jobs.
+            Defaults to new Stats.
+
+    Yields:
+        Stats: Statistics collected so far
+    """
+    if stats is None:
+        stats = Stats(callback)
+    elif callback is not None:
+        stats.callback = callback
+    with _lock:
+        _active.append(stats)
+    try:
+        yield stats
+    finally:
+        with _lock:
+            _active.remove(stats)
+
+def enabled():
+    """
+    Returns:
+        bool: Whether statistics are being collected
+    """
+    return len(_active) > 0
+
+def record(event):
+    """
+    Records event in every active Stats.
+
+    Args:
+        event (dict): Event with 'type' of 'phase', 'request' or 'cache'.
+    """
+    for stats in list(_active):
+        stats.record(event)
+
+def timed(name):
+    """
+    Decorator recording wall time of function as phase name while statistics
+    are being collected.
+
+    Args:
+        name (string): Name of phase.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record({'type': 'phase', 'name': name, 'seconds': time.perf_counter() - start})
+        return wrapper
+    return decorate
+
+def request(name, run):
+    """
+    Runs request to Gaia or MPC, recording a round trip with its rows, bytes
+    and wall time while statistics are being collected.
+
+    Args:
+        name (string): Service requested, 'gaia' or 'mpc'.
+        run (callable): Function without arguments running the request.
+
+    Returns:
+        object: Result of run
+    """
+    if not _active:
+        return run()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    record({'type': 'request', 'name': name, 'seconds': seconds,
+            'rows': _rows(result), 'bytes': _nbytes(result)})
+    return result
+
+def _rows(result):
+    """Returns number of rows of Table or list result."""
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+def _nbytes(result):
+    """Returns in-memory size of decoded result."""
+    columns = getattr(result, 'columns', None)
+    if columns is not None:
+        return int(sum(getattr(column, 'nbytes', 0) for column in columns.values()))
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
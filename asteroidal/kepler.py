@@ -0,0 +1,257 @@
+import numpy as np
+
+GAIA_EPOCH_JD = 2455197.5
+GAUSS_K = 0.01720209895
+OBLIQUITY = np.radians(23.4392911)
+SPEED_OF_LIGHT = 173.1446326846693
+MAS_PER_DEG = 3600000.
+L_B = 1.550519768e-8
+TDB0 = -6.55e-5
+T0_JD = 2443144.5003725
+
+ELEMENT_FIELDS = ('semimajor_axis', 'eccentricity', 'inclination', 'ascending_node',
+                  'argument_of_perihelion', 'mean_anomaly', 'epoch_jd', 'mean_daily_motion')
+
+def elements(mpc_data):
+    """
+    Returns osculating elements of asteroid from orbit data as returned by MPC.
+
+    Args:
+        mpc_data (dict): Orbit data of asteroid, see Asteroid.mpc_data.
+
+    Returns:
+        ndarray: Elements in the order of ELEMENT_FIELDS: semimajor axis (AU),
+            eccentricity, inclination, longitude of ascending node, argument of
+            perihelion and mean anomaly (deg), epoch (JD, TT) and mean daily motion
+            (deg/day). NaN for fields missing from mpc_data.
+    """
+    values = np.full(len(ELEMENT_FIELDS), np.nan)
+    for i, field in enumerate(ELEMENT_FIELDS):
+        value = mpc_data.get(field) if mpc_data else None
+        if value is not None and value != '':
+            values[i] = float(value)
+    return values
+
+def solve_kepler(mean_anomaly, eccentricity, tol=1e-12, max_iter=50):
+    """
+    Solves Kepler's equation M = E - e sin E for the eccentric anomaly E with
+    Newton iterations over whole arrays at once.
+
+    Args:
+        mean_anomaly (ndarray): Mean anomalies in radians.
+        eccentricity (ndarray): Eccentricities below 1, broadcast against mean_anomaly.
+        tol (float): Largest correction of E in radians at which iterations stop.
+        max_iter (int): Maximum number of iterations.
+
+    Returns:
+        ndarray: Eccentric anomalies in radians
+    """
+    M = np.remainder(mean_anomaly, 2*np.pi)
+    e = np.broadcast_to(eccentricity, M.shape)
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(max_iter):
+        delta = (E - e*np.sin(E) - M) / (1 - e*np.cos(E))
+        E = E - delta
+        if not np.any(np.abs(delta) > tol):
+            break
+    return E
+
+def heliocentric_positions(orbit_elements, jd):
+    """
+    Propagates two-body orbits to given times.
+
+    Args:
+        orbit_elements (ndarray): Elements of shape (8,) or (N, 8), see elements.
+        jd (ndarray): Julian dates (TDB) of shape (N,), each propagated with
+            the corresponding row of orbit_elements.
+
+    Returns:
+        ndarray: Heliocentric ecliptic J2000 positions of shape (N, 3) in AU
+    """
+    el = np.atleast_2d(orbit_elements)
+    a, e = el[:, 0], el[:, 1]
+    i, node, peri, M0 = (np.radians(el[:, k]) for k in range(2, 6))
+    motion = np.where(np.isnan(el[:, 7]), GAUSS_K * a**-1.5, np.radians(el[:, 7]))
+    E = solve_kepler(M0 + motion*(np.asarray(jd) - el[:, 6]), e)
+    x = a*(np.cos(E) - e)
+    y = a*np.sqrt(1 - e**2)*np.sin(E)
+    cos_w, sin_w = np.cos(peri), np.sin(peri)
+    cos_n, sin_n = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    return np.column_stack([
+        (cos_w*cos_n - sin_w*sin_n*cos_i)*x + (-sin_w*cos_n - cos_w*sin_n*cos_i)*y,
+        (cos_w*sin_n + sin_w*cos_n*cos_i)*x + (-sin_w*sin_n + cos_w*cos_n*cos_i)*y,
+        sin_w*sin_i*x + cos_w*sin_i*y,
+    ])
+
+def ecliptic_to_equatorial(positions):
+    """
+    Rotates positions from ecliptic to equatorial J2000 coordinates.
+
+    Args:
+        positions (ndarray): Positions of shape (N, 3).
+
+    Returns:
+        ndarray: Positions of shape (N, 3)
+    """
+    cos_e, sin_e = np.cos(OBLIQUITY), np.sin(OBLIQUITY)
+    x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
+    return np.column_stack([x, cos_e*y - sin_e*z, sin_e*y + cos_e*z])
+
+def solar_system_positions(jd_tdb, step=1.0):
+    """
+    Returns barycentric equatorial positions of the Earth and Sun from the
+    ephemeris of erfa.epv00, which astropy uses as its built-in ephemeris.
+
+    The ephemeris is evaluated once per step days and interpolated with cubic
+    Hermite polynomials using its velocities, which is accurate to 1e-9 AU for
+    a step of one day, so that millions of epochs cost a few hundred
+    ephemeris evaluations.
+
+    Args:
+        jd_tdb (ndarray): Julian dates (TDB).
+        step (float): Spacing of ephemeris grid in days.
+
+    Returns:
+        tuple: Positions of Earth and Sun of shape (N, 3) in AU
+    """
+    import erfa
+    jd_tdb = np.atleast_1d(np.asarray(jd_tdb, dtype=np.float64))
+    if len(jd_tdb) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    start = np.floor(np.min(jd_tdb))
+    size = int(np.ceil((np.max(jd_tdb) - start) / step)) + 2
+    if size >= len(jd_tdb):
+        heliocentric, barycentric = erfa.epv00(jd_tdb, 0.0)
+        return barycentric['p'], barycentric['p'] - heliocentric['p']
+    grid = start + step*np.arange(size)
+    heliocentric, barycentric = erfa.epv00(grid, 0.0)
+    index = np.minimum(((jd_tdb - start) // step).astype(np.int64), size - 2)
+    s = ((jd_tdb - grid[index]) / step)[:, None]
+    h00 = 2*s**3 - 3*s**2 + 1
+    h10 = s**3 - 2*s**2 + s
+    h01 = 3*s**2 - 2*s**3
+    h11 = s**3 - s**2
+
+    def interpolate(p, v):
+        return h00*p[index] + h10*step*v[index] + h01*p[index+1] + h11*step*v[index+1]
+    earth = interpolate(barycentric['p'], barycentric['v'])
+    sun = interpolate(barycentric['p'] - heliocentric['p'], barycentric['v'] - heliocentric['v'])
+    return earth, sun
+
+def tcb_to_tdb(jd_tcb):
+    """
+    Converts TCB to TDB with the linear relation defining TDB (IAU 2006
+    resolution B3). TDB is used in place of TT for propagating MPC elements,
+    as they differ by less than 2 ms.
+
+    Args:
+        jd_tcb (ndarray): Julian dates (TCB).
+
+    Returns:
+        ndarray: Julian dates (TDB)
+    """
+    jd_tcb = np.asarray(jd_tcb, dtype=np.float64)
+    return jd_tcb - L_B*(jd_tcb - T0_JD) + TDB0/86400.
+
+def predict(orbit_elements, epoch, observer=None, sun=None, light_time=True):
+    """
+    Predicts RA and Dec of asteroids at Gaia epochs by two-body propagation of
+    their MPC elements. Many asteroids are predicted at once by passing one row
+    of orbit_elements per epoch.
+
+    Gaia epochs are TCB days since JD 2455197.5. Positions of Gaia are taken
+    from observer, e.g. the x_gaia, y_gaia, z_gaia columns of sso_observation.
+    Without them, the geocentre is used, which is about 0.01 AU from Gaia and
+    shifts predictions of main belt asteroids by up to tens of arcminutes.
+
+    Args:
+        orbit_elements (ndarray): Elements of shape (8,) or (N, 8), see elements.
+        epoch (ndarray): Gaia epochs of shape (N,).
+        observer (ndarray): Barycentric equatorial positions of Gaia of shape
+            (N, 3) in AU. Defaults to positions of the Earth.
+        sun (ndarray): Barycentric equatorial positions of the Sun of shape
+            (N, 3) in AU. Defaults to positions from the erfa ephemeris.
+        light_time (bool): Whether to correct for light travel time.
+
+    Returns:
+        tuple: Predicted RA and Dec in degrees
+    """
+    epoch = np.atleast_1d(np.asarray(epoch, dtype=np.float64))
+    orbit_elements = np.atleast_2d(orbit_elements)
+    if len(orbit_elements) == 1 and len(epoch) > 1:
+        orbit_elements = np.repeat(orbit_elements, len(epoch), axis=0)
+    jd = tcb_to_tdb(epoch + GAIA_EPOCH_JD)
+    if observer is None or sun is None:
+        earth, ephemeris_sun = solar_system_positions(jd)
+        observer = earth if observer is None else observer
+        sun = ephemeris_sun if sun is None else sun
+    observer = np.asarray(observer, dtype=np.float64)
+    sun = np.asarray(sun, dtype=np.float64)
+    delay = np.zeros(len(epoch))
+    for _ in range(2 if light_time else 1):
+        position = ecliptic_to_equatorial(heliocentric_positions(orbit_elements, jd - delay)) + sun
+        direction = position - observer
+        delay = np.sqrt(np.sum(direction**2, axis=1)) / SPEED_OF_LIGHT
+    ra = np.degrees(np.arctan2(direction[:, 1], direction[:, 0])) % 360
+    dec = np.degrees(np.arcsin(direction[:, 2] / np.sqrt(np.sum(direction**2, axis=1))))
+    return ra, dec
+
+def residuals(ra, dec, ra_pred, dec_pred):
+    """
+    Returns observed minus computed positions.
+
+    Args:
+        ra, dec (ndarray): Observed RA and Dec in degrees.
+        ra_pred, dec_pred (ndarray): Predicted RA and Dec in degrees.
+
+    Returns:
+        tuple: Residuals in RA (times cos Dec) and Dec in mas
+    """
+    ra = np.asarray(ra, dtype=np.float64)
+    dec = np.asarray(dec, dtype=np.float64)
+    d_ra = ((ra - ra_pred + 180) % 360 - 180) * np.cos(np.radians(dec)) * MAS_PER_DEG
+    d_dec = (dec - dec_pred) * MAS_PER_DEG
+    return d_ra, d_dec
+
+def observer_positions(observations):
+    """
+    Returns positions of Gaia from observations if x_gaia, y_gaia, z_gaia were
+    fetched, see Asteroid.query_observations.
+
+    Args:
+        observations (Table): Observations of asteroids.
+
+    Returns:
+        ndarray: Barycentric equatorial positions of shape (N, 3) in AU, or None
+    """
+    if not all(name in observations.colnames for name in ('x_gaia', 'y_gaia', 'z_gaia')):
+        return None
+    return np.column_stack([np.asarray(observations[name], dtype=np.float64)
+                            for name in ('x_gaia', 'y_gaia', 'z_gaia')])
+
+def residual_table(observations, orbit_elements, light_time=True):
+    """
+    Predicts positions of asteroids at all their observations and computes
+    residuals, in one vectorized pass over the observations.
+
+    Args:
+        observations (Table): Observations including epoch, ra and dec, and
+            x_gaia, y_gaia, z_gaia if available.
+        orbit_elements (ndarray): Elements of shape (8,) for one asteroid, or
+            (len(observations), 8) with the elements of each observation.
+        light_time (bool): Whether to correct for light travel time.
+
+    Returns:
+        Table: Table with epoch, ra_pred, dec_pred, and residuals d_ra (times
+            cos Dec) and d_dec in mas
+    """
+    from astropy.table import Table
+    names = ('epoch', 'ra_pred', 'dec_pred', 'd_ra', 'd_dec')
+    if len(observations) == 0:
+        return Table(names=names, dtype=('f8',)*len(names))
+    epoch = np.asarray(observations['epoch'], dtype=np.float64)
+    ra_pred, dec_pred = predict(orbit_elements, epoch, observer_positions(observations),
+                                light_time=light_time)
+    d_ra, d_dec = residuals(observations['ra'], observations['dec'], ra_pred, dec_pred)
+    return Table([epoch, ra_pred, dec_pred, d_ra, d_dec], names=names)
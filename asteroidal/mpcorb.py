@@ -0,0 +1,477 @@
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+import numpy as np
+
+ORBIT_DTYPE = np.dtype([
+    ('number', 'i8'),
+    ('designation', 'S7'),
+    ('readable', 'S28'),
+    ('epoch_jd', 'f8'),
+    ('mean_anomaly', 'f8'),
+    ('argument_of_perihelion', 'f8'),
+    ('ascending_node', 'f8'),
+    ('inclination', 'f8'),
+    ('eccentricity', 'f8'),
+    ('mean_daily_motion', 'f8'),
+    ('semimajor_axis', 'f8'),
+    ('absolute_magnitude', 'f8'),
+    ('phase_slope', 'f8'),
+])
+
+# 1-based inclusive columns of MPCORB.DAT fields, see
+# https://www.minorplanetcenter.net/iau/info/MPOrbitFormat.html
+FIELDS = {
+    'absolute_magnitude': (9, 13),
+    'phase_slope': (15, 19),
+    'mean_anomaly': (27, 35),
+    'argument_of_perihelion': (38, 46),
+    'ascending_node': (49, 57),
+    'inclination': (60, 68),
+    'eccentricity': (71, 79),
+    'mean_daily_motion': (81, 91),
+    'semimajor_axis': (93, 103),
+}
+LINE_LENGTH = 202
+
+_BASE62 = np.full(256, -1, dtype=np.int64)
+_BASE62[np.frombuffer(b'0123456789', np.uint8)] = np.arange(10)
+_BASE62[np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', np.uint8)] = np.arange(10, 36)
+_BASE62[np.frombuffer(b'abcdefghijklmnopqrstuvwxyz', np.uint8)] = np.arange(36, 62)
+_CHARS62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+_CENTURIES = {'I': 18, 'J': 19, 'K': 20}
+
+class OrbitIndex(object):
+    """
+    Local table of MPC orbit elements indexed by number and designation.
+
+    Orbits are stored in a structured NumPy array (see ORBIT_DTYPE) with
+    numbered asteroids first, sorted by number, so an asteroid is found by
+    binary search. Saved indexes are memory-mapped on load.
+
+    Can be passed as orbits to LocalBackend or GaiaBackend in place of querying
+    MPC for every asteroid.
+
+    Args:
+        orbits (ndarray): Structured array of orbits with dtype ORBIT_DTYPE.
+
+    Attributes:
+        orbits (ndarray): Structured array of orbits with numbered asteroids
+            first, sorted by number.
+    """
+    def __init__(self, orbits):
+        self.orbits = orbits
+        self._numbers = None
+        self._names = None
+
+    def __len__(self):
+        return len(self.orbits)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads index saved with save or ingest.
+
+        Args:
+            path (string): Path of .npy file.
+            mmap (bool): Whether to memory-map the file instead of reading it.
+
+        Returns:
+            OrbitIndex: Loaded index
+        """
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Parses MPCORB.DAT or mpcorb_extended.json (optionally gzipped) into index.
+
+        Args:
+            path (string): Path of MPC orbit file.
+
+        Returns:
+            OrbitIndex: Index of all orbits in file
+        """
+        return cls(_sort(parse_file(path)))
+
+    def save(self, path):
+        """
+        Saves index as .npy file.
+
+        Args:
+            path (string): Path of .npy file.
+        """
+        np.save(path, np.asarray(self.orbits))
+
+    @property
+    def numbers(self):
+        """ndarray of int: Numbers of numbered asteroids, sorted."""
+        if self._numbers is None:
+            numbers = np.array(self.orbits['number'])
+            self._numbers = numbers[:np.count_nonzero(numbers > 0)]
+        return self._numbers
+
+    def elements(self, numbers):
+        """
+        Returns osculating elements of many asteroids at once, see kepler.elements.
+
+        Args:
+            numbers (ndarray of int): Minor Planet numbers attributed by MPC.
+
+        Returns:
+            ndarray: Array of shape (len(numbers), 8) of elements in the order of
+                kepler.ELEMENT_FIELDS, NaN for asteroids not in index
+        """
+        from .kepler import ELEMENT_FIELDS
+        positions = self.find(numbers)
+        found = positions >= 0
+        data = np.full((len(positions), len(ELEMENT_FIELDS)), np.nan)
+        rows = self.orbits[positions[found]]
+        for i, field in enumerate(ELEMENT_FIELDS):
+            data[found, i] = rows[field]
+        return data
+
+    def find(self, numbers):
+        """
+        Returns positions of asteroids in orbits given their numbers.
+
+        Args:
+            numbers (ndarray of int): Minor Planet numbers attributed by MPC.
+
+        Returns:
+            ndarray: Positions in orbits, -1 for asteroids not in index
+        """
+        numbers = np.asarray(numbers, dtype=np.int64)
+        if len(self.numbers) == 0:
+            return np.full(len(numbers), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.numbers, numbers), len(self.numbers) - 1)
+        found = (self.numbers[positions] == numbers) & (numbers > 0)
+        return np.where(found, positions, -1)
+
+    def find_designation(self, designation):
+        """
+        Returns position of asteroid in orbits given its name, readable or
+        packed designation.
+
+        Args:
+            designation (string): Name (e.g. 'Flora'), readable designation
+                (e.g. '2014 AA') or packed designation (e.g. 'K14A00A').
+
+        Returns:
+            int: Position in orbits, -1 if not in index
+        """
+        if self._names is None:
+            readable = np.char.strip(np.char.decode(np.asarray(self.orbits['readable'])))
+            names = np.char.lower(np.char.partition(readable, ') ')[:, 2])
+            names = np.where(np.char.startswith(readable, '('), names, np.char.lower(readable))
+            packed = np.char.decode(np.char.strip(np.asarray(self.orbits['designation'])))
+            keys = np.concatenate([names, packed])
+            order = np.argsort(keys, kind='stable')
+            self._names = (keys[order], order % len(self.orbits))
+        keys, positions = self._names
+        designation = designation.strip()
+        for key in (designation.lower(), designation):
+            i = np.searchsorted(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return int(positions[i])
+        return -1
+
+    def get(self, number, default=None):
+        """
+        Returns orbit data of asteroid in the form returned by MPC.query_object.
+
+        Args:
+            number (int or string): Minor Planet number, name or designation.
+            default (object): Returned if asteroid is not in index.
+
+        Returns:
+            dict: Orbit data of asteroid
+        """
+        if isinstance(number, str):
+            position = self.find_designation(number)
+        else:
+            position = int(self.find([number])[0])
+        if position < 0:
+            return default
+        return orbit_dict(self.orbits[position])
+
+    def orbit_data(self, numbers):
+        """
+        Returns semimajor axis and eccentricity of many asteroids at once.
+
+        Args:
+            numbers (ndarray of int): Minor Planet numbers attributed by MPC.
+
+        Returns:
+            ndarray: Array of shape (len(numbers), 2) of (semimajor axis,
+                eccentricity), zeros for asteroids not in index
+        """
+        positions = self.find(numbers)
+        found = positions >= 0
+        data = np.zeros((len(positions), 2))
+        rows = self.orbits[positions[found]]
+        data[found, 0] = rows['semimajor_axis']
+        data[found, 1] = rows['eccentricity']
+        return data
+
+
+def orbit_dict(row):
+    """
+    Converts row of orbit index into dict in the form returned by MPC.query_object.
+
+    Args:
+        row (np.void): Row of structured array with dtype ORBIT_DTYPE.
+
+    Returns:
+        dict: Orbit data of asteroid
+    """
+    readable = row['readable'].decode().strip()
+    name = readable.split(') ', 1)[1] if readable.startswith('(') else None
+    result = {'number': int(row['number']) if row['number'] > 0 else None,
+              'name': name,
+              'designation': readable if name is None else None}
+    for field in ORBIT_DTYPE.names[3:]:
+        result[field] = float(row[field])
+    return result
+
+def parse_mpcorb(data):
+    """
+    Parses contents of MPCORB.DAT with vectorized fixed-width column slicing.
+
+    Args:
+        data (bytes): Contents of MPCORB.DAT, with or without its header.
+
+    Returns:
+        ndarray: Structured array of orbits with dtype ORBIT_DTYPE, in file order
+    """
+    header = data.find(b'\n-----')
+    if header >= 0:
+        data = data[data.index(b'\n', header + 1) + 1:]
+    lines = np.array(data.split(b'\n'), dtype='S{}'.format(LINE_LENGTH))
+    lines = lines[np.char.str_len(lines) >= FIELDS['semimajor_axis'][1]]
+    raw = lines.view(np.uint8).reshape(-1, LINE_LENGTH)
+
+    orbits = np.zeros(len(raw), dtype=ORBIT_DTYPE)
+    for field, (start, end) in FIELDS.items():
+        orbits[field] = _floats(raw[:, start-1:end])
+    orbits['designation'] = np.char.strip(_strings(raw[:, 0:7]))
+    orbits['readable'] = np.char.strip(_strings(raw[:, 166:194]))
+    orbits['number'] = _unpack_numbers(raw[:, 0:7])
+    orbits['epoch_jd'] = _unpack_epochs(raw[:, 20:25])
+    return orbits
+
+def parse_json(records):
+    """
+    Parses records of mpcorb_extended.json.
+
+    Args:
+        records (list of dict): Orbit records as in mpcorb_extended.json.
+
+    Returns:
+        ndarray: Structured array of orbits with dtype ORBIT_DTYPE, in file order
+    """
+    keys = {'absolute_magnitude': 'H', 'phase_slope': 'G', 'epoch_jd': 'Epoch',
+            'mean_anomaly': 'M', 'argument_of_perihelion': 'Peri',
+            'ascending_node': 'Node', 'inclination': 'i', 'eccentricity': 'e',
+            'mean_daily_motion': 'n', 'semimajor_axis': 'a'}
+    orbits = np.zeros(len(records), dtype=ORBIT_DTYPE)
+    for field, key in keys.items():
+        orbits[field] = [record.get(key, np.nan) for record in records]
+    numbers = []
+    designations = []
+    readables = []
+    for record in records:
+        number = int(record['Number'].strip('()')) if record.get('Number') else 0
+        principal = record.get('Principal_desig', '')
+        numbers.append(number)
+        designations.append(pack_number(number) if number > 0 else pack_designation(principal))
+        if number > 0:
+            readables.append('({}) {}'.format(number, record.get('Name', principal)))
+        else:
+            readables.append(principal)
+    orbits['number'] = numbers
+    orbits['designation'] = designations
+    orbits['readable'] = readables
+    return orbits
+
+def parse_file(path):
+    """
+    Parses MPCORB.DAT or mpcorb_extended.json, optionally gzipped.
+
+    Args:
+        path (string): Path of MPC orbit file.
+
+    Returns:
+        ndarray: Structured array of orbits with dtype ORBIT_DTYPE, in file order
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as file:
+        data = file.read()
+    if path.endswith(('.json', '.json.gz')):
+        return parse_json(json.loads(data))
+    return parse_mpcorb(data)
+
+def pack_number(number):
+    """
+    Packs Minor Planet number as in MPCORB.DAT, e.g. 1 as '00001' and
+    100001 as 'A0001'.
+
+    Args:
+        number (int): Minor Planet number attributed by MPC.
+
+    Returns:
+        string: Packed number
+    """
+    if number < 100000:
+        return '{:05d}'.format(number)
+    if number < 620000:
+        return _CHARS62[number // 10000] + '{:04d}'.format(number % 10000)
+    number -= 620000
+    digits = ''
+    for i in range(4):
+        digits = _CHARS62[number % 62] + digits
+        number //= 62
+    return '~' + digits
+
+def pack_designation(designation):
+    """
+    Packs provisional designation as in MPCORB.DAT, e.g. '2014 AA12' as 'K14A12A'.
+    Designations that do not follow the provisional format are returned unchanged.
+
+    Args:
+        designation (string): Readable provisional designation.
+
+    Returns:
+        string: Packed designation
+    """
+    match = re.match(r'^(1[89]|20)(\d\d) ([A-Z])([A-Z])(\d*)$', designation.strip())
+    if match is None:
+        survey = re.match(r'^(\d{4}) (P-L|T-[123])$', designation.strip())
+        if survey is None:
+            return designation.strip()[:7]
+        return survey.group(2).replace('-', '')[0] + survey.group(2)[-1] + 'S' + survey.group(1)
+    century, year, half_month, letter, cycle = match.groups()
+    cycle = int(cycle) if cycle else 0
+    century = {'18': 'I', '19': 'J', '20': 'K'}[century]
+    return '{}{}{}{}{}{}'.format(century, year, half_month, _CHARS62[cycle // 10], cycle % 10, letter)
+
+def ingest(path, output):
+    """
+    Parses MPC orbit file and saves its index.
+
+    Args:
+        path (string): Path of MPCORB.DAT or mpcorb_extended.json, optionally gzipped.
+        output (string): Path of .npy file to save index to.
+
+    Returns:
+        OrbitIndex: Index of all orbits in file
+    """
+    index = OrbitIndex.from_file(path)
+    index.save(output)
+    return index
+
+def refresh(path, output):
+    """
+    Updates saved index from newer MPC orbit file. Changed records are
+    rewritten in place in the memory-mapped index; the index is only rewritten
+    completely if records were added or removed.
+
+    Args:
+        path (string): Path of MPCORB.DAT or mpcorb_extended.json, optionally gzipped.
+        output (string): Path of .npy file of index to update.
+
+    Returns:
+        dict: Number of changed, added, removed and unchanged records
+    """
+    if not os.path.exists(output) or len(np.load(output, mmap_mode='r')) == 0:
+        index = ingest(path, output)
+        return {'changed': 0, 'added': len(index), 'removed': 0, 'unchanged': 0}
+    new = parse_file(path)
+    existing = np.load(output, mmap_mode='r+')
+    keys = np.asarray(existing['designation'])
+    order = np.argsort(keys)
+    positions = np.minimum(np.searchsorted(keys[order], new['designation']), len(keys) - 1)
+    matched = keys[order][positions] == new['designation']
+    rows = order[positions[matched]]
+    changed = _records(existing[rows]) != _records(new[matched])
+    counts = {'changed': int(np.count_nonzero(changed)),
+              'added': int(np.count_nonzero(~matched)),
+              'removed': len(existing) - len(np.unique(rows)),
+              'unchanged': int(np.count_nonzero(~changed))}
+    if counts['added'] > 0 or counts['removed'] > 0:
+        del existing
+        np.save(output, _sort(new))
+    elif counts['changed'] > 0:
+        existing[rows[changed]] = new[matched][changed]
+        existing.flush()
+    return counts
+
+def main(argv=None):
+    """Command line interface to ingest and refresh local orbit index."""
+    parser = argparse.ArgumentParser(prog='asteroidal-mpcorb',
+                                     description='Build local index of MPC orbit elements.')
+    parser.add_argument('command', choices=('ingest', 'refresh'),
+                        help='ingest builds a new index, refresh only rewrites changed records')
+    parser.add_argument('path', help='MPCORB.DAT or mpcorb_extended.json, optionally gzipped')
+    parser.add_argument('output', help='.npy file of index')
+    args = parser.parse_args(argv)
+    if args.command == 'ingest':
+        index = ingest(args.path, args.output)
+        print('Ingested {} orbits into {}.'.format(len(index), args.output))
+    else:
+        counts = refresh(args.path, args.output)
+        print('Refreshed {output}: {changed} changed, {added} added, {removed} removed, '
+              '{unchanged} unchanged.'.format(output=args.output, **counts))
+    return 0
+
+def _strings(columns):
+    """Converts 2-D uint8 array of fixed-width columns into array of bytes."""
+    columns = np.ascontiguousarray(columns)
+    return columns.view('S{}'.format(columns.shape[1])).ravel()
+
+def _floats(columns):
+    """Converts 2-D uint8 array of fixed-width columns into floats, nan if blank."""
+    values = _strings(columns)
+    values[~((columns >= ord('0')) & (columns <= ord('9'))).any(axis=1)] = b'nan'
+    return values.astype(np.float64)
+
+def _unpack_numbers(columns):
+    """Unpacks numbers of numbered asteroids from packed designations, 0 if unnumbered."""
+    numbered = ((columns[:, 5] == ord(' ')) | (columns[:, 5] == 0)) & (columns[:, 0] != ord(' '))
+    first = _BASE62[columns[:, 0]]
+    rest = _BASE62[columns[:, 1:5]]
+    numbers = first * 10000 + (rest * np.array([1000, 100, 10, 1])).sum(axis=1)
+    tilde = columns[:, 0] == ord('~')
+    numbers[tilde] = 620000 + (rest[tilde] * np.array([62**3, 62**2, 62, 1])).sum(axis=1)
+    return np.where(numbered & (rest.min(axis=1) >= 0), numbers, 0)
+
+def _unpack_epochs(columns):
+    """Unpacks packed epochs (e.g. 'K239D') into Julian dates at 0h TT."""
+    century = np.zeros(len(columns), dtype=np.int64)
+    for letter, value in _CENTURIES.items():
+        century[columns[:, 0] == ord(letter)] = value
+    year = century * 100 + _BASE62[columns[:, 1]] * 10 + _BASE62[columns[:, 2]]
+    month = _BASE62[columns[:, 3]]
+    day = _BASE62[columns[:, 4]]
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    jdn = day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+    return np.where(century > 0, jdn - 0.5, np.nan)
+
+def _sort(orbits):
+    """Sorts orbits with numbered asteroids first by number, then by designation."""
+    order = np.lexsort((orbits['designation'], orbits['number'], orbits['number'] == 0))
+    return orbits[order]
+
+def _records(orbits):
+    """Views structured array as raw bytes per record for exact comparison."""
+    orbits = np.ascontiguousarray(orbits)
+    return orbits.view('V{}'.format(orbits.dtype.itemsize))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import numpy as np
+from .backends import _ranges
+
+HIT_COLUMNS = ('query', 'asteroid', 'source_id', 'transit_id', 'n_obs')
+
+class ObservationIndex(object):
+    """
+    Spatial and temporal index of all observations in a CatalogStore, for
+    finding which asteroids were observed in a region of the sky or a window
+    of time without looping over asteroids.
+
+    Observations are binned into zones of declination and sorted by RA within
+    each zone, so a cone or box query only binary searches the zones it
+    overlaps and tests the observations inside their RA range exactly. A
+    second order sorts observations by epoch for time windows. Query time
+    grows with the number of observations near the query rather than with the
+    size of the catalog.
+
+    All queries take scalars or arrays of queries of equal length and return
+    hits of every query at once, one row per query, asteroid and transit.
+
+    Args:
+        store (CatalogStore): Store of observations, e.g. AsteroidCatalog.store.
+        zone_height (float): Height of declination zones in degrees.
+
+    Attributes:
+        store (CatalogStore): Indexed store.
+        zone_height (float): Height of declination zones in degrees.
+        order (ndarray of int): Rows of observations sorted by zone and RA.
+        zone_offsets (ndarray of int): Start of each zone in order.
+        epoch_order (ndarray of int): Rows of observations sorted by epoch.
+    """
+    def __init__(self, store, zone_height=0.5):
+        self.store = store
+        self.zone_height = float(zone_height)
+        observations = store.observations
+        self.asteroid = np.repeat(np.arange(len(store)), np.diff(store.offsets))
+        self.transit = np.asarray(observations['observation_id'], dtype=np.int64) // 10
+        self.ra = np.asarray(observations['ra'], dtype=np.float64) % 360
+        self.dec = np.asarray(observations['dec'], dtype=np.float64)
+        self.epoch = np.asarray(observations['epoch'], dtype=np.float64)
+        self.n_zones = int(np.ceil(180 / self.zone_height))
+        zone = self._zone(self.dec)
+        self.order = np.lexsort((self.ra, zone))
+        self.sorted_ra = self.ra[self.order]
+        self.zone_offsets = np.searchsorted(zone[self.order], np.arange(self.n_zones + 1))
+        self.epoch_order = np.argsort(self.epoch, kind='stable')
+        self.sorted_epoch = self.epoch[self.epoch_order]
+
+    def __len__(self):
+        return len(self.ra)
+
+    def cone(self, ra, dec, radius, start=None, end=None):
+        """
+        Finds observations within radius of positions, optionally within a
+        window of epochs.
+
+        Args:
+            ra, dec (float or ndarray): Centers of cones in degrees.
+            radius (float or ndarray): Radii of cones in degrees.
+            start, end (float or ndarray): Window of Gaia epochs, inclusive.
+                None leaves the window open.
+
+        Returns:
+            Table: Hits with index of query, index of asteroid in store,
+                source_id, transit_id and number of observations n_obs
+        """
+        ra, dec, radius = (np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in np.broadcast_arrays(ra, dec, radius))
+        queries = np.arange(len(ra))
+        polar = np.abs(dec) + radius >= 90
+        ratio = np.sin(np.radians(radius)) / np.maximum(np.cos(np.radians(dec)), 1e-12)
+        half_width = np.where(polar | (ratio >= 1), 180., np.degrees(np.arcsin(np.minimum(ratio, 1))))
+        query, rows = self._candidates(queries, dec - radius, dec + radius,
+                                       ra - half_width, ra + half_width)
+        d_ra = np.radians(self.ra[rows] - ra[query])
+        dec1 = np.radians(dec[query])
+        dec2 = np.radians(self.dec[rows])
+        haversine = np.sin((dec2 - dec1) / 2)**2 + np.cos(dec1)*np.cos(dec2)*np.sin(d_ra / 2)**2
+        keep = haversine <= np.sin(np.radians(radius[query]) / 2)**2
+        return self._hits(query[keep], rows[keep], start, end, len(queries))
+
+    def box(self, ra_min, ra_max, dec_min, dec_max, start=None, end=None):
+        """
+        Finds observations within ranges of RA and Dec, optionally within a
+        window of epochs. Ranges of RA with ra_min > ra_max wrap around RA = 0.
+
+        Args:
+            ra_min, ra_max (float or ndarray): Ranges of RA in degrees.
+            dec_min, dec_max (float or ndarray): Ranges of Dec in degrees.
+            start, end (float or ndarray): Window of Gaia epochs, inclusive.
+                None leaves the window open.
+
+        Returns:
+            Table: Hits with index of query, index of asteroid in store,
+                source_id, transit_id and number of observations n_obs
+        """
+        arrays = np.broadcast_arrays(ra_min, ra_max, dec_min, dec_max)
+        ra_min, ra_max, dec_min, dec_max = (np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in arrays)
+        ra_min = ra_min % 360
+        ra_max = np.where(ra_max - ra_min >= 360, ra_min + 360, ra_max % 360)
+        ra_max = np.where(ra_max < ra_min, ra_max + 360, ra_max)
+        queries = np.arange(len(ra_min))
+        query, rows = self._candidates(queries, dec_min, dec_max, ra_min, ra_max)
+        keep = (self.dec[rows] >= dec_min[query]) & (self.dec[rows] <= dec_max[query])
+        return self._hits(query[keep], rows[keep], start, end, len(queries))
+
+    def time_window(self, start, end):
+        """
+        Finds observations within windows of epochs.
+
+        Args:
+            start, end (float or ndarray): Windows of Gaia epochs, inclusive.
+
+        Returns:
+            Table: Hits with index of query, index of asteroid in store,
+                source_id, transit_id and number of observations n_obs
+        """
+        start, end = (np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in np.broadcast_arrays(start, end))
+        first = np.searchsorted(self.sorted_epoch, start, side='left')
+        last = np.searchsorted(self.sorted_epoch, end, side='right')
+        last = np.maximum(first, last)
+        query = np.repeat(np.arange(len(start)), last - first)
+        rows = self.epoch_order[_ranges(first, last)]
+        return self._hits(query, rows, None, None, len(start))
+
+    def _zone(self, dec):
+        """Returns index of declination zone of dec."""
+        zone = np.floor((np.asarray(dec) + 90) / self.zone_height).astype(np.int64)
+        return np.clip(zone, 0, self.n_zones - 1)
+
+    def _candidates(self, queries, dec_low, dec_high, ra_low, ra_high):
+        """
+        Returns query and row of every observation in the zones overlapping
+        [dec_low, dec_high] with RA in [ra_low, ra_high], where ranges of RA
+        lie within [-360, 720] and may wrap around RA = 0.
+        """
+        full = ra_high - ra_low >= 360
+        low = np.where(full, 0., ra_low % 360)
+        high = np.where(full, 360., low + (ra_high - ra_low))
+        wrap = high > 360
+        queries = np.concatenate((queries, queries[wrap]))
+        zone_low = self._zone(np.concatenate((dec_low, dec_low[wrap])))
+        zone_high = self._zone(np.concatenate((dec_high, dec_high[wrap])))
+        low = np.concatenate((low, np.zeros(np.count_nonzero(wrap))))
+        high = np.concatenate((np.minimum(high, 360.), high[wrap] - 360))
+
+        found_queries = []
+        found_rows = []
+        if len(queries) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        for zone in range(int(np.min(zone_low)), int(np.max(zone_high)) + 1):
+            inside = np.nonzero((zone_low <= zone) & (zone_high >= zone))[0]
+            zone_start, zone_end = self.zone_offsets[zone], self.zone_offsets[zone+1]
+            if len(inside) == 0 or zone_start == zone_end:
+                continue
+            zone_ra = self.sorted_ra[zone_start:zone_end]
+            first = zone_start + np.searchsorted(zone_ra, low[inside], side='left')
+            last = zone_start + np.searchsorted(zone_ra, high[inside], side='right')
+            found_queries.append(np.repeat(queries[inside], last - first))
+            found_rows.append(self.order[_ranges(first, last)])
+        if len(found_rows) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.concatenate(found_queries), np.concatenate(found_rows)
+
+    def _hits(self, query, rows, start, end, n_queries):
+        """Filters rows by window of epochs and counts them per query, asteroid and transit."""
+        from astropy.table import Table
+        if start is not None:
+            start = np.broadcast_to(np.asarray(start, dtype=np.float64), (n_queries,))
+            keep = self.epoch[rows] >= start[query]
+            query, rows = query[keep], rows[keep]
+        if end is not None:
+            end = np.broadcast_to(np.asarray(end, dtype=np.float64), (n_queries,))
+            keep = self.epoch[rows] <= end[query]
+            query, rows = query[keep], rows[keep]
+        if len(rows) == 0:
+            return Table(names=HIT_COLUMNS, dtype=('i8',)*len(HIT_COLUMNS))
+        asteroid = self.asteroid[rows]
+        transit = self.transit[rows]
+        order = np.lexsort((transit, asteroid, query))
+        query, asteroid, transit = query[order], asteroid[order], transit[order]
+        new = np.concatenate(([True], (query[1:] != query[:-1]) | (asteroid[1:] != asteroid[:-1])
+                              | (transit[1:] != transit[:-1])))
+        starts = np.flatnonzero(new)
+        counts = np.diff(np.append(starts, len(query)))
+        source_id = np.asarray(self.store.source['source_id'])[asteroid[starts]]
+        return Table([query[starts], asteroid[starts], source_id, transit[starts], counts],
+                     names=HIT_COLUMNS)
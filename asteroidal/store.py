@@ -0,0 +1,429 @@
+import os
+import numpy as np
+from .asteroid import Asteroid
+from .backends import get_backend
+from .transits import TransitIndex
+from .instrument import timed
+from .kepler import elements, ELEMENT_FIELDS
+
+SOURCE_DTYPE = np.dtype([
+    ('source_id', 'i8'),
+    ('num_of_obs', 'i4'),
+    ('number_mp', 'i8'),
+    ('denomination', 'U32'),
+])
+
+OBSERVATION_DTYPE = np.dtype([
+    ('source_id', 'i8'),
+    ('observation_id', 'i8'),
+    ('number_mp', 'i8'),
+    ('epoch', 'f8'),
+    ('ra', 'f8'),
+    ('dec', 'f8'),
+])
+
+FILES = ('source', 'observations', 'offsets', 'orbits')
+
+class CatalogStore(object):
+    """
+    Columnar storage of many asteroids, holding the data of a catalog in a few
+    flat arrays instead of one set of tables per asteroid.
+
+    Observations of all asteroids are concatenated into one structured array,
+    grouped by asteroid in the order of source and sorted by transit within each
+    asteroid, so that the observations of asteroid i are
+    observations[offsets[i]:offsets[i+1]]. Asteroids are accessed as
+    AsteroidView objects, which hold only the store and their index.
+
+    Args:
+        source (ndarray): Structured array of sso_source fields, see SOURCE_DTYPE.
+        observations (ndarray): Structured array of observations of all asteroids.
+        offsets (ndarray of int): Start of observations of each asteroid, with
+            the total number of observations appended.
+        orbits (ndarray of float): Array of shape (N, len(ELEMENT_FIELDS)) of
+            orbit elements, see kepler.elements, starting with semimajor axis
+            and eccentricity. NaN for asteroids whose orbit has not been queried
+            yet, 0 for asteroids not in MPC.
+        backend (Backend): Data source to query MPC with. Defaults to get_backend().
+
+    Attributes:
+        source (ndarray): Structured array of sso_source fields.
+        observations (ndarray): Structured array of observations of all asteroids.
+        offsets (ndarray of int): Start of observations of each asteroid.
+        orbits (ndarray of float): Array of shape (N, len(ELEMENT_FIELDS)) of
+            orbit elements.
+        mpc (dict): Orbit data as returned by MPC of each asteroid queried
+            since the store was created, by index.
+        backend (Backend): Data source to query MPC with.
+    """
+    def __init__(self, source, observations, offsets, orbits=None, backend=None):
+        self.source = source
+        self.observations = observations
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if orbits is None:
+            orbits = np.full((len(source), len(ELEMENT_FIELDS)), np.nan)
+        self.orbits = orbits
+        self.mpc = {}
+        self.backend = backend
+        self._transits = None
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.source)
+        if index < 0 or index >= len(self.source):
+            raise IndexError('Asteroid index out of range.')
+        return AsteroidView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.source)):
+            yield AsteroidView(self, index)
+
+    @classmethod
+    def from_tables(cls, source, observations, backend=None):
+        """
+        Builds store from results of gaiadr2.sso_source and gaiadr2.sso_observation
+        for many asteroids.
+
+        Args:
+            source (Table): Results from gaiadr2.sso_source, one row per asteroid.
+            observations (Table): Results from gaiadr2.sso_observation for all
+                asteroids, in any order. Observations of asteroids not in source
+                are dropped.
+            backend (Backend): Data source to query MPC with.
+
+        Returns:
+            CatalogStore: Store of all asteroids in source
+        """
+        packed_source = np.zeros(len(source), dtype=SOURCE_DTYPE)
+        for name in SOURCE_DTYPE.names:
+            if len(source) > 0:
+                packed_source[name] = np.asarray(source[name])
+        if len(observations) == 0 or len(observations.colnames) == 0:
+            packed = np.zeros(0, dtype=OBSERVATION_DTYPE)
+            offsets = np.zeros(len(source) + 1, dtype=np.int64)
+            return cls(packed_source, packed, offsets, backend=backend)
+
+        source_ids = packed_source['source_id']
+        sorter = np.argsort(source_ids, kind='stable')
+        obs_ids = np.asarray(observations['source_id'], dtype=np.int64)
+        if len(source_ids) > 0:
+            pos = np.searchsorted(source_ids, obs_ids, sorter=sorter)
+            rank = sorter[np.minimum(pos, len(source_ids) - 1)]
+            keep = np.nonzero(source_ids[rank] == obs_ids)[0]
+        else:
+            rank = np.zeros(len(obs_ids), dtype=np.int64)
+            keep = np.array([], dtype=np.int64)
+        transit = np.asarray(observations['observation_id'], dtype=np.int64)[keep] // 10
+        order = keep[np.lexsort((keep, transit, rank[keep]))]
+
+        dtype = np.dtype([(name, np.asarray(observations[name]).dtype)
+                          for name in observations.colnames])
+        packed = np.empty(len(order), dtype=dtype)
+        for name in dtype.names:
+            packed[name] = np.asarray(observations[name])[order]
+        offsets = np.zeros(len(source) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rank[order], minlength=len(source)), out=offsets[1:])
+        return cls(packed_source, packed, offsets, backend=backend)
+
+    @classmethod
+    def load(cls, directory, mmap=True, backend=None):
+        """
+        Loads store saved with save.
+
+        Args:
+            directory (string): Directory store was saved to.
+            mmap (bool): Whether to memory-map source and observations instead
+                of reading them into memory. Orbits are always read, so that
+                they can be updated.
+            backend (Backend): Data source to query MPC with.
+
+        Returns:
+            CatalogStore: Loaded store
+        """
+        mode = 'r' if mmap else None
+        source = np.load(os.path.join(directory, 'source.npy'), mmap_mode=mode)
+        observations = np.load(os.path.join(directory, 'observations.npy'), mmap_mode=mode)
+        offsets = np.load(os.path.join(directory, 'offsets.npy'))
+        orbits = np.load(os.path.join(directory, 'orbits.npy'))
+        if orbits.shape[1] != len(ELEMENT_FIELDS):
+            # Stores saved with (semimajor axis, eccentricity) only are queried again.
+            missing = orbits[:, 0] != 0
+            orbits = np.zeros((len(orbits), len(ELEMENT_FIELDS)))
+            orbits[missing] = np.nan
+        return cls(source, observations, offsets, orbits, backend=backend)
+
+    def save(self, directory):
+        """
+        Saves store as one .npy file per array.
+
+        Args:
+            directory (string): Directory to save store to.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in FILES:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+
+    def get_observations(self, index):
+        """
+        Returns observations of asteroid as view into observations array.
+
+        Args:
+            index (int): Index of asteroid in store.
+
+        Returns:
+            ndarray: Structured array of observations, sorted by transit
+        """
+        return self.observations[self.offsets[index]:self.offsets[index+1]]
+
+    def transit_arrays(self):
+        """
+        Returns transits of all asteroids in compressed sparse row form,
+        computed once from the observations, which are sorted by transit
+        within each asteroid.
+
+        Returns:
+            tuple: Transit id of every transit, start of every transit in
+                observations with the total appended, start of the transits of
+                every asteroid with the total appended, and CCD of every
+                observation
+        """
+        if self._transits is None:
+            transit = np.asarray(self.observations['observation_id'], dtype=np.int64) // 10
+            new = np.ones(len(transit), dtype=bool)
+            new[1:] = transit[1:] != transit[:-1]
+            new[self.offsets[:-1][self.offsets[:-1] < len(transit)]] = True
+            starts = np.flatnonzero(new)
+            transit_offsets = np.append(starts, len(transit)).astype(np.int64)
+            asteroid_offsets = np.searchsorted(starts, self.offsets).astype(np.int64)
+            ccds = np.asarray(self.observations['observation_id'], dtype=np.int64) % 10
+            self._transits = (transit[starts], transit_offsets, asteroid_offsets, ccds)
+        return self._transits
+
+    def get_transit_index(self, index):
+        """
+        Returns transit index of asteroid as views into transit_arrays,
+        without sorting its observations again.
+
+        Args:
+            index (int): Index of asteroid in store.
+
+        Returns:
+            TransitIndex: Index of observations of asteroid by transit
+        """
+        transits, transit_offsets, asteroid_offsets, ccds = self.transit_arrays()
+        first, last = asteroid_offsets[index], asteroid_offsets[index+1]
+        start, end = self.offsets[index], self.offsets[index+1]
+        return TransitIndex.from_offsets(transits[first:last],
+                                         transit_offsets[first:last+1] - start if last > first
+                                         else np.zeros(1, dtype=np.int64),
+                                         ccds[start:end])
+
+    def find(self, number_mp=0, denomination='', source_id=0):
+        """
+        Returns index of asteroid given number_mp, denomination, or source_id.
+
+        Args:
+            number_mp (int): Minor Planet number attributed by MPC.
+            denomination (string): Name of asteroid in MPC database.
+            source_id (int): Unique source identifier from gaia_source.
+
+        Returns:
+            int: Index of first matching asteroid, or -1 if not in store.
+        """
+        if number_mp > 0:
+            mask = self.source['number_mp'] == number_mp
+        elif denomination != '':
+            mask = np.char.lower(np.char.strip(self.source['denomination'])) == denomination.strip().lower()
+        elif source_id != 0:
+            mask = self.source['source_id'] == source_id
+        else:
+            return -1
+        found = np.nonzero(mask)[0]
+        return int(found[0]) if len(found) > 0 else -1
+
+    def query_mpc(self, index):
+        """
+        Queries MPC for orbit data of asteroid and stores it in orbits.
+
+        Args:
+            index (int): Index of asteroid in store.
+
+        Returns:
+            list: List of dicts of orbit data as returned by MPC, empty if not found
+        """
+        number = int(self.source['number_mp'][index])
+        if number == 0:
+            self.orbits[index] = 0
+            self.mpc[index] = {}
+            return []
+        backend = get_backend() if self.backend is None else self.backend
+        results = backend.query_mpc(number)
+        if len(results) == 0:
+            print('Asteroid {} does not exist in MPC.'.format(number))
+            self.orbits[index] = 0
+            self.mpc[index] = {}
+            return []
+        self.orbits[index] = elements(results[0])
+        self.mpc[index] = results[0]
+        return results
+
+    def query_orbits(self, fetcher=None):
+        """
+        Queries MPC once for every asteroid whose orbit has not been queried
+        yet, concurrently if a fetcher is given.
+
+        Args:
+            fetcher (Fetcher): Runs MPC queries concurrently, with rate limiting
+                and retries. None queries one asteroid at a time.
+
+        Returns:
+            ndarray: Orbit elements of all asteroids, see orbits
+        """
+        missing = [int(index) for index in np.nonzero(np.isnan(self.orbits[:, 0]))[0]]
+        if fetcher is None:
+            for index in missing:
+                self.query_mpc(index)
+        else:
+            fetcher.map(self.query_mpc, missing)
+        return self.orbits
+
+
+class AsteroidView(Asteroid):
+    """
+    Asteroid stored in a CatalogStore. Views hold only the store and their
+    index, and read every attribute of Asteroid from the arrays of the store.
+    Observations are returned as a Table sharing memory with the store.
+
+    Views are read-only apart from orbit data: query_source, query_observations
+    and set_transits do not query Gaia but return what the store holds, while
+    query_mpc stores the orbit elements and MPC data in the store, and mpc_data
+    and orbit_data query MPC only if the store has not done so yet.
+
+    Args:
+        store (CatalogStore): Store holding asteroid.
+        index (int): Index of asteroid in store.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __reduce__(self):
+        # Attributes of Asteroid are read-only properties of views, so views
+        # are copied and pickled as their store and index.
+        return (AsteroidView, (self.store, self.index))
+
+    @property
+    def backend(self):
+        return get_backend() if self.store.backend is None else self.store.backend
+
+    @property
+    def source_id(self):
+        return int(self.store.source['source_id'][self.index])
+
+    @property
+    def number_mp(self):
+        return int(self.store.source['number_mp'][self.index])
+
+    @property
+    def denomination(self):
+        return str(self.store.source['denomination'][self.index])
+
+    @property
+    def num_of_obs(self):
+        return int(self.store.source['num_of_obs'][self.index])
+
+    @property
+    def source(self):
+        from astropy.table import Table
+        return Table(self.store.source[self.index:self.index+1])
+
+    @property
+    def observations(self):
+        from astropy.table import Table
+        return Table(self.store.get_observations(self.index), copy=False)
+
+    @property
+    def transit_index(self):
+        return self.store.get_transit_index(self.index)
+
+    def _column(self, name):
+        return self.store.get_observations(self.index)[name]
+
+    @property
+    def transits(self):
+        return self.transit_index.transits
+
+    @property
+    def transit_ccds(self):
+        return self.transit_index.transit_ccds()
+
+    @property
+    def orbit_data(self):
+        if np.isnan(self.store.orbits[self.index, 0]):
+            self.store.query_mpc(self.index)
+        return self.store.orbits[self.index, :2]
+
+    @property
+    def mpc_data(self):
+        if self.index not in self.store.mpc:
+            self.store.query_mpc(self.index)
+        return self.store.mpc[self.index]
+
+    def query_source(self, search_col=None):
+        """
+        Returns row of asteroid from sso_source as held by the store.
+
+        Args:
+            search_col (string): Ignored, views are found with CatalogStore.find.
+
+        Returns:
+            Table: Row of asteroid from sso_source
+        """
+        return self.source
+
+    def query_observations(self, columns=None):
+        """
+        Returns observations of asteroid as held by the store.
+
+        Args:
+            columns (tuple of string): Columns to return. source_id and
+                observation_id are always returned. Defaults to all columns.
+
+        Returns:
+            Table: Observations of asteroid, sorted by transit
+
+        Raises:
+            ValueError: If the store does not hold a requested column.
+        """
+        observations = self.observations
+        if columns is None:
+            return observations
+        missing = [name for name in columns if name not in observations.colnames]
+        if missing:
+            raise ValueError('Store does not hold columns {}, query them with Asteroid.'.format(', '.join(missing)))
+        return observations[[name for name in ('source_id', 'observation_id') if name not in columns] + list(columns)]
+
+    def set_transits(self):
+        """
+        Returns transits of asteroid as computed once by the store.
+
+        Returns:
+            ndarray: Array of int, individual transits from observations
+        """
+        return self.transits
+
+    @timed('query_mpc')
+    def query_mpc(self):
+        """
+        Queries MPC for orbit data and stores it in the store.
+
+        Returns:
+            ndarray: Orbit data (semimajor axis, eccentricity)
+        """
+        self.store.query_mpc(self.index)
+        return self.store.orbits[self.index, :2]
@@ -0,0 +1,86 @@
+import numpy as np
+from .backends import get_backend
+from .transits import TransitIndex
+
+def iter_observations(source_ids=None, chunk_size=100000, backend=None):
+    """
+    Streams observations from sso_observation one asteroid at a time, holding
+    at most one chunk of rows (and the observations of one asteroid) in memory.
+    With the Gaia archive, chunks are pages of asynchronous jobs, so the whole
+    table can be streamed despite the row limit of synchronous jobs.
+
+    Args:
+        source_ids (list of int): Unique source identifiers of asteroids. None
+            streams every asteroid in the backend.
+        chunk_size (int): Maximum number of rows fetched at once.
+        backend (Backend): Data source to query. Defaults to get_backend().
+
+    Yields:
+        tuple: source_id and Table of observations of each asteroid, in order of
+            source_id
+    """
+    if backend is None:
+        backend = get_backend()
+    chunks = backend.iter_observation_chunks(source_ids, chunk_size=chunk_size)
+    return split_blocks(chunks)
+
+def split_blocks(chunks):
+    """
+    Regroups chunks of observations sorted by source_id into one block per
+    asteroid. Observations of the last asteroid of each chunk are held back
+    until the next chunk, as they may continue there, and the pieces of an
+    asteroid spanning several chunks are stacked once when its block is done.
+
+    Args:
+        chunks (iterable of Table): Chunks of observations sorted by source_id.
+
+    Yields:
+        tuple: source_id and Table of observations of each asteroid
+    """
+    pending = []
+    pending_id = None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        ids = np.asarray(chunk['source_id'])
+        starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+        ends = np.append(starts[1:], len(ids))
+        blocks = [chunk[start:end] for start, end in zip(starts, ends)]
+        if pending and ids[0] == pending_id:
+            pending.append(blocks.pop(0))
+            if len(blocks) == 0:
+                continue
+        if pending:
+            yield pending_id, _stack(pending)
+        for start, block in zip(starts[-len(blocks):-1], blocks[:-1]):
+            yield int(ids[start]), block
+        pending = [blocks[-1]]
+        pending_id = int(ids[starts[-1]])
+    if pending:
+        yield pending_id, _stack(pending)
+
+def _stack(pieces):
+    """Returns pieces of observations of one asteroid as a single Table."""
+    if len(pieces) == 1:
+        return pieces[0]
+    from astropy.table import vstack
+    return vstack(pieces)
+
+def iter_transits(source_ids=None, chunk_size=100000, backend=None):
+    """
+    Streams observations one asteroid at a time grouped by transit, see
+    iter_observations and TransitIndex.
+
+    Args:
+        source_ids (list of int): Unique source identifiers of asteroids. None
+            streams every asteroid in the backend.
+        chunk_size (int): Maximum number of rows fetched at once.
+        backend (Backend): Data source to query. Defaults to get_backend().
+
+    Yields:
+        tuple: source_id, TransitIndex and Table of observations sorted by
+            transit of each asteroid
+    """
+    for source_id, observations in iter_observations(source_ids, chunk_size, backend):
+        index = TransitIndex(observations['observation_id'])
+        yield source_id, index, observations[index.order]
@@ -0,0 +1,288 @@
+import os
+import time
+import sqlite3
+import numpy as np
+from .backends import get_backend, SOURCE_COLUMNS, OBSERVATION_COLUMNS, _pack
+from .catalog import SEARCH_COLS, _normalize, _chunks
+from .fetch import Fetcher
+from .instrument import timed
+from .store import CatalogStore, SOURCE_DTYPE, OBSERVATION_DTYPE
+
+HELD_COLUMNS = SOURCE_COLUMNS + ('n_held', 'last_observation_id')
+
+_MAX_VARIABLES = 500
+
+class Mirror(object):
+    """
+    Local mirror of sso_source and sso_observation for many asteroids in a
+    SQLite database, refreshed incrementally.
+
+    For every asteroid the mirror records the release it was fetched from, its
+    num_of_obs in the archive, and the number and largest observation_id of the
+    observations it holds. sync only queries sources of identifiers not held
+    yet and only fetches observations of asteroids whose num_of_obs changed
+    since they were last fetched: asteroids holding no observations are
+    fetched whole, others only fetch observations past their last observation
+    id. Rows are upserted, so syncs never duplicate observations, and every
+    batch of queries is committed together with the state of its asteroids, so
+    an interrupted sync resumes where it stopped.
+
+    Releases are mirrored side by side, keyed on the release of the backend,
+    e.g. GaiaBackend(release='dr3').
+
+    Args:
+        path (string): Path of SQLite database.
+        backend (Backend): Data source to sync from. Defaults to get_backend().
+        fetcher (Fetcher): Runs queries concurrently, with rate limiting and
+            retries. Defaults to Fetcher().
+        batch_size (int): Number of observation queries to run between commits.
+
+    Attributes:
+        path (string): Path of SQLite database.
+        release (string): Name of release mirrored from backend.
+    """
+    def __init__(self, path, backend=None, fetcher=None, batch_size=16):
+        self.backend = get_backend() if backend is None else backend
+        self.fetcher = Fetcher() if fetcher is None else fetcher
+        self.batch_size = batch_size
+        self.release = self.backend.release.name
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS sources (
+                            release TEXT, source_id INTEGER, num_of_obs INTEGER,
+                            number_mp INTEGER, denomination TEXT,
+                            n_held INTEGER DEFAULT 0, last_observation_id INTEGER DEFAULT 0,
+                            synced_num_of_obs INTEGER, synced REAL,
+                            PRIMARY KEY (release, source_id)) WITHOUT ROWID""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS observations (
+                            release TEXT, source_id INTEGER, observation_id INTEGER,
+                            number_mp INTEGER, epoch REAL, ra REAL, dec REAL,
+                            PRIMARY KEY (release, source_id, observation_id)) WITHOUT ROWID""")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM sources WHERE release=?',
+                                (self.release,)).fetchone()[0]
+
+    @timed('sync')
+    def sync(self, number_mp=None, denomination=None, source_id=None, refresh=False):
+        """
+        Brings asteroids up to date with the archive, fetching only what the
+        mirror does not hold yet. Without identifiers, every asteroid held for
+        the release is synced.
+
+        Args:
+            number_mp (list of int): Minor Planet numbers attributed by MPC.
+            denomination (list of string): Names of asteroids in MPC database.
+            source_id (list of int): Unique source identifiers from gaia_source.
+            refresh (bool): Whether to query sso_source again for asteroids
+                already held, to pick up changes of num_of_obs.
+
+        Returns:
+            dict: Number of identifiers queried in sso_source ('sources'),
+                asteroids fetched ('fetched') and already up to date
+                ('up_to_date'), and observations upserted ('observations')
+        """
+        requested = {'number_mp': number_mp, 'denomination': denomination,
+                     'source_id': source_id}
+        if all(values is None for values in requested.values()):
+            requested['source_id'] = [int(value) for value in self.sources()['source_id']]
+        queried = 0
+        held = self.sources()
+        for search_col in SEARCH_COLS:
+            values = requested[search_col]
+            if values is None or len(values) == 0:
+                continue
+            known = set(_normalize(value) for value in held[search_col])
+            missing = [value for value in values if refresh or _normalize(value) not in known]
+            if len(missing) == 0:
+                continue
+            queried += len(missing)
+            results = self.fetcher.map(
+                lambda chunk: self.backend.query_sources(search_col, chunk),
+                _chunks(missing, self.backend.max_ids))
+            self._upsert_sources([result for result in results if len(result) > 0])
+
+        held = self.sources(states=True)
+        mask = np.zeros(len(held), dtype=bool)
+        for search_col in SEARCH_COLS:
+            values = requested[search_col]
+            if values is not None and len(values) > 0:
+                wanted = set(_normalize(value) for value in values)
+                mask |= np.array([_normalize(value) in wanted for value in held[search_col]], dtype=bool)
+        held = held[mask]
+        stale = held[np.asarray(held['synced_num_of_obs']) != np.asarray(held['num_of_obs'])]
+        fresh = stale[np.asarray(stale['n_held']) == 0]
+        grown = stale[np.asarray(stale['n_held']) > 0]
+
+        jobs = [('all', ids, rows) for ids, rows in
+                _pack(list(fresh['source_id']), list(fresh['num_of_obs']), self.backend.max_ids, self.backend.max_rows)]
+        last_ids = dict(zip(grown['source_id'], grown['last_observation_id']))
+        missing = np.maximum(np.asarray(grown['num_of_obs']) - np.asarray(grown['n_held']), 0)
+        jobs.extend(('new', {key: last_ids[key] for key in ids}, rows) for ids, rows in
+                    _pack(list(grown['source_id']), list(missing), self.backend.max_ids, self.backend.max_rows))
+
+        upserted = 0
+        for batch in _chunks(jobs, self.batch_size):
+            results = self.fetcher.map(self._fetch, batch)
+            with self._connect() as conn:
+                for (kind, ids, rows), observations in zip(batch, results):
+                    upserted += self._upsert_observations(conn, observations)
+                    self._update_states(conn, [int(key) for key in ids])
+        return {'sources': queried, 'fetched': len(stale),
+                'up_to_date': len(held) - len(stale), 'observations': upserted}
+
+    def _fetch(self, job):
+        """Runs query of one packed job of sync."""
+        kind, ids, rows = job
+        async_job = rows > self.backend.max_rows
+        if kind == 'all':
+            return self.backend.query_observations(ids, async_job=async_job, columns=OBSERVATION_COLUMNS)
+        return self.backend.query_new_observations(ids, async_job=async_job, columns=OBSERVATION_COLUMNS)
+
+    def _upsert_sources(self, results):
+        """Inserts or updates rows of sso_source, keeping the state of held asteroids."""
+        rows = []
+        for result in results:
+            rows.extend(zip([self.release]*len(result), _ints(result['source_id']), _ints(result['num_of_obs']),
+                            _ints(result['number_mp']), [_text(value) for value in result['denomination']]))
+        with self._connect() as conn:
+            conn.executemany("""INSERT INTO sources (release, source_id, num_of_obs, number_mp, denomination)
+                                VALUES (?, ?, ?, ?, ?)
+                                ON CONFLICT (release, source_id) DO UPDATE SET
+                                num_of_obs=excluded.num_of_obs, number_mp=excluded.number_mp,
+                                denomination=excluded.denomination""", rows)
+
+    def _upsert_observations(self, conn, observations):
+        """Inserts or replaces observations, returning the number of rows."""
+        if len(observations) == 0:
+            return 0
+        columns = [_ints(observations[name]) if name in ('source_id', 'observation_id', 'number_mp')
+                   else np.asarray(observations[name], dtype=np.float64).tolist() for name in OBSERVATION_COLUMNS]
+        conn.executemany('INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         zip([self.release]*len(observations), *columns))
+        return len(observations)
+
+    def _update_states(self, conn, source_ids):
+        """Records number and last id of observations held of fetched asteroids."""
+        now = time.time()
+        conn.executemany("""UPDATE sources SET
+                            n_held=(SELECT COUNT(*) FROM observations AS o
+                                    WHERE o.release=sources.release AND o.source_id=sources.source_id),
+                            last_observation_id=(SELECT COALESCE(MAX(observation_id), 0) FROM observations AS o
+                                                 WHERE o.release=sources.release AND o.source_id=sources.source_id),
+                            synced_num_of_obs=num_of_obs, synced=?
+                            WHERE release=? AND source_id=?""",
+                         [(now, self.release, key) for key in source_ids])
+
+    def sources(self, source_ids=None, states=False):
+        """
+        Returns asteroids held for the release.
+
+        Args:
+            source_ids (list of int): Asteroids to return. Defaults to all.
+            states (bool): Whether to include synced_num_of_obs, the num_of_obs
+                at the last fetch of observations (-1 if never fetched).
+
+        Returns:
+            Table: Table of source_id, num_of_obs, number_mp, denomination,
+                number of observations held n_held and largest observation id
+                held last_observation_id, sorted by source_id
+        """
+        from astropy.table import Table
+        names = HELD_COLUMNS + (('synced_num_of_obs',) if states else ())
+        query = """SELECT source_id, num_of_obs, number_mp, denomination, n_held,
+                   last_observation_id, COALESCE(synced_num_of_obs, -1)
+                   FROM sources WHERE release=?"""
+        rows = self._select(query, 'source_id', source_ids)
+        rows = sorted(row[:len(names)] for row in rows)
+        dtype = ('i8', 'i8', 'i8', 'U{}'.format(SOURCE_DTYPE['denomination'].itemsize // 4), 'i8', 'i8', 'i8')
+        if len(rows) == 0:
+            return Table(names=names, dtype=dtype[:len(names)])
+        return Table(rows=rows, names=names, dtype=dtype[:len(names)])
+
+    def observations(self, source_ids=None):
+        """
+        Returns observations held for the release.
+
+        Args:
+            source_ids (list of int): Asteroids to return observations of.
+                Defaults to all.
+
+        Returns:
+            Table: Table of OBSERVATION_COLUMNS sorted by source_id and observation_id
+        """
+        from astropy.table import Table
+        query = 'SELECT {} FROM observations WHERE release=?'.format(', '.join(OBSERVATION_COLUMNS))
+        rows = self._select(query, 'source_id', source_ids, order='source_id, observation_id')
+        return Table(np.array(rows, dtype=OBSERVATION_DTYPE))
+
+    def observation_ids(self, source_id):
+        """
+        Args:
+            source_id (int): Unique source identifier of asteroid.
+
+        Returns:
+            ndarray of int: Sorted observation ids held of asteroid
+        """
+        rows = self._select('SELECT observation_id FROM observations WHERE release=?', 'source_id',
+                            [source_id], order='observation_id')
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def _select(self, query, column, values, order=None):
+        """Runs query for the release, restricted to values of column in chunks if given."""
+        suffix = '' if order is None else ' ORDER BY ' + order
+        with self._connect() as conn:
+            if values is None:
+                return conn.execute(query + suffix, (self.release,)).fetchall()
+            rows = []
+            for chunk in _chunks([int(value) for value in values], _MAX_VARIABLES):
+                condition = ' AND {} IN ({})'.format(column, ', '.join('?'*len(chunk)))
+                rows.extend(conn.execute(query + condition + suffix, [self.release] + chunk).fetchall())
+            return rows
+
+    def to_store(self, source_ids=None):
+        """
+        Packs asteroids held into a CatalogStore, e.g. to save or index them.
+
+        Args:
+            source_ids (list of int): Asteroids to pack. Defaults to all.
+
+        Returns:
+            CatalogStore: Store of asteroids sorted by source_id
+        """
+        source = self.sources(source_ids)
+        return CatalogStore.from_tables(source[list(SOURCE_COLUMNS)], self.observations(source_ids),
+                                        backend=self.backend)
+
+    def to_catalog(self, source_ids=None):
+        """
+        Returns asteroids held as AsteroidCatalog without querying Gaia.
+
+        Args:
+            source_ids (list of int): Asteroids to include. Defaults to all.
+
+        Returns:
+            AsteroidCatalog: Catalog of asteroids sorted by source_id
+        """
+        from .catalog import AsteroidCatalog
+        return AsteroidCatalog.from_store(self.to_store(source_ids), fetcher=self.fetcher,
+                                          backend=self.backend)
+
+
+def _ints(values):
+    """Returns column of integers as list of Python ints."""
+    return np.asarray(values, dtype=np.int64).tolist()
+
+def _text(value):
+    """Returns str, bytes or masked value as stripped str."""
+    if isinstance(value, (bytes, np.bytes_)):
+        value = value.decode()
+    if value is np.ma.masked or value is None:
+        return ''
+    return str(value).strip()
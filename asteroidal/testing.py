@@ -0,0 +1,113 @@
+"""
+Support for testing without network: small sso_source and sso_observation
+tables of three asteroids, and FakeArchive, which answers Gaia and MPC queries
+from tables. Used by the tests and benchmarks.
+"""
+import re
+import time
+import numpy as np
+from astropy.table import Table
+
+SOURCES = Table(rows=[
+    (-4284967216, 6, 8, 'flora'),
+    (-4284967217, 3, 9, 'metis'),
+    (-4284967220, 0, 12, 'victoria'),
+], names=('source_id', 'num_of_obs', 'number_mp', 'denomination'))
+
+OBSERVATIONS = Table(rows=[
+    (-4284967216, 1000000000000000011, 8, 100.0, 150.0, 10.0),
+    (-4284967217, 2000000000000000021, 9, 200.0, 30.0, -5.0),
+    (-4284967216, 1000000000000000012, 8, 100.00001, 150.000001, 10.000001),
+    (-4284967216, 1000000000000000013, 8, 100.00002, 150.000002, 10.000002),
+    (-4284967217, 2000000000000000022, 9, 200.00001, 30.000001, -5.000001),
+    (-4284967216, 1000000000000000101, 8, 150.0, 151.0, 11.0),
+    (-4284967216, 1000000000000000102, 8, 150.00001, 151.000001, 11.000001),
+    (-4284967217, 2000000000000000101, 9, 250.0, 31.0, -6.0),
+    (-4284967216, 1000000000000000201, 8, 200.0, 152.0, 12.0),
+], names=('source_id', 'observation_id', 'number_mp', 'epoch', 'ra', 'dec'))
+
+ORBITS = {
+    8: {'number': 8, 'name': 'Flora', 'semimajor_axis': '2.2017319', 'eccentricity': '0.1560672'},
+    9: {'number': 9, 'name': 'Metis', 'semimajor_axis': '2.3856', 'eccentricity': '0.1231'},
+    12: {'number': 12, 'name': 'Victoria', 'semimajor_axis': '2.3343', 'eccentricity': '0.2206'},
+}
+
+
+class FakeJob(object):
+    def __init__(self, results):
+        self.results = results
+
+    def get_results(self):
+        return self.results
+
+
+class FakeArchive(object):
+    """
+    Stand-in for Gaia.launch_job and MPC.query_object answering from tables,
+    by default the small tables above, sleeping for the given latency per
+    request. Used by the tests and, with synthetic tables, by the benchmarks.
+
+    Args:
+        source (Table): sso_source to answer from.
+        observations (Table): sso_observation to answer from.
+        orbits (dict): Orbit data by number.
+        latency (float): Seconds to wait per Gaia request.
+        mpc_latency (float): Seconds to wait per MPC request.
+    """
+    def __init__(self, source=SOURCES, observations=OBSERVATIONS, orbits=ORBITS,
+                 latency=0.0, mpc_latency=0.0):
+        self.source = source
+        self.observations = observations
+        self.orbits = orbits
+        self.latency = latency
+        self.mpc_latency = mpc_latency
+        self.queries = []
+        self.mpc_queries = []
+        ids = np.asarray(observations['source_id'])
+        self.order = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[self.order]
+
+    def launch_job(self, query, *args, **kwargs):
+        self.queries.append(query)
+        time.sleep(self.latency)
+        match = re.search(r'WHERE\s+(\w+)\s*(?:IN\s*\((.*?)\)|=\s*(\S+))', query, re.S)
+        column = match.group(1)
+        raw = match.group(2) if match.group(2) is not None else match.group(3)
+        values = [v.strip().strip('\'') for v in raw.split(',')]
+        if 'sso_source' in query:
+            table = self.source
+            if column == 'denomination':
+                mask = np.isin(np.asarray(table[column]), values)
+            else:
+                mask = np.isin(np.asarray(table[column]), [int(v) for v in values])
+            rows = np.nonzero(mask)[0]
+        else:
+            table = self.observations
+            ids = np.array([int(v) for v in values], dtype=np.int64)
+            starts = np.searchsorted(self.sorted_ids, ids, side='left')
+            ends = np.searchsorted(self.sorted_ids, ids, side='right')
+            rows = np.sort(np.concatenate([self.order[s:e] for s, e in zip(starts, ends)]
+                                          + [np.array([], dtype=np.int64)]))
+        if 'GROUP BY' in query:
+            from .transits import summarize_transits
+            return FakeJob(summarize_transits(table[rows]))
+        columns = [c.strip() for c in re.search(r'SELECT(.*?)FROM', query, re.S).group(1).split(',')]
+        return FakeJob(table[rows][columns])
+
+    launch_job_async = launch_job
+
+    def query_object(self, target_type, number=None, **kwargs):
+        self.mpc_queries.append(number)
+        time.sleep(self.mpc_latency)
+        if number in self.orbits:
+            return [self.orbits[number]]
+        return []
+
+    def install(self, monkeypatch):
+        """Replaces Gaia and MPC queries with this archive for the duration of a test."""
+        from astroquery.gaia import Gaia
+        from astroquery.mpc import MPC
+        monkeypatch.setattr(Gaia, 'launch_job', self.launch_job)
+        monkeypatch.setattr(Gaia, 'launch_job_async', self.launch_job_async)
+        monkeypatch.setattr(MPC, 'query_object', self.query_object)
+        return self
@@ -0,0 +1,240 @@
+import numpy as np
+from .adql import SUMMARY_COLUMNS
+
+MAS_PER_DEG = 3600000.
+SECONDS_PER_DAY = 86400.
+STATS_COLUMNS = ('source_id', 'transit_id', 'n_obs', 'n_ccd', 'epoch_min', 'epoch_max', 'ra', 'dec',
+                 'ra_std', 'dec_std', 'ra_rate', 'dec_rate', 'rate', 'fit_rms')
+
+class TransitIndex(object):
+    """
+    Index grouping observations of an asteroid by transit.
+
+    Observation ids in sso_observation are the transit id followed by the
+    number of the CCD the asteroid was observed on, so observations are grouped
+    by observation_id // 10. The index is stored in compressed sparse row form:
+    observations of transit i are order[offsets[i]:offsets[i+1]] and their CCDs
+    are ccds[offsets[i]:offsets[i+1]].
+
+    Args:
+        observation_id (ndarray of int): Observation ids from sso_observation.
+
+    Attributes:
+        transits (ndarray of int): Sorted array of unique transit ids.
+        inverse (ndarray of int): Index into transits of each observation.
+        order (ndarray of int): Permutation sorting observations by transit,
+            keeping the original order of observations within a transit.
+        offsets (ndarray of int): Start of each transit in order and ccds, with
+            the total number of observations appended.
+        ccds (ndarray of int): CCD number of each observation, sorted by transit.
+
+    """
+    def __init__(self, observation_id):
+        observation_id = np.asarray(observation_id, dtype=np.int64).ravel()
+        self.transits, self.inverse = np.unique(observation_id // 10, return_inverse=True)
+        self.inverse = self.inverse.ravel()
+        self.order = np.argsort(self.inverse, kind='stable')
+        counts = np.bincount(self.inverse, minlength=len(self.transits))
+        self.offsets = np.zeros(len(self.transits) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.ccds = (observation_id % 10)[self.order]
+
+    def __len__(self):
+        return len(self.transits)
+
+    @classmethod
+    def from_offsets(cls, transits, offsets, ccds):
+        """
+        Creates index of observations already sorted by transit, without
+        sorting them again, e.g. from the arrays of a CatalogStore. order and
+        inverse are only computed if accessed.
+
+        Args:
+            transits (ndarray of int): Sorted array of unique transit ids.
+            offsets (ndarray of int): Start of each transit in observations, with
+                the total number of observations appended.
+            ccds (ndarray of int): CCD number of each observation.
+
+        Returns:
+            TransitIndex: Index of observations
+        """
+        index = cls.__new__(cls)
+        index.transits = transits
+        index.offsets = offsets
+        index.ccds = ccds
+        return index
+
+    def __getattr__(self, name):
+        # order and inverse of indexes created with from_offsets are computed
+        # on first access, as observations are already sorted by transit.
+        if name == 'order':
+            self.order = np.arange(self.offsets[-1], dtype=np.int64)
+        elif name == 'inverse':
+            self.inverse = np.repeat(np.arange(len(self.transits)), np.diff(self.offsets))
+        else:
+            raise AttributeError('{} object has no attribute {}'.format(type(self).__name__, name))
+        return self.__dict__[name]
+
+    @property
+    def counts(self):
+        """ndarray of int: Number of observations in each transit."""
+        return np.diff(self.offsets)
+
+    def get_slice(self, index):
+        """
+        Returns slice of observations sorted by transit belonging to a specific
+        transit, specified by index in transits array
+
+        Args:
+            index (int): index of transits array
+
+        Returns:
+            slice: Slice of observations in transit
+        """
+        if index < 0:
+            index += len(self.transits)
+        return slice(self.offsets[index], self.offsets[index+1])
+
+    def split(self, values):
+        """
+        Splits values of observations sorted by transit into one view per transit.
+
+        Args:
+            values (ndarray): Values of each observation, sorted by transit.
+
+        Returns:
+            list: List of views of values, one for each transit
+        """
+        if len(self.transits) == 0:
+            return []
+        return np.split(np.asarray(values), self.offsets[1:-1])
+
+    def get_ccds(self, index):
+        """
+        Returns CCDs of a specific transit, specified by index in transits array
+
+        Args:
+            index (int): index of transits array
+
+        Returns:
+            ndarray: View of CCD numbers of observations in transit
+        """
+        return self.ccds[self.get_slice(index)]
+
+    def transit_ccds(self):
+        """
+        Returns:
+            ndarray: Object array holding a view of the CCD numbers of each transit
+        """
+        transit_ccds = np.empty(len(self.transits), dtype=object)
+        for index in range(len(self.transits)):
+            transit_ccds[index] = self.get_ccds(index)
+        return transit_ccds
+
+
+def summarize_transits(observations):
+    """
+    Aggregates observations of one or more asteroids by transit, computing
+    the same summary as the ADQL query of adql.transit_summary.
+
+    Args:
+        observations (Table): Observations including source_id, observation_id,
+            epoch, ra and dec, in any order.
+
+    Returns:
+        Table: One row per transit, sorted by source_id and transit_id, with
+            source_id, transit_id, n_obs, mean ra and dec, epoch_min and epoch_max
+    """
+    from astropy.table import Table
+    if len(observations) == 0:
+        return Table(names=SUMMARY_COLUMNS, dtype=('i8', 'i8', 'i8', 'f8', 'f8', 'f8', 'f8'))
+    order, source_id, transit, starts, counts = _group(observations)
+    epoch = np.asarray(observations['epoch'], dtype=np.float64)[order]
+    ra = np.add.reduceat(np.asarray(observations['ra'], dtype=np.float64)[order], starts) / counts
+    dec = np.add.reduceat(np.asarray(observations['dec'], dtype=np.float64)[order], starts) / counts
+    return Table([source_id[starts], transit[starts], counts, ra, dec,
+                  np.minimum.reduceat(epoch, starts), np.maximum.reduceat(epoch, starts)],
+                 names=SUMMARY_COLUMNS)
+
+def transit_stats(observations):
+    """
+    Computes astrometric statistics of every transit of one or more asteroids
+    in one pass, with segmented reductions over observations sorted by transit
+    instead of a loop over transits.
+
+    Positions are taken relative to the first observation of each transit,
+    wrapping RA, so transits crossing ra = 0 are handled. Motion rates are
+    least-squares slopes of position against epoch within each transit, and
+    scatter is the RMS of positions about the mean (ra_std, dec_std) and about
+    the fitted motion (fit_rms). Rates and fit_rms are NaN for transits
+    observed at a single epoch. Offsets in RA are multiplied by cos Dec.
+
+    Args:
+        observations (Table): Observations including source_id, observation_id,
+            epoch, ra and dec, in any order.
+
+    Returns:
+        Table: One row per transit, sorted by source_id and transit_id, with
+            columns of STATS_COLUMNS: source_id, transit_id, number of
+            observations n_obs and distinct CCDs n_ccd, epoch_min, epoch_max,
+            mean ra and dec (deg), ra_std and dec_std (mas), ra_rate, dec_rate
+            and total rate (mas/s) and fit_rms (mas)
+    """
+    from astropy.table import Table
+    if len(observations) == 0:
+        return Table(names=STATS_COLUMNS, dtype=('i8',)*4 + ('f8',)*(len(STATS_COLUMNS) - 4))
+    ccd = np.asarray(observations['observation_id'], dtype=np.int64) % 10
+    order, source_id, transit, starts, counts = _group(observations, ccd)
+    group = np.repeat(np.arange(len(starts)), counts)
+    ccd = ccd[order]
+    new_ccd = np.concatenate(([True], ccd[1:] != ccd[:-1]))
+    new_ccd[starts] = True
+    n_ccd = np.add.reduceat(new_ccd.astype(np.int64), starts)
+
+    epoch = np.asarray(observations['epoch'], dtype=np.float64)[order]
+    ra = np.asarray(observations['ra'], dtype=np.float64)[order]
+    dec = np.asarray(observations['dec'], dtype=np.float64)[order]
+    cos_dec = np.cos(np.radians(dec[starts]))
+    x = ((ra - ra[starts][group] + 180) % 360 - 180) * cos_dec[group] * MAS_PER_DEG
+    y = (dec - dec[starts][group]) * MAS_PER_DEG
+    t = (epoch - epoch[starts][group]) * SECONDS_PER_DAY
+
+    def mean(values):
+        return np.add.reduceat(values, starts) / counts
+    x_mean, y_mean, t_mean = mean(x), mean(y), mean(t)
+    dx, dy, dt = x - x_mean[group], y - y_mean[group], t - t_mean[group]
+    ra_std = np.sqrt(mean(dx**2))
+    dec_std = np.sqrt(mean(dy**2))
+    t_var = np.add.reduceat(dt**2, starts)
+    moving = t_var > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ra_rate = np.where(moving, np.add.reduceat(dt*dx, starts) / t_var, np.nan)
+        dec_rate = np.where(moving, np.add.reduceat(dt*dy, starts) / t_var, np.nan)
+    fit = (dx - ra_rate[group]*dt)**2 + (dy - dec_rate[group]*dt)**2
+    fit_rms = np.sqrt(mean(fit))
+
+    ra_mean = (ra[starts] + x_mean / (cos_dec * MAS_PER_DEG)) % 360
+    dec_mean = dec[starts] + y_mean / MAS_PER_DEG
+    return Table([source_id[starts], transit[starts], counts, n_ccd,
+                  np.minimum.reduceat(epoch, starts), np.maximum.reduceat(epoch, starts),
+                  ra_mean, dec_mean, ra_std, dec_std, ra_rate, dec_rate,
+                  np.hypot(ra_rate, dec_rate), fit_rms],
+                 names=STATS_COLUMNS)
+
+def _group(observations, *keys):
+    """
+    Sorts observations by source_id, transit and any further keys.
+
+    Returns:
+        tuple: Order of observations, sorted source_id and transit, and start
+            and number of observations of each transit
+    """
+    source_id = np.asarray(observations['source_id'], dtype=np.int64)
+    transit = np.asarray(observations['observation_id'], dtype=np.int64) // 10
+    order = np.lexsort(keys[::-1] + (transit, source_id))
+    source_id = source_id[order]
+    transit = transit[order]
+    new = np.concatenate(([True], (source_id[1:] != source_id[:-1]) | (transit[1:] != transit[:-1])))
+    starts = np.flatnonzero(new)
+    counts = np.diff(np.append(starts, len(order)))
+    return order, source_id, transit, starts, counts
@@ -0,0 +1,94 @@
+"""
+Benchmarks of Asteroid and plotting against synthetic tables, see synthetic.py.
+
+Requires pytest-benchmark. Files are named bench_*.py so that they are not
+collected by the regular test run; run them explicitly. Timings depend on the
+machine, so no baseline is committed. Save a baseline locally before making
+changes, then compare against it, failing if any benchmark got slower than
+it by more than the threshold:
+
+    python -m pytest benchmarks/bench_asteroid.py --benchmark-save=baseline
+    python -m pytest benchmarks/bench_asteroid.py --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Scales range from 10 to 1M observations of one asteroid. plot_all_transits
+draws one subplot per transit, so it is only run at the smaller scales, and
+plots are timed over a fixed number of rounds. Latency of the Gaia and MPC
+stand-ins is set with ASTEROIDAL_BENCH_LATENCY (seconds per request, default 0).
+"""
+import os
+import pytest
+pytest.importorskip('pytest_benchmark')
+import matplotlib.pyplot as plt
+from asteroidal import asteroid as ast
+from asteroidal.backends import set_backend
+from asteroidal.cache import disable_cache
+from asteroidal.store import CatalogStore
+from asteroidal.kepler import elements
+from asteroidal.testing import FakeArchive
+from synthetic import make_tables
+
+SCALES = [10, 1000, 100000, 1000000]
+PLOT_SCALES = [10, 1000]
+CATALOG_SCALES = [10, 1000, 100000]
+LATENCY = float(os.environ.get('ASTEROIDAL_BENCH_LATENCY', 0))
+
+_tables = {}
+
+def tables(n_obs, n_asteroids=1):
+    """Generates synthetic tables once per scale."""
+    key = (n_obs, n_asteroids)
+    if key not in _tables:
+        _tables[key] = make_tables(n_obs, n_asteroids)
+    return _tables[key]
+
+@pytest.fixture
+def archive(request, monkeypatch):
+    disable_cache()
+    set_backend(None)
+    source, observations, orbits = tables(request.param)
+    return FakeArchive(source, observations, orbits, LATENCY, LATENCY).install(monkeypatch)
+
+@pytest.fixture
+def asteroid(archive):
+    return ast.Asteroid(number_mp=1)
+
+def run_plot(plot, *args):
+    plot(*args)
+    plt.close('all')
+
+@pytest.mark.parametrize('archive', SCALES, indirect=True)
+def test_init(benchmark, archive):
+    benchmark(ast.Asteroid, number_mp=1)
+
+@pytest.mark.parametrize('archive', SCALES, indirect=True)
+def test_set_transits(benchmark, asteroid):
+    benchmark(asteroid.set_transits)
+
+@pytest.mark.parametrize('archive', SCALES, indirect=True)
+def test_get_transit_obs(benchmark, asteroid):
+    indices = range(0, len(asteroid.transits), max(1, len(asteroid.transits) // 100))
+    benchmark(lambda: [asteroid.get_transit_obs(i) for i in indices])
+
+@pytest.mark.parametrize('archive', SCALES, indirect=True)
+def test_plot_observations(benchmark, asteroid):
+    benchmark.pedantic(run_plot, args=(asteroid.plot_observations,), rounds=3)
+
+@pytest.mark.parametrize('archive', SCALES, indirect=True)
+def test_plot_transit(benchmark, asteroid):
+    benchmark.pedantic(run_plot, args=(asteroid.plot_transit, 0), rounds=3)
+
+@pytest.mark.parametrize('archive', PLOT_SCALES, indirect=True)
+def test_plot_all_transits(benchmark, asteroid):
+    benchmark.pedantic(run_plot, args=(asteroid.plot_all_transits,), rounds=3)
+
+@pytest.mark.parametrize('archive', SCALES[:1], indirect=True)
+def test_plot_orbits(benchmark, asteroid):
+    benchmark.pedantic(run_plot, args=(asteroid.plot_orbits,), rounds=3)
+
+@pytest.mark.parametrize('n_asteroids', CATALOG_SCALES)
+def test_plot_multiple_orbits(benchmark, n_asteroids):
+    source, observations, orbits = tables(n_asteroids, n_asteroids)
+    store = CatalogStore.from_tables(source, observations)
+    store.orbits[:] = [elements(orbits[n]) for n in store.source['number_mp']]
+    asteroids = list(store)
+    benchmark.pedantic(run_plot, args=(ast.plot_multiple_orbits, asteroids), rounds=3)
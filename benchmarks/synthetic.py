@@ -0,0 +1,59 @@
+"""
+Synthetic sso_source and sso_observation tables, which the benchmarks serve
+through asteroidal.testing.FakeArchive with injected latency, so benchmarks are
+reproducible and run without network.
+"""
+import numpy as np
+from astropy.table import Table
+
+FIRST_SOURCE_ID = -4284967216
+FIRST_TRANSIT = 10**17
+
+def make_tables(n_obs, n_asteroids=1, obs_per_transit=8, seed=0):
+    """
+    Generates sso_source and sso_observation tables of asteroids with a
+    configurable number of observations.
+
+    Observations are spread evenly over asteroids and grouped into transits of
+    obs_per_transit consecutive CCDs, with positions drifting along a random
+    direction like a moving asteroid.
+
+    Args:
+        n_obs (int): Total number of observations.
+        n_asteroids (int): Number of asteroids, numbered from 1.
+        obs_per_transit (int): Number of observations per transit, at most 9.
+        seed (int): Seed of random generator.
+
+    Returns:
+        tuple: Tables of sso_source and sso_observation, and dict of orbit data
+            by number as returned by MPC
+    """
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(1, n_asteroids + 1, dtype=np.int64)
+    source_ids = FIRST_SOURCE_ID - numbers + 1
+    num_of_obs = np.full(n_asteroids, n_obs // n_asteroids, dtype=np.int32)
+    num_of_obs[:n_obs % n_asteroids] += 1
+    source = Table([source_ids, num_of_obs, numbers,
+                    np.array(['synthetic{}'.format(n) for n in numbers])],
+                   names=('source_id', 'num_of_obs', 'number_mp', 'denomination'))
+
+    asteroid = np.repeat(np.arange(n_asteroids), num_of_obs)
+    starts = np.concatenate(([0], np.cumsum(num_of_obs)[:-1]))
+    position = np.arange(n_obs) - starts[asteroid]
+    transit = position // obs_per_transit
+    ccd = position % obs_per_transit + 1
+    observation_id = (FIRST_TRANSIT + transit + 1000000 * asteroid) * 10 + ccd
+    epoch = transit * 6.0 + ccd * 4.4e-5 + rng.uniform(0, 1, n_asteroids)[asteroid]
+    rate = rng.normal(0, 0.25, (n_asteroids, 2))
+    ra = (rng.uniform(0, 360, n_asteroids)[asteroid] + rate[asteroid, 0] * epoch) % 360
+    dec = np.clip(rng.uniform(-60, 60, n_asteroids)[asteroid] + rate[asteroid, 1] * epoch, -90, 90)
+    observations = Table([source_ids[asteroid], observation_id, numbers[asteroid], epoch, ra, dec],
+                         names=('source_id', 'observation_id', 'number_mp', 'epoch', 'ra', 'dec'))
+
+    a = rng.uniform(2.0, 3.5, n_asteroids)
+    e = rng.uniform(0.0, 0.3, n_asteroids)
+    orbits = {int(n): {'number': int(n), 'name': 'Synthetic{}'.format(n),
+                       'semimajor_axis': str(a[i]), 'eccentricity': str(e[i])}
+              for i, n in enumerate(numbers)}
+    return source, observations, orbits
+
@@ -0,0 +1,17 @@
+import pytest
+import matplotlib
+matplotlib.use('Agg')
+from asteroidal.testing import SOURCES, OBSERVATIONS, ORBITS, FakeArchive
+
+
+@pytest.fixture
+def archive(monkeypatch):
+    """Replaces Gaia and MPC queries with an offline FakeArchive."""
+    return FakeArchive().install(monkeypatch)
+
+
+@pytest.fixture
+def local_backend():
+    """LocalBackend serving the small tables without network."""
+    from asteroidal.backends import LocalBackend
+    return LocalBackend(SOURCES, OBSERVATIONS, orbits=ORBITS)
@@ -6,6 +6,13 @@ setup(
 
     version='1.1.1',
 
-    packages=find_packages()
+    packages=find_packages(),
+
+    entry_points={
+        'console_scripts': [
+            'asteroidal-mpcorb=asteroidal.mpcorb:main',
+            'asteroidal-export=asteroidal.export:main',
+        ],
+    }
 
 )
\ No newline at end of file
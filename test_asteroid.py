@@ -68,4 +68,54 @@ def test_blank_asteroid_orbits():
     for i in range(0,10):
         asteroid = ast.Asteroid()
         asteroids.append(asteroid)
-    ast.plot_multiple_orbits(asteroids)
\ No newline at end of file
+    ast.plot_multiple_orbits(asteroids)
+
+def test_lazy_asteroid(archive):
+    """
+    Tests that lazy asteroid only queries observations and MPC when used.
+    """
+    flora = ast.Asteroid(number_mp=8, lazy=True)
+
+    assert len(archive.queries) == 1
+    assert len(archive.mpc_queries) == 0
+    assert flora.orbit_data[0] == pytest.approx(2.2017319)
+    assert len(archive.queries) == 1
+    assert len(flora.transits) == 3
+    assert len(flora.observations) == flora.num_of_obs
+    assert len(archive.queries) == 2
+    assert len(archive.mpc_queries) == 1
+    with pytest.raises(AttributeError):
+        flora.missing
+
+def test_import_is_light():
+    """
+    Tests that importing asteroid module does not import plotting or query packages.
+    """
+    import subprocess
+    import sys
+    code = 'import sys, asteroidal.asteroid; print(sorted(m for m in ("matplotlib", "astroquery", "astropy") if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+def test_single_artist_plots(local_backend):
+    """
+    Tests that plot methods draw one scatter per axes onto given axes.
+    """
+    flora = ast.Asteroid(number_mp=8, backend=local_backend)
+    fig, ax = plt.subplots(ncols=2)
+
+    assert flora.plot_observations(ax=ax[0]) is ax[0]
+    assert len(ax[0].collections) == 1
+    assert len(ax[0].collections[0].get_offsets()) == 6
+    assert ax[0].get_legend() is None
+    assert len(fig.axes) == 3
+    flora.plot_transit(0, ax=ax[1])
+    assert len(ax[1].collections) == 1
+    assert len(ax[1].collections[0].get_facecolors()) == 3
+
+    grid = flora.plot_all_transits(fig=plt.figure())
+    assert len(grid.axes) == 3
+    assert [len(curax.collections) for curax in grid.axes] == [1, 1, 1]
+    polar = plt.subplots(subplot_kw={'projection': 'polar'})[1]
+    assert flora.plot_orbits(ax=polar) is polar
+    plt.close('all')
@@ -0,0 +1,61 @@
+from asteroidal import asteroid as ast
+from asteroidal.backends import LocalBackend, GaiaBackend, get_backend, set_backend, write_columns
+from asteroidal.catalog import AsteroidCatalog
+from asteroidal.testing import SOURCES, OBSERVATIONS, ORBITS
+import numpy as np
+import pytest
+
+@pytest.mark.parametrize('fmt', ['csv', 'fits', 'npy'])
+def test_local_dumps(tmp_path, fmt):
+    """
+    Tests that local backend reads dumps in every format and answers
+    like the Gaia archive.
+    """
+    if fmt == 'npy':
+        source, observations = str(tmp_path / 'source'), str(tmp_path / 'observation')
+        write_columns(SOURCES, source)
+        write_columns(OBSERVATIONS, observations, sort_by=('source_id', 'observation_id'))
+    else:
+        source, observations = str(tmp_path / ('source.' + fmt)), str(tmp_path / ('observation.' + fmt))
+        SOURCES.write(source)
+        OBSERVATIONS.write(observations)
+    backend = LocalBackend(source, observations, orbits=ORBITS)
+    if fmt == 'npy':
+        assert isinstance(backend.observations['ra'], np.memmap)
+        assert backend.order is None
+
+    flora = ast.Asteroid(denomination='Flora', backend=backend)
+    assert flora.number_mp == 8
+    assert flora.num_of_obs == 6
+    assert len(flora.observations) == 6
+    assert [list(ccds) for ccds in flora.transit_ccds] == [[1, 2, 3], [1, 2], [1]]
+    assert flora.orbit_data[1] == pytest.approx(0.1560672)
+    assert len(backend.query_observations([-4284967217, -4284967216, 5])) == 9
+
+def test_default_backend(local_backend):
+    """
+    Tests that default backend is used by Asteroid and AsteroidCatalog.
+    """
+    assert isinstance(get_backend(), GaiaBackend)
+    set_backend(local_backend)
+    try:
+        catalog = AsteroidCatalog(number_mp=[12, 9, 8, 3])
+        blank = ast.Asteroid(number_mp=3)
+    finally:
+        set_backend(None)
+
+    assert [asteroid.number_mp for asteroid in catalog] == [12, 9, 8]
+    assert catalog.max_ids == LocalBackend.max_ids
+    assert len(catalog.get(number_mp=9).observations) == 3
+    assert blank.number_mp == 0
+    assert isinstance(get_backend(), GaiaBackend)
+
+def test_missing_orbit(local_backend):
+    """
+    Tests that asteroid without orbit data in backend gets empty orbit.
+    """
+    local_backend.orbits = {}
+    flora = ast.Asteroid(number_mp=8, backend=local_backend)
+
+    assert flora.mpc_data == {}
+    assert list(flora.orbit_data) == [0, 0]
@@ -0,0 +1,75 @@
+from asteroidal import asteroid as ast
+from asteroidal import cache
+import pytest
+
+@pytest.fixture
+def query_cache(tmp_path):
+    enabled = cache.enable_cache(str(tmp_path))
+    yield enabled
+    cache.disable_cache()
+
+def test_cached_asteroid(archive, query_cache):
+    """
+    Tests that asteroid loaded twice is only queried once and that
+    normalized query text shares cache entries.
+    """
+    first = ast.Asteroid(number_mp=8)
+    queries = len(archive.queries) + len(archive.mpc_queries)
+    second = ast.Asteroid(number_mp=8)
+
+    assert len(archive.queries) + len(archive.mpc_queries) == queries
+    assert second.num_of_obs == first.num_of_obs
+    assert len(second.observations) == len(first.observations)
+    assert second.orbit_data[0] == pytest.approx(2.2017319)
+    assert query_cache.misses == 3
+    assert query_cache.hits == 3
+    assert query_cache.key('gaia', 'SELECT  a\n FROM b') == query_cache.key('gaia', 'SELECT a FROM b')
+
+def test_offline_cache(archive, query_cache):
+    """
+    Tests that offline cache serves cached queries and raises on misses.
+    """
+    ast.Asteroid(number_mp=8)
+    query_cache.offline = True
+    queries = len(archive.queries)
+
+    assert ast.Asteroid(number_mp=8).num_of_obs == 6
+    assert len(archive.queries) == queries
+    with pytest.raises(cache.OfflineCacheMiss):
+        ast.Asteroid(number_mp=9)
+
+def test_ttl_and_eviction(tmp_path):
+    """
+    Tests that expired entries are refetched and least recently used
+    entries are evicted past max_size.
+    """
+    expiring = cache.QueryCache(str(tmp_path / 'ttl'), ttl=-1)
+    expiring.set('gaia', 'q', 1)
+    assert expiring.get('gaia', 'q') == (False, None)
+    expiring.offline = True
+    assert expiring.get('gaia', 'q') == (True, 1)
+
+    small = cache.QueryCache(str(tmp_path / 'lru'), max_size=250)
+    small.set('gaia', 'a', b'x' * 100)
+    small.set('gaia', 'b', b'x' * 100)
+    small.get('gaia', 'a')
+    small.set('gaia', 'c', b'x' * 100)
+
+    assert small.get('gaia', 'b') == (False, None)
+    assert small.get('gaia', 'a')[0]
+    assert small.get('gaia', 'c')[0]
+    assert small.stats()['entries'] == 2
+    small.clear()
+    assert len(small) == 0
+
+def test_threaded_counts(tmp_path):
+    """
+    Tests that hits and misses counted from many threads add up.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    counting = cache.QueryCache(str(tmp_path))
+    counting.set('gaia', 'a', 1)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: counting.get('gaia', 'a' if i % 2 else 'b'), range(200)))
+
+    assert (counting.hits, counting.misses) == (100, 100)
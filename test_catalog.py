@@ -0,0 +1,36 @@
+from asteroidal import asteroid as ast
+from asteroidal.catalog import AsteroidCatalog
+import pytest
+
+def test_bulk_catalog(archive):
+    """
+    Tests that catalog resolves identifiers and observations in one query each
+    and that its asteroids match individually initialized asteroids.
+    """
+    catalog = ast.Asteroid.bulk(number_mp=[9, 8, 3])
+
+    assert len(archive.queries) == 2
+    assert [asteroid.number_mp for asteroid in catalog] == [9, 8]
+    flora = catalog.get(number_mp=8)
+    single = ast.Asteroid(number_mp=8)
+    assert flora.source_id == single.source_id
+    assert flora.num_of_obs == single.num_of_obs
+    assert len(flora.observations) == len(single.observations)
+    assert list(flora.observations['observation_id']) == sorted(single.observations['observation_id'])
+    assert flora.orbit_data[0] == pytest.approx(2.2017319)
+    assert catalog.get(denomination='metis').number_mp == 9
+    assert catalog.get(number_mp=3) is None
+    ast.plot_multiple_orbits(catalog)
+    flora.plot_all_transits()
+
+def test_catalog_chunks(archive):
+    """
+    Tests that observation queries are split by max_ids and max_rows and that
+    asteroids without observations are kept.
+    """
+    catalog = AsteroidCatalog(number_mp=[8, 9, 12], denomination=['flora'], mpc=False, max_ids=2, max_rows=4)
+
+    assert len(catalog) == 3
+    assert sum('sso_observation' in q for q in archive.queries) == 2
+    assert len(catalog.get(number_mp=12).observations) == 0
+    assert len(catalog.observations) == 9
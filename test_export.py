@@ -0,0 +1,50 @@
+import os
+from asteroidal.catalog import AsteroidCatalog
+from asteroidal.export import export_figures, main
+
+def test_export_figures(local_backend, tmp_path):
+    """
+    Tests that figures are rendered in worker processes and skipped when
+    export is resumed.
+    """
+    results = export_figures([8, 'metis', 12], str(tmp_path), fmt='png', processes=2, backend=local_backend)
+    statuses = {(asteroid, kind): status for asteroid, kind, path, status in results}
+
+    assert statuses[(8, 'transits')] == 'written'
+    assert statuses[('metis', 'orbit')] == 'written'
+    assert statuses[(12, 'transits')] == 'empty'
+    assert statuses[(12, 'orbit')] == 'written'
+    assert os.path.getsize(tmp_path / '8_transits.png') > 0
+    assert not any(name.endswith('.tmp') for name in os.listdir(str(tmp_path)))
+    os.remove(str(tmp_path / '8_orbit.png'))
+    results = export_figures([8, 'metis'], str(tmp_path), processes=1, backend=local_backend)
+    assert sorted(status for asteroid, kind, path, status in results) == ['skipped']*3 + ['written']
+
+def test_export_cli(local_backend, tmp_path):
+    """
+    Tests command line export of asteroids from a saved catalog.
+    """
+    AsteroidCatalog(number_mp=[8, 9], backend=local_backend).save(str(tmp_path / 'catalog'))
+    code = main(['8', '9', '-o', str(tmp_path / 'figures'), '-k', 'observations', '-f', 'pdf',
+                 '--store', str(tmp_path / 'catalog'), '-p', '1'])
+
+    assert code == 0
+    assert sorted(os.listdir(str(tmp_path / 'figures'))) == ['8_observations.pdf', '9_observations.pdf']
+
+def test_export_in_process(archive, tmp_path):
+    """
+    Tests that exporting in process keeps the matplotlib backend and only
+    runs the queries needed by the figures rendered.
+    """
+    import matplotlib
+    previous = matplotlib.get_backend()
+    matplotlib.use('svg')
+    try:
+        results = export_figures([8, 9], str(tmp_path), kinds=('orbit',), processes=1)
+        assert matplotlib.get_backend() == 'svg'
+    finally:
+        matplotlib.use(previous)
+
+    assert [status for asteroid, kind, path, status in results] == ['written', 'written']
+    assert not any('sso_observation' in query for query in archive.queries)
+    assert sorted(archive.mpc_queries) == [8, 9]
@@ -0,0 +1,94 @@
+from asteroidal.catalog import AsteroidCatalog
+from asteroidal.fetch import Fetcher, TokenBucket, fetch_mpc, is_transient
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stub archive answering every request after a delay, failing the first request to /flaky."""
+    delay = 0.2
+    failed = set()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self.path.startswith('/flaky') and self.path not in self.failed:
+            self.failed.add(self.path)
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(self.path.encode())
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+def test_concurrent_fetch(server):
+    """
+    Tests that wall time of many slow requests is bounded by the concurrency limit.
+    """
+    progress = []
+    fetcher = Fetcher(max_workers=10, progress=lambda done, total: progress.append((done, total)))
+    urls = ['{}/obs/{}'.format(server, i) for i in range(20)]
+    start = time.monotonic()
+    results = fetcher.map(get, urls)
+    elapsed = time.monotonic() - start
+
+    assert results == ['/obs/{}'.format(i) for i in range(20)]
+    assert elapsed < 2.0
+    assert sorted(progress) == [(i, 20) for i in range(1, 21)]
+
+def test_retries(server):
+    """
+    Tests that transient server errors are retried and client errors are not.
+    """
+    fetcher = Fetcher(max_workers=4, retries=2, backoff=0.01)
+
+    assert fetcher.map(get, ['{}/flaky/{}'.format(server, i) for i in range(3)]) == ['/flaky/{}'.format(i) for i in range(3)]
+    assert fetcher.failures == 3
+    assert fetcher.requests == 6
+    assert not is_transient(ValueError())
+    assert not is_transient(FileNotFoundError())
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(urllib.error.HTTPError('url', 404, 'Not Found', {}, None))
+    with pytest.raises(ValueError):
+        Fetcher(retries=5).call(int, 'x')
+
+def test_token_bucket():
+    """
+    Tests that token bucket limits rate of requests.
+    """
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for i in range(11):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.18
+
+def test_catalog_fetcher(archive):
+    """
+    Tests that catalog runs MPC queries through fetcher.
+    """
+    fetcher = Fetcher(max_workers=4)
+    catalog = AsteroidCatalog(number_mp=[8, 9, 12], fetcher=fetcher)
+
+    assert sorted(archive.mpc_queries) == [8, 9, 12]
+    assert fetcher.requests == 1 + 1 + 3
+    assert [a.orbit_data[0] for a in catalog] == [pytest.approx(2.2017319), pytest.approx(2.3856), pytest.approx(2.3343)]
+    assert [r[0]['number'] for r in fetch_mpc([9, 12])] == [9, 12]
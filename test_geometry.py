@@ -0,0 +1,36 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from asteroidal.geometry import theta_grid, orbit_radii, orbit_density, plot_orbit_collection
+
+def test_orbit_radii():
+    """
+    Tests that radii of all orbits are computed at once like the polar orbit equation.
+    """
+    theta, _ = theta_grid()
+    params = np.array([[1., 0.], [2.2017319, 0.1560672]])
+    radii = orbit_radii(params)
+    assert radii.shape == (2, len(theta))
+    assert np.allclose(radii[0], 1.)
+    a, e = params[1]
+    assert np.allclose(radii[1], a*(1.-e**2)/(1.+e*np.cos(theta)))
+    assert np.allclose(orbit_radii(params[1])[0], radii[1])
+
+def test_orbit_density():
+    """
+    Tests that every point of every orbit is counted once in the density map.
+    """
+    params = np.array([[1., 0.], [2., 0.1], [3., 0.2]])
+    counts, theta_edges, r_edges = orbit_density(params, rmax=5., bins=(36, 10), chunk=2)
+    assert counts.shape == (36, 10)
+    assert counts.sum() == 3 * len(theta_grid()[0])
+    assert counts[:, 2].sum() == len(theta_grid()[0])
+
+def test_plot_orbit_collection():
+    """
+    Tests that orbits are drawn as a single LineCollection.
+    """
+    fig, ax = plt.subplots(subplot_kw={'projection': 'polar'})
+    collection = plot_orbit_collection(ax, np.array([[1., 0.], [2., 0.1]]), label='2 Asteroids')
+    assert len(collection.get_segments()) == 2
+    assert len(ax.collections) == 1
+    plt.close(fig)
@@ -0,0 +1,32 @@
+import json
+from asteroidal import asteroid as ast
+from asteroidal import cache
+from asteroidal.instrument import collect, enabled
+
+def test_collect_asteroid(archive, tmp_path):
+    """
+    Tests that phases, round trips, rows and cache hits of asteroid loads are
+    recorded only inside collect.
+    """
+    events = []
+    cache.enable_cache(str(tmp_path))
+    try:
+        with collect(callback=events.append) as stats:
+            flora = ast.Asteroid(number_mp=8)
+            ast.Asteroid(number_mp=8)
+            flora.plot_orbits()
+        ast.Asteroid(number_mp=9)
+    finally:
+        cache.disable_cache()
+
+    result = json.loads(stats.to_json())
+    assert not enabled()
+    assert set(result['phases']) >= {'query_source', 'query_observations', 'set_transits', 'query_mpc', 'plot_orbits'}
+    assert result['phases']['query_source']['calls'] == 2
+    assert result['round_trips'] == 3
+    assert result['requests']['gaia']['count'] == 2
+    assert result['requests']['gaia']['rows'] == 7
+    assert result['requests']['gaia']['bytes'] > 0
+    assert result['requests']['mpc']['count'] == 1
+    assert result['cache'] == {'hits': 3, 'misses': 3}
+    assert len(events) == sum(p['calls'] for p in result['phases'].values()) + 3 + 6
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from astropy.table import Table
+from asteroidal import kepler
+from asteroidal.backends import LocalBackend
+from asteroidal.catalog import AsteroidCatalog
+
+FLORA = {'number': 8, 'name': 'Flora', 'semimajor_axis': '2.2017319', 'eccentricity': '0.1560672',
+         'inclination': '5.88881', 'ascending_node': '110.86043', 'argument_of_perihelion': '285.53113',
+         'mean_anomaly': '151.36862', 'epoch_jd': '2460800.5', 'mean_daily_motion': '0.30188624'}
+METIS = {'number': 9, 'name': 'Metis', 'semimajor_axis': '2.3856', 'eccentricity': '0.1231',
+         'inclination': '5.57', 'ascending_node': '68.9', 'argument_of_perihelion': '6.4',
+         'mean_anomaly': '200.1', 'epoch_jd': '2460800.5'}
+
+def test_solve_kepler():
+    """
+    Tests that eccentric anomalies solve Kepler's equation for all eccentricities.
+    """
+    rng = np.random.default_rng(2)
+    M = rng.uniform(-10, 10, 10000)
+    e = rng.uniform(0, 0.99, 10000)
+    E = kepler.solve_kepler(M, e)
+
+    assert np.allclose(np.remainder(E - e*np.sin(E) - M + np.pi, 2*np.pi) - np.pi, 0, atol=1e-10)
+
+def test_predict_geometry():
+    """
+    Tests predictions of a circular orbit in the ecliptic seen from the Sun.
+    """
+    epoch = np.array([100., 100. + 2*np.pi/kepler.GAUSS_K/4])
+    tdb = kepler.tcb_to_tdb(kepler.GAIA_EPOCH_JD + 100.)
+    orbit = np.array([1., 0., 0., 0., 0., 0., tdb, np.nan])
+    ra, dec = kepler.predict(orbit, epoch, observer=np.zeros((2, 3)), sun=np.zeros((2, 3)), light_time=False)
+
+    assert ra[0] == pytest.approx(0, abs=1e-6) or ra[0] == pytest.approx(360)
+    assert dec[0] == pytest.approx(0, abs=1e-6)
+    assert ra[1] == pytest.approx(90, abs=1e-5)
+    assert dec[1] == pytest.approx(23.4392911, abs=1e-5)
+
+def test_catalog_residuals():
+    """
+    Tests that observations generated from MPC elements have zero residuals
+    for asteroids propagated together.
+    """
+    epoch = np.linspace(1000, 1500, 6)
+    rows = []
+    for source_id, number, orbit in ((-1, 8, FLORA), (-2, 9, METIS)):
+        ra, dec = kepler.predict(kepler.elements(orbit), epoch)
+        for i in range(len(epoch)):
+            rows.append((source_id, (10**17 + 100*number + i)*10 + 1, number, epoch[i], ra[i], dec[i]))
+    observations = Table(rows=rows, names=('source_id', 'observation_id', 'number_mp', 'epoch', 'ra', 'dec'))
+    source = Table(rows=[(-1, 6, 8, 'flora'), (-2, 6, 9, 'metis')],
+                   names=('source_id', 'num_of_obs', 'number_mp', 'denomination'))
+    backend = LocalBackend(source, observations, orbits={8: FLORA, 9: METIS})
+    catalog = AsteroidCatalog(number_mp=[9, 8], backend=backend)
+    result = catalog.residuals()
+
+    assert list(result['source_id']) == [-2]*6 + [-1]*6
+    assert np.max(np.abs(result['d_ra'])) < 1
+    assert np.max(np.abs(result['d_dec'])) < 1
+    assert len(catalog.get(number_mp=8).residuals()) == 6
+
+def test_catalog_residuals_query_mpc_once(archive):
+    """
+    Tests that catalogs query MPC once per asteroid, and that residuals and
+    mpc_data read the elements stored by the catalog.
+    """
+    catalog = AsteroidCatalog(number_mp=[8, 9, 12])
+    assert sorted(archive.mpc_queries) == [8, 9, 12]
+
+    catalog.residuals()
+    flora = catalog.get(number_mp=8)
+    assert flora.mpc_data['name'] == 'Flora'
+    assert catalog.get(number_mp=9).mpc_data['name'] == 'Metis'
+    assert catalog.store.orbits.shape == (3, len(kepler.ELEMENT_FIELDS))
+    assert flora.orbit_data[1] == pytest.approx(0.1560672)
+    assert len(archive.mpc_queries) == 3
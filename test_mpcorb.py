@@ -0,0 +1,128 @@
+from asteroidal import asteroid as ast
+from asteroidal import mpcorb
+from asteroidal.backends import LocalBackend
+from asteroidal.testing import SOURCES, OBSERVATIONS
+import json
+import numpy as np
+import pytest
+
+HEADER = b'MINOR PLANET CENTER ORBIT DATABASE (MPCORB)\n\nDes\'n     H     G   Epoch     M        Peri.      Node       Incl.       e            n           a\n' + b'-' * 160 + b'\n'
+
+def line(designation, h, epoch, m, peri, node, incl, e, n, a, readable):
+    """Formats MPCORB.DAT line with fields at their documented columns."""
+    row = [' '] * 202
+    def put(start, text):
+        row[start-1:start-1+len(text)] = text
+    put(1, designation)
+    put(9, h)
+    put(15, ' 0.15')
+    put(21, epoch)
+    put(27, '{:9.5f}'.format(m))
+    put(38, '{:9.5f}'.format(peri))
+    put(49, '{:9.5f}'.format(node))
+    put(60, '{:9.5f}'.format(incl))
+    put(71, '{:9.7f}'.format(e))
+    put(81, '{:11.8f}'.format(n))
+    put(93, '{:11.7f}'.format(a))
+    put(167, readable)
+    return ''.join(row).rstrip().encode()
+
+LINES = [
+    line('00001', ' 3.34', 'K2555', 188.70269, 73.27343, 80.25221, 10.5878, 0.0794013, 0.21424651, 2.7660512, '(1) Ceres'),
+    line('00008', ' 6.35', 'K2555', 151.36862, 285.53113, 110.86043, 5.88881, 0.1560672, 0.30188624, 2.2017319, '(8) Flora'),
+    line('A0001', '13.10', 'K2555', 10.0, 20.0, 30.0, 4.0, 0.1, 0.2, 2.5, '(100001) 1998 AA1'),
+    line('~0001', '16.20', 'K2555', 10.0, 20.0, 30.0, 4.0, 0.1, 0.2, 2.6, '(620001) 2014 ZZ1'),
+    line('K14A00A', '', 'K2555', 10.0, 20.0, 30.0, 4.0, 0.2, 0.2, 3.1, '2014 AA'),
+]
+
+@pytest.fixture
+def mpcorb_file(tmp_path):
+    path = tmp_path / 'MPCORB.DAT'
+    path.write_bytes(HEADER + b'\n'.join(LINES[:3]) + b'\n\n' + b'\n'.join(LINES[3:]) + b'\n')
+    return str(path)
+
+def test_parse_mpcorb(mpcorb_file):
+    """
+    Tests that fixed-width parser decodes packed numbers, epochs and elements.
+    """
+    orbits = mpcorb.parse_file(mpcorb_file)
+
+    assert list(orbits['number']) == [1, 8, 100001, 620001, 0]
+    assert list(orbits['designation']) == [b'00001', b'00008', b'A0001', b'~0001', b'K14A00A']
+    assert orbits['epoch_jd'][0] == 2460800.5
+    assert orbits['semimajor_axis'][1] == pytest.approx(2.2017319)
+    assert orbits['eccentricity'][1] == pytest.approx(0.1560672)
+    assert orbits['inclination'][0] == pytest.approx(10.5878)
+    assert np.isnan(orbits['absolute_magnitude'][4])
+    assert mpcorb.pack_number(100001) == 'A0001'
+    assert mpcorb.pack_number(620001) == '~0001'
+    assert mpcorb.pack_designation('2014 AA') == 'K14A00A'
+    assert mpcorb.pack_designation('2007 TA418') == 'K07Tf8A'
+
+def test_orbit_index(mpcorb_file, tmp_path):
+    """
+    Tests lookups by number and designation in saved, memory-mapped index.
+    """
+    path = str(tmp_path / 'mpcorb.npy')
+    mpcorb.ingest(mpcorb_file, path)
+    index = mpcorb.OrbitIndex.load(path)
+
+    assert isinstance(index.orbits, np.memmap)
+    assert len(index) == 5
+    assert index.get(8)['semimajor_axis'] == pytest.approx(2.2017319)
+    assert index.get(8)['name'] == 'Flora'
+    assert index.get(3) is None
+    assert index.get('flora')['number'] == 8
+    assert index.get('2014 AA')['semimajor_axis'] == pytest.approx(3.1)
+    assert index.get('K14A00A')['designation'] == '2014 AA'
+    assert index.orbit_data([8, 3, 620001]) == pytest.approx(np.array([[2.2017319, 0.1560672], [0, 0], [2.6, 0.1]]))
+
+def test_refresh(mpcorb_file, tmp_path):
+    """
+    Tests that refresh rewrites only changed records in place and rewrites
+    the index when records are added.
+    """
+    path = str(tmp_path / 'mpcorb.npy')
+    assert mpcorb.refresh(mpcorb_file, path)['added'] == 5
+
+    changed = LINES[1].replace(b'0.1560672', b'0.1560999')
+    with open(mpcorb_file, 'wb') as file:
+        file.write(HEADER + b'\n'.join([LINES[0], changed] + LINES[2:]))
+    assert mpcorb.refresh(mpcorb_file, path) == {'changed': 1, 'added': 0, 'removed': 0, 'unchanged': 4}
+    assert mpcorb.OrbitIndex.load(path).get(8)['eccentricity'] == pytest.approx(0.1560999)
+
+    added = line('00009', ' 6.3', 'K2555', 1.0, 2.0, 3.0, 5.5, 0.1231, 0.27, 2.3856, '(9) Metis')
+    with open(mpcorb_file, 'ab') as file:
+        file.write(b'\n' + added + b'\n')
+    assert mpcorb.main(['refresh', mpcorb_file, path]) == 0
+    assert mpcorb.OrbitIndex.load(path).get(9)['semimajor_axis'] == pytest.approx(2.3856)
+
+def test_parse_json(tmp_path):
+    """
+    Tests parsing of mpcorb_extended.json.
+    """
+    records = [{'Number': '(8)', 'Name': 'Flora', 'Principal_desig': 'A847 US', 'Epoch': 2460800.5,
+                'a': 2.2017319, 'e': 0.1560672, 'i': 5.88881, 'Node': 110.86043, 'Peri': 285.53113,
+                'M': 151.36862, 'n': 0.30188624, 'H': 6.35, 'G': 0.15},
+               {'Principal_desig': '2014 AA', 'Epoch': 2460800.5, 'a': 3.1, 'e': 0.2}]
+    path = tmp_path / 'mpcorb_extended.json'
+    path.write_text(json.dumps(records))
+    index = mpcorb.OrbitIndex.from_file(str(path))
+
+    assert index.get(8)['ascending_node'] == pytest.approx(110.86043)
+    assert index.get('K14A00A')['semimajor_axis'] == pytest.approx(3.1)
+
+def test_backend_orbits(mpcorb_file):
+    """
+    Tests that local backend and plot_multiple_orbits look up orbits in index.
+    """
+    index = mpcorb.OrbitIndex.from_file(mpcorb_file)
+    backend = LocalBackend(SOURCES, OBSERVATIONS, orbits=index)
+    flora = ast.Asteroid(number_mp=8, backend=backend)
+    metis = ast.Asteroid(number_mp=9, backend=backend, lazy=True)
+
+    assert flora.orbit_data[0] == pytest.approx(2.2017319)
+    assert flora.mpc_data['argument_of_perihelion'] == pytest.approx(285.53113)
+    ast.plot_multiple_orbits([flora, metis], orbits=index)
+    with pytest.raises(AttributeError):
+        object.__getattribute__(metis, 'orbit_data')
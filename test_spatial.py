@@ -0,0 +1,56 @@
+import numpy as np
+from astropy.table import Table
+from asteroidal.testing import SOURCES, OBSERVATIONS
+from asteroidal.store import CatalogStore
+from asteroidal.spatial import ObservationIndex
+
+def brute_cone(ra, dec, ra0, dec0, radius):
+    """Angular distance test over every observation."""
+    ra, dec, ra0, dec0 = (np.radians(v) for v in (ra, dec, ra0, dec0))
+    cos = np.sin(dec)*np.sin(dec0) + np.cos(dec)*np.cos(dec0)*np.cos(ra - ra0)
+    return np.degrees(np.arccos(np.clip(cos, -1, 1))) <= radius
+
+def test_cone_matches_brute_force():
+    """
+    Tests that cone, box and time window queries find the same observations as
+    a brute force search, including near RA = 0 and the poles.
+    """
+    rng = np.random.default_rng(3)
+    n = 20000
+    source_id = -np.repeat(np.arange(1, 201), 100)
+    observations = Table([source_id, (10**17 + np.arange(n) // 4) * 10 + 1 + np.arange(n) % 4,
+                          -source_id, rng.uniform(0, 1000, n), rng.uniform(0, 360, n),
+                          np.degrees(np.arcsin(rng.uniform(-1, 1, n)))],
+                         names=('source_id', 'observation_id', 'number_mp', 'epoch', 'ra', 'dec'))
+    source = Table([-np.arange(1, 201), np.full(200, 100), np.arange(1, 201), ['a']*200],
+                   names=('source_id', 'num_of_obs', 'number_mp', 'denomination'))
+    store = CatalogStore.from_tables(source, observations)
+    index = ObservationIndex(store, zone_height=1.0)
+    obs = store.observations
+
+    centers = np.array([[0.5, 10., 3.], [359.8, -20., 5.], [120., 88., 4.], [200., -89.5, 2.]])
+    hits = index.cone(centers[:, 0], centers[:, 1], centers[:, 2], start=100., end=900.)
+    for q, (ra0, dec0, radius) in enumerate(centers):
+        mask = brute_cone(obs['ra'], obs['dec'], ra0, dec0, radius) & (obs['epoch'] >= 100) & (obs['epoch'] <= 900)
+        expected = set(zip(np.repeat(np.arange(200), 100)[mask], obs['observation_id'][mask] // 10))
+        found = hits[hits['query'] == q]
+        assert set(zip(found['asteroid'], found['transit_id'])) == expected
+        assert found['n_obs'].sum() == np.count_nonzero(mask)
+
+    hits = index.box(350., 10., -5., 5.)
+    mask = ((obs['ra'] >= 350) | (obs['ra'] <= 10)) & (np.abs(obs['dec']) <= 5)
+    assert hits['n_obs'].sum() == np.count_nonzero(mask)
+    hits = index.time_window([10., 500.], [20., 500.5])
+    assert hits[hits['query'] == 0]['n_obs'].sum() == np.count_nonzero((obs['epoch'] >= 10) & (obs['epoch'] <= 20))
+
+def test_transit_hits():
+    """
+    Tests that hits are reported per asteroid and transit of the store.
+    """
+    index = ObservationIndex(CatalogStore.from_tables(SOURCES, OBSERVATIONS))
+    hits = index.cone(150.0, 10.0, 0.001)
+
+    assert list(hits['source_id']) == [-4284967216]
+    assert list(hits['transit_id']) == [100000000000000001]
+    assert list(hits['n_obs']) == [3]
+    assert len(index.cone(0., 0., 1.)) == 0
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from asteroidal.testing import SOURCES, OBSERVATIONS
+from asteroidal import asteroid as ast
+from asteroidal.catalog import AsteroidCatalog
+from asteroidal.store import CatalogStore, AsteroidView
+
+def test_store_views(local_backend):
+    """
+    Tests that views read the same attributes as individually initialized asteroids.
+    """
+    store = CatalogStore.from_tables(SOURCES[::-1], OBSERVATIONS, backend=local_backend)
+
+    assert list(store.offsets) == [0, 0, 3, 9]
+    flora = store[-1]
+    single = ast.Asteroid(number_mp=8, backend=local_backend)
+    assert isinstance(flora, ast.Asteroid)
+    assert not hasattr(flora, '__dict__')
+    assert flora.source_id == single.source_id
+    assert flora.denomination == 'flora'
+    assert list(flora.transits) == list(single.transits)
+    assert [list(c) for c in flora.transit_ccds] == [list(c) for c in single.transit_ccds]
+    assert list(flora.get_transit_obs(1)[0]) == list(single.get_transit_obs(1)[0])
+    assert np.isnan(store.orbits[2, 0])
+    assert flora.orbit_data[0] == pytest.approx(2.2017319)
+    assert store.orbits[2, 0] == pytest.approx(2.2017319)
+    assert len(store[0].observations) == 0
+    assert store.find(denomination='Metis') == 1
+
+def test_catalog_save_load(local_backend, tmp_path):
+    """
+    Tests that catalog is restored from memory-mapped store with its orbits.
+    """
+    catalog = AsteroidCatalog(number_mp=[8, 9, 12], backend=local_backend)
+    catalog.save(str(tmp_path))
+    loaded = AsteroidCatalog.load(str(tmp_path), backend=local_backend)
+
+    assert isinstance(loaded.store.observations, np.memmap)
+    assert [a.number_mp for a in loaded] == [8, 9, 12]
+    assert isinstance(loaded.get(number_mp=9), AsteroidView)
+    assert len(loaded.get(number_mp=9).observations) == 3
+    assert np.allclose(loaded.store.orbits, catalog.store.orbits, equal_nan=True)
+    ast.plot_multiple_orbits(loaded)
+
+def test_view_transit_index_and_pickle(local_backend):
+    """
+    Tests that views slice transits computed once by the store, and that they
+    can be copied and pickled.
+    """
+    import copy
+    import pickle
+    from asteroidal.transits import TransitIndex
+    store = CatalogStore.from_tables(SOURCES, OBSERVATIONS, backend=local_backend)
+    flora = store[0]
+    single = TransitIndex(flora.observations['observation_id'])
+    index = flora.transit_index
+
+    assert store.transit_arrays() is store.transit_arrays()
+    assert list(index.offsets) == list(single.offsets)
+    assert list(index.inverse) == list(single.inverse)
+    assert list(index.order) == list(single.order)
+    assert list(store[1].transit_index.offsets) == [0, 2, 3]
+    assert len(store[2].transit_index) == 0
+    assert list(flora.get_transit_obs(1, columns=('epoch',))[0]) == [150.0, 150.00001]
+    for view in (copy.copy(flora), pickle.loads(pickle.dumps(flora))):
+        assert isinstance(view, AsteroidView)
+        assert view.source_id == flora.source_id
+        assert list(view.transits) == list(flora.transits)
+
+def test_view_queries(local_backend):
+    """
+    Tests that query methods of views return what the store holds instead of
+    failing on read-only attributes, and that plot_transit slices one transit.
+    """
+    import matplotlib.pyplot as plt
+    store = CatalogStore.from_tables(SOURCES, OBSERVATIONS, backend=local_backend)
+    flora = store[0]
+
+    assert list(flora.query_source('number_mp')['source_id']) == [flora.source_id]
+    assert len(flora.query_observations()) == 6
+    assert flora.query_observations(columns=('epoch',)).colnames == ['source_id', 'observation_id', 'epoch']
+    with pytest.raises(ValueError):
+        flora.query_observations(columns=('x_gaia',))
+    assert list(flora.set_transits()) == list(flora.transits)
+    ax = flora.plot_transit(0)
+    assert len(ax.get_legend().get_texts()) == 3
+    plt.close(ax.figure)
@@ -0,0 +1,93 @@
+import re
+import numpy as np
+from asteroidal.testing import OBSERVATIONS
+from asteroidal import backends
+from asteroidal.backends import Backend, GaiaBackend
+from asteroidal.stream import iter_observations, iter_transits, split_blocks
+
+def page(query, async_job=False):
+    """Answers keyset paging queries on sso_observation from OBSERVATIONS."""
+    assert async_job
+    table = OBSERVATIONS.copy()
+    table.sort(['source_id', 'observation_id'])
+    ids = np.asarray(table['source_id'])
+    obs = np.asarray(table['observation_id'])
+    mask = np.ones(len(table), dtype=bool)
+    match = re.search(r'source_id IN \((.*?)\)|source_id=(\S+)', query)
+    if match:
+        raw = match.group(1) or match.group(2)
+        mask &= np.isin(ids, [int(v) for v in raw.split(',')])
+    match = re.search(r'source_id > (\S+) OR \(source_id = \S+ AND observation_id > (\d+)\)', query)
+    if match:
+        sid, oid = int(match.group(1)), int(match.group(2))
+        mask &= (ids > sid) | ((ids == sid) & (obs > oid))
+    top = int(re.search(r'TOP (\d+)', query).group(1))
+    return table[mask][:top]
+
+def test_stream_local(local_backend):
+    """
+    Tests that chunks of a local dump are regrouped into one block per asteroid.
+    """
+    blocks = list(iter_observations(chunk_size=2, backend=local_backend))
+
+    assert [(source_id, len(obs)) for source_id, obs in blocks] == [(-4284967217, 3), (-4284967216, 6)]
+    blocks = list(iter_observations([-4284967216, 5], chunk_size=4, backend=local_backend))
+    assert [len(obs) for source_id, obs in blocks] == [6]
+
+def test_split_blocks_stacks_once(monkeypatch):
+    """
+    Tests that an asteroid spanning many chunks is stacked once, in order.
+    """
+    import astropy.table
+    calls = []
+    vstack = astropy.table.vstack
+    monkeypatch.setattr(astropy.table, 'vstack', lambda tables: calls.append(len(tables)) or vstack(tables))
+    table = OBSERVATIONS.copy()
+    table.sort(['source_id', 'observation_id'])
+    blocks = list(split_blocks(table[i:i+1] for i in range(len(table))))
+
+    assert [(source_id, len(obs)) for source_id, obs in blocks] == [(-4284967217, 3), (-4284967216, 6)]
+    assert list(blocks[1][1]['observation_id']) == list(table['observation_id'][3:])
+    assert calls == [3, 6]
+
+def test_default_chunks(local_backend):
+    """
+    Tests that the default chunked iteration packs asteroids by number of
+    observations and never yields more than chunk_size rows.
+    """
+    class Delegate(Backend):
+        def __init__(self):
+            self.queries = []
+
+        def query_sources(self, search_col, values):
+            return local_backend.query_sources(search_col, values)
+
+        def query_observations(self, source_ids, async_job=False, columns=None):
+            self.queries.append(list(source_ids))
+            return local_backend.query_observations(source_ids, async_job, columns)
+
+    backend = Delegate()
+    chunks = list(backend.iter_observation_chunks([-4284967216, -4284967217, -4284967220], chunk_size=4))
+
+    assert [len(chunk) for chunk in chunks] == [3, 4, 2]
+    assert len(backend.queries) == 2
+    blocks = list(iter_observations([-4284967216, -4284967217], chunk_size=4, backend=backend))
+    assert [len(obs) for source_id, obs in blocks] == [3, 6]
+
+def test_stream_gaia(monkeypatch):
+    """
+    Tests that keyset paging through Gaia returns every row exactly once.
+    """
+    queries = []
+    def launch_query(query, async_job=False):
+        queries.append(query)
+        return page(query, async_job)
+    monkeypatch.setattr(backends, 'launch_query', launch_query)
+
+    blocks = list(iter_transits(chunk_size=4, backend=GaiaBackend()))
+
+    assert len(queries) == 3
+    assert [len(obs) for source_id, index, obs in blocks] == [3, 6]
+    source_id, index, obs = blocks[1]
+    assert list(index.counts) == [3, 2, 1]
+    assert sorted(obs['observation_id']) == sorted(OBSERVATIONS['observation_id'][OBSERVATIONS['source_id'] == source_id])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from asteroidal.testing import SOURCES, OBSERVATIONS, ORBITS
+from asteroidal.backends import LocalBackend, GaiaBackend
+from asteroidal.adql import get_release
+from asteroidal.sync import Mirror
+
+def test_mirror_delta_sync(tmp_path):
+    """
+    Tests that syncs only fetch missing asteroids and new observations, and
+    that the mirror exports to a catalog.
+    """
+    old = OBSERVATIONS[np.asarray(OBSERVATIONS['observation_id']) < 2000000000000000100]
+    old_sources = SOURCES.copy()
+    old_sources['num_of_obs'][1] = 2
+    path = str(tmp_path / 'mirror.sqlite')
+    mirror = Mirror(path, backend=LocalBackend(old_sources, old, orbits=ORBITS))
+    first = mirror.sync(number_mp=[8, 9])
+
+    assert first == {'sources': 2, 'fetched': 2, 'up_to_date': 0, 'observations': 8}
+    assert mirror.sync(number_mp=[8, 9]) == {'sources': 0, 'fetched': 0, 'up_to_date': 2, 'observations': 0}
+    metis = mirror.sources([-4284967217])[0]
+    assert (metis['n_held'], metis['last_observation_id']) == (2, 2000000000000000022)
+
+    mirror = Mirror(path, backend=LocalBackend(SOURCES, OBSERVATIONS, orbits=ORBITS))
+    assert mirror.sync(denomination=['Metis'])['fetched'] == 0
+    second = mirror.sync(denomination=['Metis', 'Victoria'], refresh=True)
+    assert second == {'sources': 2, 'fetched': 2, 'up_to_date': 0, 'observations': 1}
+    assert list(mirror.observation_ids(-4284967217)) == [2000000000000000021, 2000000000000000022,
+                                                         2000000000000000101]
+    assert mirror.sync() == {'sources': 0, 'fetched': 0, 'up_to_date': 3, 'observations': 0}
+    assert len(mirror.observations()) == len(OBSERVATIONS)
+
+    catalog = mirror.to_catalog()
+    flora = catalog.get(number_mp=8)
+    assert [a.number_mp for a in catalog] == [12, 9, 8]
+    assert list(flora.transits) == [100000000000000001, 100000000000000010, 100000000000000020]
+    assert flora.orbit_data[0] == pytest.approx(2.2017319)
+    assert len(Mirror(path, backend=GaiaBackend(release='dr3'))) == 0
+
+def test_release_queries(archive):
+    """
+    Tests that queries target the tables and columns of the selected release.
+    """
+    backend = GaiaBackend(release='dr3')
+    backend.query_sources('number_mp', [8])
+    backend.query_observations([-4284967216])
+    assert 'FROM gaiadr3.sso_source' in archive.queries[0]
+    assert 'FROM gaiadr3.sso_observation' in archive.queries[1]
+    summary = backend.query_transit_summary([-4284967216])
+    assert 'GROUP BY source_id, transit_id' in archive.queries[-1]
+    assert list(summary['n_obs']) == [3, 2, 1]
+
+    new = GaiaBackend().query_new_observations({-4284967216: 1000000000000000013})
+    assert 'observation_id > 1000000000000000013' in archive.queries[-1]
+    assert 'observation_id/10 AS transit_id' in get_release('dr2').select_observations('source_id=1', ('transit_id',))
+    with pytest.raises(ValueError):
+        get_release('dr4')
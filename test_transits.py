@@ -0,0 +1,164 @@
+from asteroidal import asteroid as ast
+from asteroidal.transits import TransitIndex, transit_stats
+from asteroidal.catalog import AsteroidCatalog
+from asteroidal.backends import OBSERVATION_COLUMNS
+from asteroidal.adql import select_observations, POSITION_COLUMNS
+import numpy as np
+import pytest
+
+def test_transit_index():
+    """
+    Tests that transit index groups observation ids by transit like a nested loop would.
+    """
+    rng = np.random.default_rng(1)
+    observation_id = rng.integers(10**15, 10**15 + 500, size=400) * 10 + rng.integers(1, 10, size=400)
+    index = TransitIndex(observation_id)
+
+    transits = np.unique(observation_id // 10)
+    assert np.array_equal(index.transits, transits)
+    assert index.offsets[-1] == len(observation_id)
+    transit_ccds = index.transit_ccds()
+    for i, transit in enumerate(transits):
+        expected = [j % 10 for j in observation_id if j // 10 == transit]
+        assert list(index.get_ccds(i)) == expected
+        assert list(transit_ccds[i]) == expected
+        assert np.all(observation_id[index.order[index.offsets[i]:index.offsets[i+1]]] // 10 == transit)
+
+def test_empty_transit_index():
+    index = TransitIndex([])
+
+    assert len(index) == 0
+    assert list(index.offsets) == [0]
+    assert len(index.transit_ccds()) == 0
+
+def test_asteroid_transits(archive):
+    """
+    Tests that asteroid transits and transit_ccds come from the transit index.
+    """
+    flora = ast.Asteroid(number_mp=8)
+
+    assert list(flora.transits) == [100000000000000001, 100000000000000010, 100000000000000020]
+    assert [list(ccds) for ccds in flora.transit_ccds] == [[1, 2, 3], [1, 2], [1]]
+    assert len(flora.get_transit_obs(0)[0]) == 3
+
+def test_transit_obs_views(archive):
+    """
+    Tests that observations are sorted by transit and that transit observations
+    are views into the observations table.
+    """
+    metis = ast.Asteroid(number_mp=9)
+    ra = metis.observations['ra']
+
+    assert list(metis.observations['observation_id'] // 10) == sorted(metis.observations['observation_id'] // 10)
+    transit_ra, transit_dec = metis.get_transit_obs(0)
+    assert list(transit_ra) == [30.0, 30.000001]
+    assert np.shares_memory(transit_ra, ra)
+    epoch, = metis.get_transit_obs(1, columns=('epoch',))
+    assert list(epoch) == [250.0]
+    assert metis.get_transit_obs(5) == [[], []]
+    assert list(metis.get_transit_obs(-1)[0]) == [31.0]
+    with pytest.raises(IndexError):
+        metis.get_transit_obs(-3)
+
+    transits = list(metis.iter_transits(columns=('ra', 'dec', 'epoch')))
+    assert len(transits) == len(metis.transits)
+    for index, (transit, ccds, ra, dec, epoch) in enumerate(transits):
+        assert transit == metis.transits[index]
+        assert list(ccds) == list(metis.transit_ccds[index])
+        assert list(ra) == list(metis.get_transit_obs(index)[0])
+    assert list(ast.Asteroid().iter_transits()) == []
+
+def test_transit_summary(archive, local_backend):
+    """
+    Tests that transit summaries aggregated in ADQL and locally agree.
+    """
+    flora = ast.Asteroid(number_mp=8)
+    summary = flora.query_transit_summary()
+
+    assert 'GROUP BY source_id, observation_id/10' in archive.queries[-1]
+    assert list(summary['transit_id']) == list(flora.transits)
+    assert list(summary['n_obs']) == [3, 2, 1]
+    assert summary['ra'][0] == pytest.approx(150.000001)
+    assert summary['epoch_max'][0] - summary['epoch_min'][0] == pytest.approx(0.00002)
+    local = AsteroidCatalog(number_mp=[8, 9], backend=local_backend, mpc=False).query_transit_summary()
+    assert len(local) == 5
+    assert list(local[local['source_id'] == flora.source_id]['n_obs']) == [3, 2, 1]
+
+def test_select_columns(archive):
+    """
+    Tests that selected columns are fetched and invalid columns are rejected.
+    """
+    flora = ast.Asteroid(number_mp=8, lazy=True)
+    flora.query_observations(columns=('epoch', 'ra'))
+
+    assert flora.observations.colnames == ['source_id', 'observation_id', 'epoch', 'ra']
+    assert 'x_gaia' in select_observations('source_id=1', OBSERVATION_COLUMNS + POSITION_COLUMNS)
+    with pytest.raises(ValueError):
+        select_observations('source_id=1', ('ra; DROP TABLE x',))
+
+def test_requery_shuffled_observations():
+    """
+    Tests that transits are regrouped when observations are queried again and
+    the backend returns them in another order.
+    """
+    from asteroidal.testing import SOURCES, OBSERVATIONS, ORBITS
+    from asteroidal.backends import LocalBackend
+    shuffled = OBSERVATIONS[np.random.default_rng(2).permutation(len(OBSERVATIONS))]
+    flora = ast.Asteroid(number_mp=8, backend=LocalBackend(SOURCES, OBSERVATIONS, orbits=ORBITS))
+    flora.backend = LocalBackend(SOURCES, shuffled, orbits=ORBITS)
+    flora.query_observations(columns=('epoch', 'ra', 'dec'))
+
+    for index, transit in enumerate(flora.transits):
+        rows = flora.transit_index.get_slice(index)
+        assert np.all(flora.observations['observation_id'][rows] // 10 == transit)
+    assert sorted(flora.get_transit_obs(0)[0]) == [150.0, 150.000001, 150.000002]
+
+def test_lazy_requery_columns():
+    """
+    Tests that a lazy asteroid keeps the columns of an explicit query instead
+    of querying the default columns again on first access of transits.
+    """
+    from asteroidal.testing import SOURCES, OBSERVATIONS, ORBITS
+    from asteroidal.backends import LocalBackend
+    observations = OBSERVATIONS.copy()
+    for name in POSITION_COLUMNS:
+        observations[name] = np.arange(len(observations), dtype=np.float64)
+    flora = ast.Asteroid(number_mp=8, lazy=True, backend=LocalBackend(SOURCES, observations, orbits=ORBITS))
+    flora.query_observations(columns=OBSERVATION_COLUMNS + POSITION_COLUMNS)
+
+    assert list(flora.transits) == [100000000000000001, 100000000000000010, 100000000000000020]
+    assert set(POSITION_COLUMNS) <= set(flora.observations.colnames)
+
+def test_transit_stats(archive, local_backend):
+    """
+    Tests that transit statistics recover linear motion, also across ra = 0,
+    and agree between asteroids and catalogs.
+    """
+    from astropy.table import Table
+    seconds = np.arange(5) * 4.5
+    ra = (359.99999 + 10 * seconds / 3600000.) % 360
+    dec = 20 * seconds / 3600000.
+    observations = Table({'source_id': [1]*5 + [2], 'observation_id': [101, 102, 103, 103, 104, 57],
+                          'epoch': np.append(1000 + seconds / 86400., 1001.), 'ra': np.append(ra, 10.),
+                          'dec': np.append(dec, 5.)})
+    stats = transit_stats(observations)
+
+    assert list(stats['n_obs']) == [5, 1]
+    assert list(stats['n_ccd']) == [4, 1]
+    assert stats['ra_rate'][0] == pytest.approx(10, rel=1e-4)
+    assert stats['dec_rate'][0] == pytest.approx(20, rel=1e-4)
+    assert stats['fit_rms'][0] == pytest.approx(0, abs=1e-3)
+    assert stats['ra'][0] == pytest.approx(0.000015, abs=1e-9)
+    assert stats['dec_std'][0] == pytest.approx(20 * np.std(seconds), rel=1e-4)
+    assert np.isnan(stats['rate'][1]) and stats['ra_std'][1] == 0
+
+    flora = ast.Asteroid(number_mp=8)
+    flora_stats = flora.transit_stats()
+    assert list(flora_stats['transit_id']) == list(flora.transits)
+    assert list(flora_stats['n_ccd']) == [len(np.unique(ccds)) for ccds in flora.transit_ccds]
+    catalog = AsteroidCatalog(number_mp=[8, 9], backend=local_backend, mpc=False)
+    summary = catalog.query_transit_summary()
+    catalog_stats = catalog.transit_stats()
+    assert list(catalog_stats['n_obs']) == list(summary['n_obs'])
+    assert np.allclose(catalog_stats['dec'], summary['dec'])
+    assert len(ast.Asteroid().transit_stats()) == 0